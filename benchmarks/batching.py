@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Compare one frame per websocket message with the `tapws.batch.v1` subprotocol.
+
+Runs the tapws WebSocket layer and a websockets client in the same process over
+loopback and measures small (64 bytes) frames per second in both directions.
+
+usage: python -m benchmarks.batching [frames]
+"""
+
+import asyncio
+import sys
+import time
+
+import websockets
+
+from tapws.server.batching import BATCH_SUBPROTOCOL, pack, unpack
+from tapws.server.websocket import WebSocket
+
+CLIENT_MAC = b"\x02\x00\x00\x00\x00\x01"
+ROUTER_MAC = b"\x02\x00\x00\x00\x00\xfe"
+UPSTREAM = ROUTER_MAC + CLIENT_MAC + b"\x08\x00" + bytes(50)
+DOWNSTREAM = CLIENT_MAC + ROUTER_MAC + b"\x08\x00" + bytes(50)
+CLIENT_BATCH = 32
+
+
+async def upstream(url: str, received: list, frames: int, batched: bool) -> float:
+    subprotocols = [BATCH_SUBPROTOCOL] if batched else None
+    async with websockets.connect(url, subprotocols=subprotocols) as client:  # type: ignore
+        received.clear()
+        started = time.perf_counter()
+        if batched:
+            message = pack([UPSTREAM] * CLIENT_BATCH)
+            for _ in range(frames // CLIENT_BATCH):
+                await client.send(message)
+        else:
+            for _ in range(frames):
+                await client.send(UPSTREAM)
+        while (
+            len(received) < frames // CLIENT_BATCH * CLIENT_BATCH
+            if batched
+            else len(received) < frames
+        ):
+            await asyncio.sleep(0)
+        return len(received) / (time.perf_counter() - started)
+
+
+async def downstream(ws: WebSocket, url: str, frames: int, batched: bool) -> float:
+    subprotocols = [BATCH_SUBPROTOCOL] if batched else None
+    async with websockets.connect(url, subprotocols=subprotocols) as client:  # type: ignore
+        # let the server learn the client MAC
+        await client.send(pack([UPSTREAM]) if batched else UPSTREAM)
+        while not ws.fdb.lookup(CLIENT_MAC):
+            await asyncio.sleep(0)
+        connection = ws.fdb.lookup(CLIENT_MAC)
+
+        async def consume() -> int:
+            count = 0
+            while count < frames:
+                message = await client.recv()
+                count += len(unpack(message)) if batched else 1  # type: ignore
+            return count
+
+        consumer = asyncio.create_task(consume())
+        started = time.perf_counter()
+        chunk = [DOWNSTREAM] * 64
+        for _ in range(frames // 64):
+            ws.broadcast_many(chunk)
+            # pace the producer so the bounded queue doesn't drop frames
+            while len(connection.queue) > 16:  # type: ignore
+                await asyncio.sleep(0)
+            await asyncio.sleep(0)
+        count = await consumer
+        return count / (time.perf_counter() - started)
+
+
+async def main(frames: int) -> None:
+    # whole client batches and producer chunks
+    frames -= frames % 64
+    received = []
+
+    async def on_message(message: bytes) -> None:
+        received.append(message)
+
+    ws = WebSocket(on_message, "127.0.0.1", 0)
+    await ws.start()
+    port = ws.ws_server.sockets[0].getsockname()[1]  # type: ignore
+    url = f"ws://127.0.0.1:{port}"
+
+    for batched in (False, True):
+        name = "tapws.batch.v1" if batched else "one frame/message"
+        up = await upstream(url, received, frames, batched)
+        down = await downstream(ws, url, frames, batched)
+        print(
+            f"{name:<18} upstream {up:>10,.0f} frames/s  downstream {down:>10,.0f} frames/s"
+        )
+
+    await ws.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 50000))
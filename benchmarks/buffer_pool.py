@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Compare the copying receive path (BUFFER_POOL_SIZE=0) with the pooled one.
+
+Frames go from the `wire` device backend through `Server.broadcast` and the real
+`WebSocket` switching to queued client connections, the websocket transport is faked.
+For every batch tracemalloc reports the peak memory above the idle baseline while the
+frames are in flight, divided by the number of frames.
+
+usage: python -m benchmarks.buffer_pool [rounds]
+"""
+
+import asyncio
+import functools
+import sys
+import time
+import tracemalloc
+import unittest.mock
+
+from websockets.connection import State
+
+from tapws.server import Server, ServerConfig
+from tapws.server.connection import Connection
+from tapws.server.websocket import WebSocket
+
+CLIENT_MAC = b"\x02\x00\x00\x00\x00\x01"
+FRAME = CLIENT_MAC + b"\x02\x00\x00\x00\x00\x02" + b"\x08\x00" + bytes(1400)
+BATCH = 64
+
+
+class FakeClient(object):
+    state = State.OPEN
+    extensions = []
+    write_limit = 1 << 20
+
+    def __init__(self) -> None:
+        self.transport = unittest.mock.Mock()
+        self.transport.get_write_buffer_size.return_value = 0
+
+    async def send(self, message: bytes) -> None:
+        ...
+
+
+async def run(pool_size: int, rounds: int, traced: bool) -> float:
+    env = {
+        "DEVICE_BACKEND": "wire",
+        "READ_BATCH_SIZE": str(BATCH),
+        "BUFFER_POOL_SIZE": str(pool_size),
+    }
+    with unittest.mock.patch.dict("os.environ", env):
+        config = ServerConfig.From_env()
+    server = Server(
+        config,
+        websocket_wrapper=functools.partial(  # type: ignore
+            WebSocket, ws_factory_cls=unittest.mock.Mock()
+        ),
+    )
+    await server.device.start()
+    peer = server.device.peer  # type: ignore
+    client = Connection(FakeClient(), queue_size=server.ws.queue_size)  # type: ignore
+    client.start()
+    server.ws.fdb.learn(CLIENT_MAC, client)
+
+    async def batch() -> None:
+        for _ in range(BATCH):
+            peer.send(FRAME)
+        server.broadcast()
+        # let the writer task send everything that was queued
+        while client.queue:
+            await asyncio.sleep(0)
+
+    # warm up, the pool and the queues reach their steady state
+    for _ in range(16):
+        await batch()
+
+    peak = 0
+    started = time.perf_counter()
+    if traced:
+        tracemalloc.start()
+    for _ in range(rounds):
+        if traced:
+            baseline = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        await batch()
+        if traced:
+            peak += tracemalloc.get_traced_memory()[1] - baseline
+    if traced:
+        tracemalloc.stop()
+    elapsed = time.perf_counter() - started
+
+    client.close()
+    await server.device.stop()
+    if traced:
+        return peak / (rounds * BATCH)
+    return rounds * BATCH / elapsed
+
+
+async def main(rounds: int) -> None:
+    for pool_size in (0, 256):
+        pps = await run(pool_size, rounds, traced=False)
+        per_frame = await run(pool_size, rounds, traced=True)
+        print(
+            f"BUFFER_POOL_SIZE={pool_size:<4} {pps:>10,.0f} frames/s"
+            f" {per_frame:>8,.0f} bytes allocated per frame"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000))
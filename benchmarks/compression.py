@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Compare the permessage-deflate policies on compressible and incompressible frames.
+
+Frames go through `MeteredDeflate` as the websockets engine sends them, `on` compresses
+every frame and `adaptive` stops compressing once a sample saves less than 10%.
+Random payloads stand for TLS or otherwise already compressed traffic.
+
+usage: python -m benchmarks.compression [frames]
+"""
+
+import os
+import sys
+import time
+
+from websockets import frames
+from websockets.extensions.permessage_deflate import PerMessageDeflate
+
+from tapws.server.compression import CompressionStats, MeteredDeflate
+
+HEADER = b"\x02\x00\x00\x00\x00\x01\x02\x00\x00\x00\x00\x02\x08\x00"
+
+
+def payloads(kind: str, count: int):
+    if kind == "random":
+        return [HEADER + os.urandom(1400) for _ in range(count)]
+    text = b"GET /index.html HTTP/1.1\r\nHost: example.com\r\nAccept: */*\r\n\r\n"
+    return [HEADER + (text * 25)[:1400] for _ in range(count)]
+
+
+def run(adaptive: bool, messages):
+    stats = CompressionStats()
+    deflate = MeteredDeflate(
+        PerMessageDeflate(False, False, 12, 12, {"memLevel": 5}),
+        stats,
+        adaptive=adaptive,
+    )
+    started = time.process_time()
+    for message in messages:
+        deflate.encode(frames.Frame(frames.OP_BINARY, message))
+    return time.process_time() - started, stats
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 50000
+    print(f"{count} frames of {len(HEADER) + 1400} bytes")
+    for kind in ("compressible", "random"):
+        messages = payloads(kind, count)
+        for policy, adaptive in (("on", False), ("adaptive", True)):
+            cpu, stats = run(adaptive, messages)
+            sent = stats.compressed_bytes + stats.skipped_bytes
+            total = stats.raw_bytes + stats.skipped_bytes
+            print(
+                f"{kind:>12} {policy:>8}: {cpu * 1e6 / count:6.2f} us/frame CPU,"
+                f" {sent / total:6.1%} of the bytes sent,"
+                f" {stats.compress_time:.3f}s compressing"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Measure the whole data path (device -> Server -> client and back) without root.
+
+The server runs with the `wire` device backend, the benchmark plays the host on the far
+end of the wire and a client plays the emulator, all over loopback: a websockets client,
+a length-prefixed stream client and a UDP datagram client.
+Reports frames per second in both directions and the round trip latency.
+
+usage: python -m benchmarks.datapath [frames]
+"""
+
+import asyncio
+import socket
+import statistics
+import sys
+import threading
+import time
+import typing
+import unittest.mock
+
+import websockets
+
+from tapws.server import Server, ServerConfig
+
+CLIENT_MAC = b"\x02\x00\x00\x00\x00\x01"
+HOST_MAC = b"\x02\x00\x00\x00\x00\xfe"
+DOWNSTREAM = CLIENT_MAC + HOST_MAC + b"\x08\x00" + bytes(50)
+UPSTREAM = HOST_MAC + CLIENT_MAC + b"\x08\x00" + bytes(50)
+ROUND_TRIPS = 2000
+
+
+class StreamClient(object):
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.reader = reader
+        self.writer = writer
+
+    async def recv(self) -> bytes:
+        size = int.from_bytes(await self.reader.readexactly(4), "big")
+        return await self.reader.readexactly(size)
+
+    async def send(self, frame: bytes) -> None:
+        self.writer.write(len(frame).to_bytes(4, "big") + frame)
+        await self.writer.drain()
+
+
+class DatagramClient(object):
+    def __init__(self, address) -> None:
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 22)
+        self.sock.bind(("127.0.0.1", 0))
+        self.sock.setblocking(False)
+        self.address = address
+        self.loop = asyncio.get_running_loop()
+
+    async def recv(self) -> bytes:
+        return await self.loop.sock_recv(self.sock, 4096)
+
+    async def send(self, frame: bytes) -> None:
+        await self.loop.sock_sendto(self.sock, frame, self.address)
+
+
+def free_port(kind: int) -> int:
+    with socket.socket(socket.AF_INET, kind) as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def inject(peer, frames: int) -> None:
+    for _ in range(frames):
+        peer.send(DOWNSTREAM)
+
+
+def collect(peer, frames: int) -> typing.Tuple[int, float]:
+    received = 0
+    last = time.perf_counter()
+    peer.settimeout(5)
+    try:
+        for _ in range(frames):
+            peer.recv(4096)
+            received += 1
+            last = time.perf_counter()
+    except socket.timeout:
+        # datagrams dropped on the way in are not coming
+        pass
+    finally:
+        peer.settimeout(None)
+    return received, last
+
+
+async def downstream(client, peer, frames: int) -> typing.Tuple[int, float]:
+    producer = threading.Thread(target=inject, args=(peer, frames), daemon=True)
+    started = time.perf_counter()
+    producer.start()
+    received = 0
+    last = started
+    while received < frames:
+        try:
+            await asyncio.wait_for(client.recv(), 1)
+        except asyncio.TimeoutError:
+            # frames dropped by a full client queue (or a full socket buffer) are not coming
+            break
+        received += 1
+        last = time.perf_counter()
+    producer.join()
+    return received, last - started
+
+
+async def upstream(client, peer, frames: int) -> typing.Tuple[int, float]:
+    loop = asyncio.get_running_loop()
+    started = time.perf_counter()
+    collector = loop.run_in_executor(None, collect, peer, frames)
+    for index in range(frames):
+        await client.send(UPSTREAM)
+        if index % 64 == 63:
+            # the server runs in the same event loop, let it read
+            await asyncio.sleep(0)
+    received, last = await collector
+    return received, last - started
+
+
+async def round_trips(client, peer) -> list:
+    loop = asyncio.get_running_loop()
+    samples = []
+    for _ in range(ROUND_TRIPS):
+        started = time.perf_counter()
+        await loop.run_in_executor(None, peer.send, DOWNSTREAM)
+        await client.recv()
+        await client.send(UPSTREAM)
+        await loop.run_in_executor(None, peer.recv, 4096)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+async def measure(client, peer, frames: int) -> None:
+    # let the server learn the client MAC
+    await client.send(UPSTREAM)
+    await asyncio.get_running_loop().run_in_executor(None, peer.recv, 4096)
+
+    for name, direction in (
+        ("device -> client", downstream),
+        ("client -> device", upstream),
+    ):
+        received, elapsed = await direction(client, peer, frames)
+        print(
+            f"{name:>18}: {received / elapsed:>10,.0f} frames/s"
+            f" ({frames - received:,} dropped)"
+        )
+    samples = sorted(await round_trips(client, peer))
+    p50 = statistics.median(samples) * 1e6
+    p99 = samples[int(len(samples) * 0.99)] * 1e6
+    print(f"{'round trip':>18}: p50 {p50:,.0f} us, p99 {p99:,.0f} us")
+
+
+async def main(frames: int) -> None:
+    # port 0 disables the stream and datagram listeners, pick free ports
+    stream_port = free_port(socket.SOCK_STREAM)
+    datagram_port = free_port(socket.SOCK_DGRAM)
+    env = {
+        "DEVICE_BACKEND": "wire",
+        "HOST": "127.0.0.1",
+        "PORT": "0",
+        "STREAM_PORT": str(stream_port),
+        "DATAGRAM_PORT": str(datagram_port),
+    }
+    with unittest.mock.patch.dict("os.environ", env):
+        config = ServerConfig.From_env()
+    server = Server(config)
+    await server.start()
+    peer = server.device.peer  # type: ignore
+    port = server.ws.ws_server.sockets[0].getsockname()[1]  # type: ignore
+
+    print("websocket (WEBSOCKET_ENGINE=websockets)")
+    async with websockets.connect(f"ws://127.0.0.1:{port}") as client:  # type: ignore
+        await measure(client, peer, frames)
+
+    print("stream")
+    reader, writer = await asyncio.open_connection("127.0.0.1", stream_port)
+    await measure(StreamClient(reader, writer), peer, frames)
+    writer.close()
+    await writer.wait_closed()
+
+    print("datagram")
+    client = DatagramClient(("127.0.0.1", datagram_port))
+    await measure(client, peer, frames)
+    client.sock.close()
+
+    await server.stop()
+
+    env["WEBSOCKET_ENGINE"] = "lean"
+    with unittest.mock.patch.dict("os.environ", env):
+        config = ServerConfig.From_env()
+    server = Server(config)
+    await server.start()
+    peer = server.device.peer  # type: ignore
+    port = server.ws.ws_server.sockets[0].getsockname()[1]  # type: ignore
+
+    print("websocket (WEBSOCKET_ENGINE=lean)")
+    async with websockets.connect(f"ws://127.0.0.1:{port}") as client:  # type: ignore
+        await measure(client, peer, frames)
+
+    await server.stop()
+
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000))
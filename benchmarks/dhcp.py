@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Time DHCP DISCOVER / REQUEST handling with a populated lease database.
+
+The server hands out `leases` leases of a /16 (timed), then new clients go through
+DISCOVER (OFFER) and REQUEST (ACK) with `DHCPServerProtocol`, the replies are captured
+instead of broadcast.
+
+usage: python -m benchmarks.dhcp [leases ...]
+"""
+
+import asyncio
+import sys
+import time
+from ipaddress import IPv4Address, IPv4Network
+
+from dpkt import dhcp
+
+from tapws.services.dhcp.config import DHCPConfig
+from tapws.services.dhcp.database import Database
+from tapws.services.dhcp.lease import Lease
+from tapws.services.dhcp.packets import DHCPPacket
+from tapws.services.dhcp.protocol import DHCPServerProtocol
+from tapws.services.dhcp.server import DHCPServer
+
+CLIENTS = 200
+
+
+class CaptureTransport(object):
+    def __init__(self) -> None:
+        self.replies = []
+
+    def sendto(self, data: bytes, addr: tuple) -> None:
+        self.replies.append(DHCPPacket(data))
+
+
+def request(mac: bytes, message_type: int, ip: int = 0) -> DHCPPacket:
+    opts = [(dhcp.DHCP_OPT_MSGTYPE, bytes((message_type,)))]
+    if ip:
+        opts.append((dhcp.DHCP_OPT_REQ_IP, ip.to_bytes(4, "big")))
+    return DHCPPacket(op=dhcp.DHCP_OP_REQUEST, chaddr=mac, xid=1, opts=opts)
+
+
+def mac(index: int) -> bytes:
+    return b"\x02" + index.to_bytes(5, "big")
+
+
+async def run(leases: int) -> None:
+    config = DHCPConfig(
+        server_ip=IPv4Address("10.0.0.1"),
+        server_network=IPv4Network("10.0.0.0/16"),
+        server_router=IPv4Address("10.0.0.1"),
+        bind_interface="bench0",
+    )
+    database = Database(config.lease_time)
+    server = DHCPServer(config, database)
+    fill = time.perf_counter()
+    for index in range(leases):
+        ip = await server.get_available_ip(mac(index))
+        await server.add_lease(Lease(mac(index), int(ip), config.lease_time))
+    fill = time.perf_counter() - fill
+
+    protocol = DHCPServerProtocol(server)
+    transport = CaptureTransport()
+    protocol.connection_made(transport)  # type: ignore
+
+    discover = offer = 0.0
+    for index in range(leases, leases + CLIENTS):
+        started = time.perf_counter()
+        await protocol.send_offer(request(mac(index), dhcp.DHCPDISCOVER))
+        offered = transport.replies[-1].yiaddr
+        middle = time.perf_counter()
+        await protocol.send_response(request(mac(index), dhcp.DHCPREQUEST, offered))
+        ended = time.perf_counter()
+        assert transport.replies[-1].opts[0][1] == bytes((dhcp.DHCPACK,))
+        discover += middle - started
+        offer += ended - middle
+
+    print(
+        f"{leases:>6} leases: DISCOVER {discover * 1e6 / CLIENTS:9.1f} us,"
+        f" REQUEST {offer * 1e6 / CLIENTS:7.1f} us,"
+        f" filling the pool took {fill:.2f}s"
+    )
+
+
+def main() -> None:
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10000, 60000]
+    for leases in sizes:
+        asyncio.run(run(leases))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Time reclaiming expired DHCP leases.
+
+`leases` leases are added with spread deadlines, then the clock is moved so that
+`expired` of them are due. The deadline heap pops only those, the sweep checks the
+deadline of every lease like the periodic cleanup used to (with `datetime` arithmetic).
+
+usage: python -m benchmarks.lease_expiry [leases] [expired]
+"""
+
+import asyncio
+import sys
+import time
+import typing
+
+from tapws.services.dhcp.database import Database
+from tapws.services.dhcp.lease import Lease
+
+
+def populate(count: int, now: float) -> Database:
+    database = Database(3600)
+    for index in range(count):
+        # one lease expiring every millisecond from `now` on
+        lease = Lease(index.to_bytes(6, "big"), index, 3600, now - 3600 + index / 1000)
+        database.add_lease(lease)
+    return database
+
+
+async def heap(database: Database, now: float) -> typing.Tuple[int, float]:
+    started = time.perf_counter()
+    expired = [lease async for lease in database.expired_leases(now=now)]
+    for lease in expired:
+        database.remove_lease(lease)
+    return len(expired), time.perf_counter() - started
+
+
+def sweep(database: Database, now: float) -> int:
+    expired = [lease for lease in database if lease.deadline < now]
+    for lease in expired:
+        database.remove_lease(lease)
+    return len(expired)
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 65000
+    due = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    now = time.monotonic()
+
+    database = populate(count, now - due / 1000)
+    reclaimed, elapsed = asyncio.run(heap(database, now))
+    print(f"heap : {reclaimed} of {count} leases in {elapsed * 1e3:8.3f} ms")
+
+    database = populate(count, now - due / 1000)
+    started = time.perf_counter()
+    reclaimed = sweep(database, now)
+    elapsed = time.perf_counter() - started
+    print(f"sweep: {reclaimed} of {count} leases in {elapsed * 1e3:8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Time recovering DHCP leases from the lease journal.
+
+`entries` journal records are written for `leases` clients of a /16 (every client is
+added, then renewed or removed and added again), then the journal is replayed into
+both lease stores, before and after compaction into a snapshot.
+
+usage: python -m benchmarks.lease_journal [entries] [leases]
+"""
+
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from ipaddress import IPv4Network
+
+from tapws.services.dhcp.compact import CompactDatabase
+from tapws.services.dhcp.database import Database
+from tapws.services.dhcp.journal import OP_ADD, OP_REMOVE, OP_RENEW, LeaseJournal
+from tapws.services.dhcp.lease import Lease
+
+NETWORK = IPv4Network("10.0.0.0/16")
+
+
+def mac(index: int) -> bytes:
+    return b"\x02" + index.to_bytes(5, "big")
+
+
+async def write(path: str, entries: int, leases: int) -> Database:
+    database = Database(3600)
+    journal = LeaseJournal(path)
+    journal.start()
+    base = int(NETWORK.network_address) + 2
+    rng = random.Random(1)
+    started = time.perf_counter()
+    for index in range(entries):
+        client = index if index < leases else rng.randrange(leases)
+        lease = database.get_lease(mac(client))
+        if lease is None:
+            lease = Lease(mac(client), base + client, 3600)
+            database.add_lease(lease)
+            journal.record(OP_ADD, lease)
+        elif rng.random() < 0.8:
+            database.renew_lease(lease)
+            journal.record(OP_RENEW, lease)
+        else:
+            database.remove_lease(lease)
+            journal.record(OP_REMOVE, lease)
+    recorded = time.perf_counter() - started
+    await journal.stop()
+    print(
+        f"recorded {entries} entries (and updated the database) in {recorded * 1e3:.1f} ms"
+        f" ({os.path.getsize(path) / 2**20:.2f} MiB)"
+    )
+    return database
+
+
+async def compact(path: str, database: Database) -> None:
+    journal = LeaseJournal(path)
+    journal.start()
+    started = time.perf_counter()
+    journal.compact(database)
+    elapsed = time.perf_counter() - started
+    await journal.stop()
+    print(f"snapshot of {len(database)} leases built in {elapsed * 1e3:.1f} ms")
+
+
+def recover(path: str, expected: int) -> None:
+    for name, database in (
+        ("memory", Database(3600)),
+        ("compact", CompactDatabase(3600, NETWORK)),
+    ):
+        started = time.perf_counter()
+        loaded = LeaseJournal(path).load(database)
+        elapsed = time.perf_counter() - started
+        assert loaded == expected, (loaded, expected)
+        print(f"  {name:>8}: {loaded} leases recovered in {elapsed * 1e3:7.1f} ms")
+
+
+def main() -> None:
+    entries = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    leases = int(sys.argv[2]) if len(sys.argv) > 2 else 30000
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "leases")
+        database = asyncio.run(write(path, entries, leases))
+        print("journal only:")
+        recover(path, len(database))
+        asyncio.run(compact(path, database))
+        print("snapshot:")
+        recover(path, len(database))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Compare the `memory` and `compact` DHCP lease stores.
+
+For `leases` leases of a /16 it reports the memory held by the store (tracemalloc),
+the time to reclaim `expired` due leases, a full pass over every lease and MAC lookups.
+
+usage: python -m benchmarks.lease_store [leases] [expired]
+"""
+
+import asyncio
+import gc
+import sys
+import time
+import tracemalloc
+import typing
+from ipaddress import IPv4Network
+
+from tapws.services.dhcp.compact import CompactDatabase
+from tapws.services.dhcp.database import Database
+from tapws.services.dhcp.lease import Lease
+
+NETWORK = IPv4Network("10.0.0.0/16")
+
+
+def mac(index: int) -> bytes:
+    return b"\x02" + index.to_bytes(5, "big")
+
+
+def populate(store: str, count: int, now: float) -> Database:
+    if store == "compact":
+        database = CompactDatabase(3600, NETWORK)
+    else:
+        database = Database(3600)
+    base = int(NETWORK.network_address) + 2
+    for index in range(count):
+        # one lease expiring every millisecond from `now` on
+        leased_at = now - 3600 + index / 1000
+        database.add_lease(Lease(mac(index), base + index, 3600, leased_at))
+    return database
+
+
+async def reclaim(database: Database, now: float) -> typing.Tuple[int, float]:
+    started = time.perf_counter()
+    expired = [lease async for lease in database.expired_leases(now=now)]
+    for lease in expired:
+        database.remove_lease(lease)
+    return len(expired), time.perf_counter() - started
+
+
+def run(store: str, count: int, due: int) -> None:
+    # a whole second, the compact store reclaims at whole seconds
+    now = float(int(time.monotonic()))
+    gc.collect()
+    tracemalloc.start()
+    database = populate(store, count, now - due / 1000)
+    gc.collect()
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    started = time.perf_counter()
+    for index in range(0, count, 7):
+        database.get_lease(mac(index))
+    lookup = (time.perf_counter() - started) / len(range(0, count, 7))
+
+    started = time.perf_counter()
+    total = sum(1 for _ in database)
+    scan = time.perf_counter() - started
+
+    reclaimed, elapsed = asyncio.run(reclaim(database, now))
+    print(
+        f"{store:>8}: {memory / 2**20:6.2f} MiB ({memory / count:5.0f} B/lease),"
+        f" reclaimed {reclaimed} in {elapsed * 1e3:6.2f} ms,"
+        f" full pass over {total} in {scan * 1e3:6.2f} ms,"
+        f" lookup {lookup * 1e6:5.2f} us"
+    )
+
+
+def main() -> None:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 65000
+    due = int(sys.argv[2]) if len(sys.argv) > 2 else 650
+    for store in ("memory", "compact"):
+        run(store, count, due)
+
+
+if __name__ == "__main__":
+    main()
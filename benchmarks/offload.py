@@ -0,0 +1,68 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Measure the userspace TCP segmentation of GSO super-packets (DEVICE_OFFLOAD).
+
+Compares reading N MTU-sized frames one by one from a SOCK_SEQPACKET socketpair
+(what the tap device does without offload) with reading one super-packet
+carrying the same payload and segmenting it in userspace.
+
+usage: python -m benchmarks.offload [super-packets]
+"""
+
+import socket
+import sys
+import time
+
+from tapws.server.offload import VIRTIO_NET_HDR_GSO_TCPV4, from_device, vnet_header
+
+MSS = 1448
+PAYLOAD = 44 * MSS
+
+
+def super_packet() -> bytes:
+    ip = bytearray(20)
+    ip[0] = 0x45
+    ip[9] = 6
+    ip[12:20] = bytes((10, 0, 0, 1, 10, 0, 0, 2))
+    tcp = bytearray(20)
+    tcp[12] = 5 << 4
+    tcp[13] = 0x18
+    frame = b"\x02" * 6 + b"\x04" * 6 + b"\x08\x00" + ip + tcp + bytes(PAYLOAD)
+    header = vnet_header.pack(1, VIRTIO_NET_HDR_GSO_TCPV4, 54, MSS, 34, 16)
+    return header + frame
+
+
+def main(count: int) -> None:
+    data = super_packet()
+    started = time.perf_counter()
+    frames = 0
+    for _ in range(count):
+        frames += len(from_device(data).segments())  # type: ignore
+    elapsed = time.perf_counter() - started
+    print(
+        f"{'segment super-packets':>24}: {frames / elapsed:>10,.0f} frames/s "
+        f"{PAYLOAD * count * 8 / elapsed / 1e9:.2f} Gbit/s"
+    )
+
+    first, second = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+    frame = bytes(MSS + 54)
+    frames = count * (PAYLOAD // MSS)
+    started = time.perf_counter()
+    sent = 0
+    while sent < frames:
+        for _ in range(64):
+            first.send(frame)
+        for _ in range(64):
+            second.recv(4096)
+        sent += 64
+    elapsed = time.perf_counter() - started
+    print(
+        f"{'one read per frame':>24}: {sent / elapsed:>10,.0f} frames/s "
+        f"{sent * MSS * 8 / elapsed / 1e9:.2f} Gbit/s (write + read)"
+    )
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Compare moving frames between two processes through a shared memory `FrameRing`
+and through an AF_UNIX datagram socketpair (the `WorkerMesh` default).
+
+A forked producer writes small (64 bytes) frames, the parent consumes them and
+reports frames per second.
+
+usage: python -m benchmarks.ring [frames]
+"""
+
+import os
+import select
+import socket
+import sys
+import time
+
+from tapws.server.ring import FrameRing
+
+FRAME = bytes(64)
+BATCH = 64
+
+
+def produce_socket(sock: socket.socket, frames: int) -> None:
+    send = sock.send
+    for _ in range(frames):
+        send(FRAME)
+
+
+def consume_socket(sock: socket.socket, frames: int) -> None:
+    recv = sock.recv
+    for _ in range(frames):
+        recv(65536)
+
+
+def produce_ring(ring: FrameRing, frames: int, batch: int) -> None:
+    chunk = [FRAME] * batch
+    sent = 0
+    while sent < frames:
+        if batch == 1:
+            sent += ring.put(FRAME)
+        else:
+            sent += ring.put_many(chunk[: frames - sent])
+
+
+def consume_ring(ring: FrameRing, frames: int) -> None:
+    received = 0
+    fd = ring.fileno()
+    while received < frames:
+        batch = ring.get_many(256)
+        if not batch:
+            select.select([fd], [], [])
+        received += len(batch)
+
+
+def run(name: str, produce, consume, frames: int) -> None:
+    pid = os.fork()
+    if pid == 0:
+        produce(frames)
+        os._exit(0)
+    started = time.perf_counter()
+    consume(frames)
+    elapsed = time.perf_counter() - started
+    os.waitpid(pid, 0)
+    print(f"{name:>24}: {frames / elapsed:>12,.0f} frames/s")
+
+
+def main(frames: int) -> None:
+    first, second = socket.socketpair(socket.AF_UNIX, socket.SOCK_DGRAM)
+    run(
+        "unix socket",
+        lambda n: produce_socket(first, n),
+        lambda n: consume_socket(second, n),
+        frames,
+    )
+    first.close()
+    second.close()
+
+    for batch in (1, BATCH):
+        ring = FrameRing(1 << 20)
+        run(
+            f"shared memory ring x{batch}",
+            lambda n: produce_ring(ring, n, batch),
+            lambda n: consume_ring(ring, n),
+            frames,
+        )
+        ring.close()
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 500_000)
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Measure how many frames per second `Server.broadcast` drains from the tap device.
+
+The `wire` device backend (a SOCK_SEQPACKET socketpair) stands in for the tap device
+so the benchmark runs without root.
+
+usage: python -m benchmarks.tap_read [seconds]
+"""
+
+import asyncio
+import socket
+import sys
+import threading
+import time
+import unittest.mock
+
+from tapws.server import Server, ServerConfig
+
+FRAME = (
+    b"\x02\x00\x00\x00\x00\x01" + b"\x02\x00\x00\x00\x00\x02" + b"\x08\x00" + bytes(64)
+)
+
+
+class CountingWebSocket(object):
+    def __init__(self, *args, **kwargs) -> None:
+        self.frames = 0
+
+    def broadcast(self, message: bytes) -> None:
+        self.frames += 1
+
+    def broadcast_many(self, messages) -> None:
+        self.frames += len(messages)
+
+    async def start(self) -> None:
+        ...
+
+    async def stop(self) -> None:
+        ...
+
+
+def produce(sock: socket.socket, stop: threading.Event) -> None:
+    send = sock.send
+    try:
+        while not stop.is_set():
+            send(FRAME)
+    except OSError:
+        # the tap end is closed once the run is over
+        pass
+
+
+async def run(batch_size: int, seconds: float) -> float:
+    env = {"READ_BATCH_SIZE": str(batch_size), "DEVICE_BACKEND": "wire"}
+    with unittest.mock.patch.dict("os.environ", env):
+        config = ServerConfig.From_env()
+    server = Server(
+        config,
+        websocket_wrapper=CountingWebSocket,  # type: ignore
+    )
+    peer = server.device.peer  # type: ignore
+
+    stop = threading.Event()
+    producer = threading.Thread(target=produce, args=(peer, stop), daemon=True)
+    await server.start()
+    producer.start()
+    started = time.perf_counter()
+    await asyncio.sleep(seconds)
+    frames = server.ws.frames
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await server.stop()
+    producer.join()
+    return frames / elapsed
+
+
+async def main(seconds: float) -> None:
+    for batch_size in (1, 8, 64, 256):
+        pps = await run(batch_size, seconds)
+        print(f"READ_BATCH_SIZE={batch_size:<4} {pps:>12,.0f} frames/s")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(float(sys.argv[1]) if len(sys.argv) > 1 else 3.0))
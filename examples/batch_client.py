@@ -0,0 +1,69 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Minimal tapws client speaking the `tapws.batch.v1` subprotocol.
+
+It asks who has the router IP (ARP) and prints every frame received for a few seconds.
+
+usage: python examples/batch_client.py [ws://localhost:8080] [10.11.12.254]
+"""
+
+import asyncio
+import os
+import sys
+from ipaddress import IPv4Address
+
+import websockets
+
+BATCH_SUBPROTOCOL = "tapws.batch.v1"
+
+
+def pack(frames):
+    return b"".join(len(frame).to_bytes(2, "big") + frame for frame in frames)
+
+
+def unpack(message):
+    offset = 0
+    while offset < len(message):
+        size = int.from_bytes(message[offset : offset + 2], "big")
+        yield message[offset + 2 : offset + 2 + size]
+        offset += 2 + size
+
+
+def arp_request(mac: bytes, router_ip: IPv4Address) -> bytes:
+    return (
+        b"\xff" * 6
+        + mac
+        + b"\x08\x06"
+        + b"\x00\x01\x08\x00\x06\x04\x00\x01"
+        + mac
+        + bytes(4)
+        + bytes(6)
+        + router_ip.packed
+    )
+
+
+async def main(url: str, router_ip: IPv4Address) -> None:
+    mac = b"\x02" + os.urandom(5)
+    async with websockets.connect(url, subprotocols=[BATCH_SUBPROTOCOL]) as ws:  # type: ignore
+        if ws.subprotocol != BATCH_SUBPROTOCOL:
+            print("server does not support frame batching")
+            return
+
+        await ws.send(pack([arp_request(mac, router_ip)]))
+        try:
+            while True:
+                message = await asyncio.wait_for(ws.recv(), timeout=5)
+                for frame in unpack(message):
+                    print(
+                        f"{frame[6:12].hex(':')} > {frame[:6].hex(':')} {frame[12:14].hex()} {len(frame)} bytes"
+                    )
+        except asyncio.TimeoutError:
+            pass
+
+
+if __name__ == "__main__":
+    url = sys.argv[1] if len(sys.argv) > 1 else "ws://localhost:8080"
+    router_ip = IPv4Address(sys.argv[2] if len(sys.argv) > 2 else "10.11.12.254")
+    asyncio.run(main(url, router_ip))
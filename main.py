@@ -9,25 +9,18 @@ import sys
 
 import uvloop
 
-from tapws.server import Server, ServerConfig
-from tapws.services import DHCPConfig, DHCPServer, Netfilter
+from tapws.server import Server, ServerConfig, Supervisor
+from tapws.services import ARPResponder, DHCPConfig, DHCPServer, Netfilter
+from tapws.services.dhcp.compact import CompactDatabase
 from tapws.services.dhcp.database import Database
+from tapws.services.dhcp.journal import LeaseJournal
 from tapws.utils import on_done
 from functools import partial
 
 
-async def main():  # pragma: no cover
-    loop = asyncio.get_running_loop()
-    waiter = loop.create_future()
-    logger = logging.getLogger("tapws.__main__")
-    waiter.add_done_callback(partial(on_done, logger))
-    for sig in (signal.SIGINT, signal.SIGTERM):
-        loop.add_signal_handler(sig, waiter.set_result, None)
-
-    print("Starting service")
-
-    server_config = ServerConfig.From_env()
+def create_services(server_config: ServerConfig):  # pragma: no cover
     services = []
+    client_database = None
 
     if server_config.enable_dhcp:
         dhcp_config = DHCPConfig(
@@ -37,10 +30,21 @@ async def main():  # pragma: no cover
             dns_ips=server_config.dns_ips,
             lease_time=server_config.dhcp_lease_time,
             bind_interface=server_config.private_interface,
+            mtu=server_config.mtu,
+            allocation_strategy=server_config.dhcp_allocation_strategy,
         )
 
-        client_database = Database(dhcp_config.lease_time)
-        dhcp_service = DHCPServer(dhcp_config, client_database)
+        if server_config.dhcp_database == "compact":
+            client_database = CompactDatabase(
+                dhcp_config.lease_time, dhcp_config.server_network
+            )
+        else:
+            client_database = Database(dhcp_config.lease_time)
+        journal = None
+        if server_config.dhcp_lease_journal:
+            journal = LeaseJournal(server_config.dhcp_lease_journal)
+            journal.load(client_database)
+        dhcp_service = DHCPServer(dhcp_config, client_database, journal=journal)
         services.append(dhcp_service)
 
     if server_config.public_interface:
@@ -50,8 +54,26 @@ async def main():  # pragma: no cover
         )
         services.append(netfilter_service)
 
+    return services, client_database
+
+
+async def main(server_config: ServerConfig):  # pragma: no cover
+    loop = asyncio.get_running_loop()
+    waiter = loop.create_future()
+    logger = logging.getLogger("tapws.__main__")
+    waiter.add_done_callback(partial(on_done, logger))
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, waiter.set_result, None)
+
+    print("Starting service")
+
+    services, client_database = create_services(server_config)
+    arp_responder = None
+    if client_database is not None and server_config.arp_proxy:
+        arp_responder = ARPResponder(client_database, server_config.router_ip)
+
     try:
-        server = Server(server_config, services=services)
+        server = Server(server_config, services=services, arp_responder=arp_responder)
 
         async with server:
             await waiter
@@ -66,4 +88,12 @@ if __name__ == "__main__":
     log_level = os.environ.get("LOG_LEVEL", "ERROR").upper()
     logging.basicConfig(stream=sys.stdout, level=log_level)
     uvloop.install()
-    asyncio.run(main(), debug=log_level == "DEBUG")
+    server_config = ServerConfig.From_env()
+    if server_config.workers > 1:
+        # fork the workers before any event loop exists
+        supervisor = Supervisor(
+            server_config,
+            services_factory=lambda: create_services(server_config)[0],
+        )
+        exit(supervisor.run())
+    asyncio.run(main(server_config), debug=log_level == "DEBUG")
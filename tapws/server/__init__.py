@@ -1,6 +1,7 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-__all__ = ["Server", "ServerConfig"]
+__all__ = ["Server", "ServerConfig", "Supervisor"]
 from .server import Server
 from .config import ServerConfig
+from .workers import Supervisor
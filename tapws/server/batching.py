@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Frame batching websocket subprotocol.
+
+Clients that negotiate the `tapws.batch.v1` subprotocol exchange websocket messages
+carrying one or more Ethernet frames, each prefixed with its length as a 16 bit
+big-endian integer:
+
+    | length (2 bytes) | frame | length (2 bytes) | frame | ...
+
+Clients that don't negotiate it keep receiving one frame per message.
+"""
+
+import asyncio
+import typing
+from .pool import release
+
+BATCH_SUBPROTOCOL = "tapws.batch.v1"
+MAX_FRAME_SIZE = 0xFFFF
+# a batched message from a client carries at most this many MTU-sized frames
+MAX_BATCH_FRAMES = 64
+
+
+def pack(frames: typing.Iterable[bytes]) -> bytes:
+    chunks = []
+    for frame in frames:
+        chunks.append(len(frame).to_bytes(2, "big"))
+        chunks.append(frame)
+    return b"".join(chunks)
+
+
+def unpack(message: bytes) -> typing.List[bytes]:
+    """
+    Split a batched message into frames.
+    :exception: ValueError if the message is truncated
+    """
+    frames = []
+    offset = 0
+    end = len(message)
+    while offset < end:
+        if offset + 2 > end:
+            raise ValueError("Truncated frame length")
+        size = (message[offset] << 8) | message[offset + 1]
+        offset += 2
+        if offset + size > end:
+            raise ValueError("Truncated frame")
+        frames.append(message[offset : offset + size])
+        offset += size
+    return frames
+
+
+class FrameBatcher(object):
+    """
+    Accumulates outbound frames and hands them over packed in one message,
+    when `flush_size` bytes are pending or `flush_interval` seconds after the first frame.
+    A zero interval flushes at the end of the current event loop iteration,
+    so all the frames read from the tap device in one wakeup share a message.
+    """
+
+    __slots__ = (
+        "frames",
+        "size",
+        "flush_size",
+        "flush_interval",
+        "on_flush",
+        "handle",
+        "loop",
+    )
+    frames: typing.List[bytes]
+    handle: typing.Optional[asyncio.Handle]
+
+    def __init__(
+        self,
+        on_flush: typing.Callable[[bytes], typing.Any],
+        *,
+        flush_size: int = 16384,
+        flush_interval: float = 0,
+    ) -> None:
+        self.frames = []
+        self.size = 0
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.on_flush = on_flush
+        self.handle = None
+        self.loop = asyncio.get_running_loop()
+
+    def add(self, frame: bytes) -> None:
+        if len(frame) > MAX_FRAME_SIZE:
+            raise ValueError(f"Frame too large to be batched: {len(frame)}")
+        self.frames.append(frame)
+        self.size += len(frame) + 2
+        if self.size >= self.flush_size:
+            self.flush()
+        elif self.handle is None:
+            if self.flush_interval > 0:
+                self.handle = self.loop.call_later(self.flush_interval, self.flush)
+            else:
+                self.handle = self.loop.call_soon(self.flush)
+
+    def flush(self) -> None:
+        if self.handle is not None:
+            self.handle.cancel()
+            self.handle = None
+        if not self.frames:
+            return
+        frames = self.frames
+        message = pack(frames)
+        self.frames = []
+        self.size = 0
+        # the frames are copied into the message, pooled buffers can be reused
+        for frame in frames:
+            release(frame)
+        self.on_flush(message)
+
+    def close(self) -> None:
+        if self.handle is not None:
+            self.handle.cancel()
+            self.handle = None
+        for frame in self.frames:
+            release(frame)
+        self.frames = []
+        self.size = 0
@@ -0,0 +1,154 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+permessage-deflate policy for the websockets engine.
+
+`on` compresses every message, `off` doesn't negotiate the extension and `adaptive`
+measures how much each connection saves and stops compressing for connections where it
+doesn't pay off (e.g. HTTPS or other already compressed traffic). A message sent without
+compression is valid within the extension (RSV1 is not set) and doesn't touch the
+compression context, so compression can be resumed at any message.
+"""
+
+import time
+import typing
+
+from websockets import frames
+from websockets.extensions.permessage_deflate import (
+    PerMessageDeflate,
+    ServerPerMessageDeflateFactory,
+)
+
+COMPRESSION_OFF = "off"
+COMPRESSION_ON = "on"
+COMPRESSION_ADAPTIVE = "adaptive"
+
+
+class CompressionStats(object):
+    """
+    Counters of the outbound messages going through permessage-deflate.
+    """
+
+    __slots__ = ("raw_bytes", "compressed_bytes", "skipped_bytes", "compress_time")
+
+    def __init__(self) -> None:
+        self.raw_bytes = 0
+        self.compressed_bytes = 0
+        self.skipped_bytes = 0
+        self.compress_time = 0.0
+
+    def __repr__(self) -> str:
+        return (
+            f"CompressionStats(saved={self.saved_bytes}B of {self.raw_bytes}B,"
+            f" skipped={self.skipped_bytes}B, time={self.compress_time:.3f}s)"
+        )
+
+    @property
+    def saved_bytes(self) -> int:
+        return self.raw_bytes - self.compressed_bytes
+
+
+class MeteredDeflate(PerMessageDeflate):
+    """
+    permessage-deflate that counts what it saves and the time spent compressing.
+    When `adaptive`, the ratio is sampled every `sample_size` bytes, a sample that saves less
+    than `min_saving` sends the next `backoff` messages uncompressed before sampling again.
+    """
+
+    def __init__(
+        self,
+        deflate: PerMessageDeflate,
+        stats: CompressionStats,
+        *,
+        adaptive: bool = False,
+        sample_size: int = 1 << 16,
+        min_saving: float = 0.1,
+        backoff: int = 1024,
+    ) -> None:
+        super().__init__(
+            deflate.remote_no_context_takeover,
+            deflate.local_no_context_takeover,
+            deflate.remote_max_window_bits,
+            deflate.local_max_window_bits,
+            deflate.compress_settings,
+        )
+        self.stats = stats
+        self.connection_stats = CompressionStats()
+        self.adaptive = adaptive
+        self.sample_size = sample_size
+        self.min_saving = min_saving
+        self.backoff = backoff
+        self.sample_raw = 0
+        self.sample_compressed = 0
+        self.skipping = 0
+        self.skip_message = False
+
+    def skip_next(self, size: int) -> bool:
+        """
+        Count a whole message of `size` bytes as sent uncompressed without going through
+        `encode`, if the policy is backing off. Returns False if it has to be compressed.
+        """
+        if self.skipping <= 0:
+            return False
+        self.skipping -= 1
+        self.stats.skipped_bytes += size
+        self.connection_stats.skipped_bytes += size
+        return True
+
+    def encode(self, frame: frames.Frame) -> frames.Frame:
+        if frame.opcode in frames.CTRL_OPCODES:
+            return frame
+        if frame.opcode is not frames.OP_CONT:
+            self.skip_message = self.skipping > 0
+            if self.skip_message:
+                self.skipping -= 1
+
+        size = len(frame.data)
+        if self.skip_message:
+            self.stats.skipped_bytes += size
+            self.connection_stats.skipped_bytes += size
+            return frame
+
+        started = time.perf_counter()
+        encoded = super().encode(frame)
+        elapsed = time.perf_counter() - started
+        compressed = len(encoded.data)
+        for stats in (self.stats, self.connection_stats):
+            stats.raw_bytes += size
+            stats.compressed_bytes += compressed
+            stats.compress_time += elapsed
+
+        if self.adaptive:
+            self.sample_raw += size
+            self.sample_compressed += compressed
+            if self.sample_raw >= self.sample_size:
+                if self.sample_compressed > self.sample_raw * (1 - self.min_saving):
+                    self.skipping = self.backoff
+                self.sample_raw = 0
+                self.sample_compressed = 0
+        return encoded
+
+
+class MeteredDeflateFactory(ServerPerMessageDeflateFactory):
+    """
+    Negotiates permessage-deflate like the websockets default and hands out `MeteredDeflate`.
+    """
+
+    def __init__(self, stats: CompressionStats, *, adaptive: bool = False) -> None:
+        # the settings websockets.serve uses by default
+        super().__init__(
+            server_max_window_bits=12,
+            client_max_window_bits=12,
+            compress_settings={"memLevel": 5},
+        )
+        self.stats = stats
+        self.adaptive = adaptive
+
+    def process_request_params(
+        self,
+        params: typing.Sequence[typing.Tuple[str, typing.Optional[str]]],
+        accepted_extensions: typing.Sequence,
+    ) -> typing.Tuple[typing.List, MeteredDeflate]:
+        response, deflate = super().process_request_params(params, accepted_extensions)
+        return response, MeteredDeflate(deflate, self.stats, adaptive=self.adaptive)  # type: ignore
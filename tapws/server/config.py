@@ -22,6 +22,34 @@ class ServerConfig:
         *,
         public_interface: Optional[str] = None,
         ssl: Optional[ssl.SSLContext] = None,
+        fdb_aging_time: int = 300,
+        fdb_max_macs: int = 16,
+        read_batch_size: int = 64,
+        send_queue_size: int = 256,
+        send_queue_policy: str = "tail",
+        local_switching: bool = True,
+        arp_proxy: bool = True,
+        multicast_snooping: bool = True,
+        multicast_membership_timeout: int = 260,
+        frame_batching: bool = True,
+        batch_flush_size: int = 16384,
+        batch_flush_interval: float = 0,
+        workers: int = 1,
+        device_backend: str = "pytun",
+        device_offload: bool = False,
+        buffer_pool_size: int = 256,
+        mtu: int = 1500,
+        stream_port: int = 0,
+        stream_path: Optional[str] = None,
+        datagram_port: int = 0,
+        datagram_idle_timeout: int = 300,
+        datagram_allow: List[IPv4Network] = [IPv4Network("127.0.0.0/8")],
+        datagram_max_peers: int = 64,
+        websocket_engine: str = "websockets",
+        compression: str = "on",
+        dhcp_allocation_strategy: str = "next-fit",
+        dhcp_database: str = "memory",
+        dhcp_lease_journal: Optional[str] = None,
     ):
         self.host = host
         self.port = port
@@ -34,6 +62,34 @@ class ServerConfig:
         self.ssl = ssl
         self.dhcp_lease_time = dhcp_lease_time
         self.enable_dhcp = enable_dhcp
+        self.fdb_aging_time = fdb_aging_time
+        self.fdb_max_macs = fdb_max_macs
+        self.read_batch_size = read_batch_size
+        self.send_queue_size = send_queue_size
+        self.send_queue_policy = send_queue_policy
+        self.local_switching = local_switching
+        self.arp_proxy = arp_proxy
+        self.multicast_snooping = multicast_snooping
+        self.multicast_membership_timeout = multicast_membership_timeout
+        self.frame_batching = frame_batching
+        self.batch_flush_size = batch_flush_size
+        self.batch_flush_interval = batch_flush_interval
+        self.workers = workers
+        self.device_backend = device_backend
+        self.device_offload = device_offload
+        self.buffer_pool_size = buffer_pool_size
+        self.mtu = mtu
+        self.stream_port = stream_port
+        self.stream_path = stream_path
+        self.datagram_port = datagram_port
+        self.datagram_idle_timeout = datagram_idle_timeout
+        self.datagram_allow = datagram_allow
+        self.datagram_max_peers = datagram_max_peers
+        self.websocket_engine = websocket_engine
+        self.compression = compression
+        self.dhcp_allocation_strategy = dhcp_allocation_strategy
+        self.dhcp_database = dhcp_database
+        self.dhcp_lease_journal = dhcp_lease_journal
 
     def __repr__(self) -> str:
         return f"ServerConfig(ip={self.host}, port={self.port}...)"
@@ -91,8 +147,132 @@ class ServerConfig:
         dhcp_lease_time = int(os.environ.get("DHCP_LEASE_TIME", "3600"))
         if dhcp_lease_time < -1:
             raise ValueError("DHCP_LEASE_TIME must be -1 or greater")
+        dhcp_allocation_strategy = os.environ.get(
+            "DHCP_ALLOCATION_STRATEGY", "next-fit"
+        ).lower()
+        if dhcp_allocation_strategy not in ("next-fit", "random", "hash"):
+            raise ValueError(
+                "DHCP_ALLOCATION_STRATEGY must be either next-fit, random or hash"
+            )
+        dhcp_database = os.environ.get("DHCP_DATABASE", "memory").lower()
+        if dhcp_database not in ("memory", "compact"):
+            raise ValueError("DHCP_DATABASE must be either memory or compact")
+        dhcp_lease_journal = os.environ.get("DHCP_LEASE_JOURNAL", "")
+        if dhcp_lease_journal and not os.path.isdir(
+            os.path.dirname(os.path.abspath(dhcp_lease_journal))
+        ):
+            raise ValueError("DHCP_LEASE_JOURNAL directory doesn't exist")
         dns_ips = [IPv4Address("1.1.1.1"), IPv4Address("8.8.8.8")]
 
+        fdb_aging_time = int(os.environ.get("FDB_AGING_TIME", "300"))
+        if fdb_aging_time < 1:
+            raise ValueError("FDB_AGING_TIME must be greater than zero")
+        fdb_max_macs = int(os.environ.get("FDB_MAX_MACS", "16"))
+        if fdb_max_macs < 1:
+            raise ValueError("FDB_MAX_MACS must be greater than zero")
+
+        read_batch_size = int(os.environ.get("READ_BATCH_SIZE", "64"))
+        if read_batch_size < 1:
+            raise ValueError("READ_BATCH_SIZE must be greater than zero")
+
+        send_queue_size = int(os.environ.get("SEND_QUEUE_SIZE", "256"))
+        if send_queue_size < 1:
+            raise ValueError("SEND_QUEUE_SIZE must be greater than zero")
+        send_queue_policy = os.environ.get("SEND_QUEUE_POLICY", "tail").lower()
+        if send_queue_policy not in ("tail", "head"):
+            raise ValueError("SEND_QUEUE_POLICY must be either tail or head")
+
+        local_switching = os.environ.get("LOCAL_SWITCHING", "True").lower() in (
+            "true",
+            "1",
+            "yes",
+        )
+        arp_proxy = os.environ.get("ARP_PROXY", "True").lower() in (
+            "true",
+            "1",
+            "yes",
+        )
+        multicast_snooping = os.environ.get("MULTICAST_SNOOPING", "True").lower() in (
+            "true",
+            "1",
+            "yes",
+        )
+        multicast_membership_timeout = int(
+            os.environ.get("MULTICAST_MEMBERSHIP_TIMEOUT", "260")
+        )
+        if multicast_membership_timeout < 1:
+            raise ValueError("MULTICAST_MEMBERSHIP_TIMEOUT must be greater than zero")
+
+        frame_batching = os.environ.get("FRAME_BATCHING", "True").lower() in (
+            "true",
+            "1",
+            "yes",
+        )
+        batch_flush_size = int(os.environ.get("BATCH_FLUSH_SIZE", "16384"))
+        if batch_flush_size < 1:
+            raise ValueError("BATCH_FLUSH_SIZE must be greater than zero")
+        batch_flush_interval = int(os.environ.get("BATCH_FLUSH_INTERVAL", "0"))
+        if batch_flush_interval < 0:
+            raise ValueError("BATCH_FLUSH_INTERVAL must be 0 or greater")
+
+        workers = int(os.environ.get("WORKERS", "1"))
+        if workers < 1:
+            raise ValueError("WORKERS must be greater than zero")
+
+        device_backend = os.environ.get("DEVICE_BACKEND", "pytun").lower()
+        if device_backend not in ("pytun", "native", "wire", "ring"):
+            raise ValueError(
+                "DEVICE_BACKEND must be one of pytun, native, wire or ring"
+            )
+        device_offload = os.environ.get("DEVICE_OFFLOAD", "False").lower() in (
+            "true",
+            "1",
+            "yes",
+        )
+        if device_offload and device_backend != "native":
+            raise ValueError("DEVICE_OFFLOAD requires DEVICE_BACKEND set to native")
+
+        buffer_pool_size = int(os.environ.get("BUFFER_POOL_SIZE", "256"))
+        if buffer_pool_size < 0:
+            raise ValueError("BUFFER_POOL_SIZE must be 0 or greater")
+
+        mtu = int(os.environ.get("MTU", "1500"))
+        # the largest frame (MTU + Ethernet and VLAN headers) must fit a batched length prefix
+        if mtu < 68 or mtu > 65517:
+            raise ValueError("MTU must be between 68 and 65517")
+
+        stream_port = int(os.environ.get("STREAM_PORT", "0"))
+        if stream_port < 0 or stream_port > 65535:
+            raise ValueError("STREAM_PORT must be between 0 and 65535")
+        stream_path = os.environ.get("STREAM_PATH", None)
+        if stream_path and workers > 1:
+            raise ValueError("STREAM_PATH can't be shared by several WORKERS")
+
+        datagram_port = int(os.environ.get("DATAGRAM_PORT", "0"))
+        if datagram_port < 0 or datagram_port > 65535:
+            raise ValueError("DATAGRAM_PORT must be between 0 and 65535")
+        datagram_idle_timeout = int(os.environ.get("DATAGRAM_IDLE_TIMEOUT", "300"))
+        if datagram_idle_timeout < 1:
+            raise ValueError("DATAGRAM_IDLE_TIMEOUT must be greater than zero")
+        datagram_allow = [
+            IPv4Network(network.strip(), strict=False)
+            for network in os.environ.get("DATAGRAM_ALLOW", "127.0.0.0/8").split(",")
+            if network.strip()
+        ]
+        if not datagram_allow:
+            raise ValueError("DATAGRAM_ALLOW must list at least one network")
+        datagram_max_peers = int(os.environ.get("DATAGRAM_MAX_PEERS", "64"))
+        if datagram_max_peers < 1:
+            raise ValueError("DATAGRAM_MAX_PEERS must be greater than zero")
+
+        websocket_engine = os.environ.get("WEBSOCKET_ENGINE", "websockets").lower()
+        if websocket_engine not in ("websockets", "lean"):
+            raise ValueError("WEBSOCKET_ENGINE must be either websockets or lean")
+
+        compression = os.environ.get("COMPRESSION", "on").lower()
+        if compression not in ("off", "on", "adaptive"):
+            raise ValueError("COMPRESSION must be either off, on or adaptive")
+
         private_interface = interface_name
         intra_ip = interface_ip
         intra_network = interface_network
@@ -110,4 +290,32 @@ class ServerConfig:
             dhcp_lease_time,
             public_interface=public_interface,
             ssl=ssl_context,
+            fdb_aging_time=fdb_aging_time,
+            fdb_max_macs=fdb_max_macs,
+            read_batch_size=read_batch_size,
+            send_queue_size=send_queue_size,
+            send_queue_policy=send_queue_policy,
+            local_switching=local_switching,
+            arp_proxy=arp_proxy,
+            multicast_snooping=multicast_snooping,
+            multicast_membership_timeout=multicast_membership_timeout,
+            frame_batching=frame_batching,
+            batch_flush_size=batch_flush_size,
+            batch_flush_interval=batch_flush_interval / 1000,
+            workers=workers,
+            device_backend=device_backend,
+            device_offload=device_offload,
+            buffer_pool_size=buffer_pool_size,
+            mtu=mtu,
+            stream_port=stream_port,
+            stream_path=stream_path or None,
+            datagram_port=datagram_port,
+            datagram_idle_timeout=datagram_idle_timeout,
+            datagram_allow=datagram_allow,
+            datagram_max_peers=datagram_max_peers,
+            websocket_engine=websocket_engine,
+            compression=compression,
+            dhcp_allocation_strategy=dhcp_allocation_strategy,
+            dhcp_database=dhcp_database,
+            dhcp_lease_journal=dhcp_lease_journal or None,
         )
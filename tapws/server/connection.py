@@ -1,27 +1,184 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-from typing import Optional
+import asyncio
+import logging
+from collections import deque
+from typing import Deque, Optional, Set
 
+from websockets import exceptions as websockets_exceptions
+from websockets.connection import State
+from websockets.frames import OP_BINARY
 from websockets.legacy.server import WebSocketServerProtocol
 
+from .batching import FrameBatcher
+from .compression import CompressionStats, MeteredDeflate
+from .pool import retain, release
 
-class Connection:  # pragma: no cover
-    __slots__ = ("_mac", "websocket")
+DROP_TAIL = "tail"
+DROP_HEAD = "head"
+
+
+class Connection:
+    """
+    A connected client.
+    Outbound frames are buffered in a bounded queue drained by a single writer task,
+    when the queue is full frames are dropped according to `drop_policy`:
+    `tail` drops the incoming frame, `head` drops the oldest queued frame.
+    """
+
+    __slots__ = (
+        "macs",
+        "websocket",
+        "queue",
+        "queue_size",
+        "drop_policy",
+        "dropped",
+        "invalid",
+        "waiter",
+        "writer_task",
+        "batcher",
+        "logger",
+    )
+    queue: Deque[bytes]
+    waiter: Optional[asyncio.Future]
+    writer_task: Optional[asyncio.Task]
+    batcher: Optional[FrameBatcher]
 
     def __init__(
-        self, websocket: WebSocketServerProtocol, mac: Optional[str] = None
+        self,
+        websocket: WebSocketServerProtocol,
+        *,
+        queue_size: int = 256,
+        drop_policy: str = DROP_TAIL,
+        logger: logging.Logger = logging.getLogger("tapws.connection"),
     ) -> None:
-        self._mac = mac
+        if drop_policy not in (DROP_TAIL, DROP_HEAD):
+            raise ValueError(f"Unknown drop policy: {drop_policy}")
+        self.macs: Set[bytes] = set()
         self.websocket = websocket
+        self.queue = deque()
+        self.queue_size = queue_size
+        self.drop_policy = drop_policy
+        self.dropped = 0
+        self.invalid = 0
+        self.waiter = None
+        self.writer_task = None
+        self.batcher = None
+        self.logger = logger
 
     def __repr__(self) -> str:
         return f"Connection({self.websocket})"
 
     @property
-    def mac(self) -> Optional[str]:
-        return self._mac
+    def compression_stats(self) -> Optional[CompressionStats]:
+        """
+        permessage-deflate counters of this client, None if it doesn't compress.
+        """
+        for extension in getattr(self.websocket, "extensions", None) or ():
+            if isinstance(extension, MeteredDeflate):
+                return extension.connection_stats
+        return None
+
+    def enable_batching(self, flush_size: int, flush_interval: float) -> None:
+        """
+        Pack outbound frames into batched messages (the client negotiated the batch subprotocol).
+        """
+        self.batcher = FrameBatcher(
+            self.enqueue, flush_size=flush_size, flush_interval=flush_interval
+        )
+
+    def send(self, message: bytes) -> bool:
+        """
+        Queue the frame for the writer task. Returns False if the frame was dropped.
+        A pooled frame stays referenced until it is written or dropped.
+        """
+        retain(message)
+        if self.batcher is not None:
+            self.batcher.add(message)
+            return True
+        return self.enqueue(message)
+
+    def enqueue(self, message: bytes) -> bool:
+        queue = self.queue
+        if len(queue) >= self.queue_size:
+            self.dropped += 1
+            if self.drop_policy == DROP_TAIL:
+                release(message)
+                return False
+            release(queue.popleft())
+        queue.append(message)
+
+        waiter = self.waiter
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
+        return True
+
+    def send_prepared(self, message: bytes, frame: bytes) -> bool:
+        """
+        Write an already serialized (unmasked, uncompressed) websocket frame straight to the transport.
+        Falls back to the queue if frames are pending or the client is slow. With an extension
+        negotiated the message is encoded for this client, unless the adaptive compression policy
+        is backing off and would send it as it is anyway.
+        """
+        websocket = self.websocket
+        if self.queue or self.batcher is not None or websocket.state is not State.OPEN:
+            return self.send(message)
+
+        transport = websocket.transport
+        if transport.get_write_buffer_size() >= websocket.write_limit:
+            return self.send(message)
+
+        extensions = websocket.extensions
+        if not extensions or (
+            len(extensions) == 1
+            and extensions[0].__class__ is MeteredDeflate
+            and extensions[0].skip_next(len(message))
+        ):
+            transport.write(frame)
+        else:
+            websocket.write_frame_sync(True, OP_BINARY, message)
+        return True
+
+    async def writer(self) -> None:
+        queue = self.queue
+        send = self.websocket.send
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                while queue:
+                    message = queue.popleft()
+                    try:
+                        await send(message)
+                    finally:
+                        release(message)
+                self.waiter = loop.create_future()
+                await self.waiter
+                self.waiter = None
+        except (websockets_exceptions.ConnectionClosed, ConnectionError):
+            pass
+
+    def start(self) -> None:
+        self.writer_task = asyncio.create_task(self.writer(), name="writer")
+        self.writer_task.add_done_callback(self._on_writer_done)
+
+    def _on_writer_done(self, task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception():
+            self.logger.warning(f"{self} writer stopped: {task.exception()}")
 
-    @mac.setter
-    def mac(self, mac) -> None:
-        self._mac = mac
+    def close(self) -> None:
+        if self.writer_task is not None:
+            self.writer_task.cancel()
+            self.writer_task = None
+        if self.batcher is not None:
+            self.batcher.close()
+        for message in self.queue:
+            release(message)
+        self.queue.clear()
+        if self.dropped:
+            self.logger.info(f"{self} dropped {self.dropped} frames")
+        if self.invalid:
+            self.logger.info(f"{self} sent {self.invalid} invalid frames")
+        stats = self.compression_stats
+        if stats is not None and (stats.raw_bytes or stats.skipped_bytes):
+            self.logger.info(f"{self} {stats}")
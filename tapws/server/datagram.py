@@ -0,0 +1,221 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+UDP datagram transport.
+
+Every datagram carries exactly one Ethernet frame (e.g. QEMU `-netdev dgram`), without any
+framing or handshake. A peer is known by its address from its first valid datagram on and
+is forgotten after `idle_timeout` seconds without traffic. UDP source addresses are easily
+forged, only addresses in `allow` (loopback by default) become peers, up to `max_peers`.
+"""
+
+import asyncio
+import logging
+import socket
+import time
+import typing
+from ipaddress import IPv4Address, IPv4Network
+
+from .pool import retain, release
+
+if typing.TYPE_CHECKING:
+    from .device import BaseDevice
+    from .websocket import WebSocket
+
+
+class DatagramPeer(object):
+    """
+    A datagram client, with the `Connection` methods the switch uses.
+    There is no send queue, frames that don't fit the socket buffer are dropped like on a wire.
+    """
+
+    __slots__ = ("macs", "address", "endpoint", "last_seen", "dropped", "invalid")
+
+    def __init__(
+        self, endpoint: "DatagramEndpoint", address: typing.Tuple, last_seen: float
+    ) -> None:
+        self.macs: typing.Set[bytes] = set()
+        self.address = address
+        self.endpoint = endpoint
+        self.last_seen = last_seen
+        self.dropped = 0
+        self.invalid = 0
+
+    def __repr__(self) -> str:
+        return f"DatagramPeer({self.address})"
+
+    def start(self) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+    def send(self, message: bytes) -> bool:
+        self.endpoint.sendto(message, self)
+        return True
+
+    def send_prepared(self, message: bytes, frame: bytes) -> bool:
+        # the serialized websocket frame is of no use here
+        self.endpoint.sendto(message, self)
+        return True
+
+
+class DatagramEndpoint(asyncio.DatagramProtocol):
+    """
+    Exchanges frames with datagram peers, sharing the switch and the tap device writer
+    with the websocket clients.
+    Outbound datagrams are collected and sent together at the end of the event loop iteration,
+    so the fan-out of all the frames read in one device wakeup is a single pass of `sendto`.
+    """
+
+    transport: typing.Optional[asyncio.DatagramTransport]
+    peers: typing.Dict[typing.Tuple, DatagramPeer]
+    outbox: typing.List[typing.Tuple[bytes, DatagramPeer]]
+
+    def __init__(
+        self,
+        switch: "WebSocket",
+        device: "BaseDevice",
+        *,
+        host: str = "0.0.0.0",
+        port: int = 0,
+        idle_timeout: float = 300,
+        allow: typing.List[IPv4Network] = [IPv4Network("127.0.0.0/8")],
+        max_peers: int = 64,
+        read_batch_size: int = 64,
+        reuse_port: bool = False,
+        clock: typing.Callable[[], float] = time.monotonic,
+        logger: logging.Logger = logging.getLogger("tapws.datagram"),
+    ) -> None:
+        self.switch = switch
+        self.device = device
+        self.host = host
+        self.port = port
+        self.idle_timeout = idle_timeout
+        self.allow = allow
+        self.max_peers = max_peers
+        self.read_batch_size = read_batch_size
+        self.reuse_port = reuse_port
+        self.clock = clock
+        self.logger = logger
+        self.transport = None
+        self.sock = None
+        self.peers = {}
+        self.outbox = []
+        self.handle = None
+        self.expiry_task = None
+        self.dropped = 0
+        self.rejected = 0
+
+    async def start(self) -> None:
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        if self.reuse_port:
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        self.sock.bind((self.host, self.port))
+        self.sock.setblocking(False)
+        loop = asyncio.get_running_loop()
+        await loop.create_datagram_endpoint(lambda: self, sock=self.sock)
+        self.expiry_task = asyncio.create_task(self.expire_peers(), name="udp-expiry")
+
+    async def stop(self) -> None:
+        if self.expiry_task is not None:
+            self.expiry_task.cancel()
+            self.expiry_task = None
+        if self.handle is not None:
+            self.handle.cancel()
+            self.handle = None
+        for message, _ in self.outbox:
+            release(message)
+        self.outbox = []
+        for peer in list(self.peers.values()):
+            self.forget(peer)
+        if self.transport is not None:
+            self.transport.close()
+            self.transport = None
+        if self.dropped:
+            self.logger.info(f"Dropped {self.dropped} datagrams")
+        if self.rejected:
+            self.logger.info(f"Rejected {self.rejected} datagrams from unknown peers")
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self.transport = transport  # type: ignore
+
+    def datagram_received(self, data: bytes, addr: typing.Tuple) -> None:
+        self.receive(data, addr)
+        # the transport reads a single datagram per wakeup, drain the ones queued behind it
+        recvfrom = self.sock.recvfrom  # type: ignore
+        # one byte more than the largest frame, so oversized frames are seen and dropped
+        size = self.switch.max_frame_size + 1
+        try:
+            for _ in range(self.read_batch_size - 1):
+                data, addr = recvfrom(size)
+                self.receive(data, addr)
+        except BlockingIOError:
+            pass
+        except OSError as e:
+            self.error_received(e)
+
+    def receive(self, data: bytes, addr: typing.Tuple) -> None:
+        peer = self.peers.get(addr)
+        if peer is None:
+            if not self.switch.is_valid(data) or not self.accept(addr):  # type: ignore
+                self.rejected += 1
+                return
+            peer = DatagramPeer(self, addr, self.clock())
+            self.peers[addr] = peer
+            self.switch.register(peer)  # type: ignore
+        else:
+            peer.last_seen = self.clock()
+        if not self.switch.route(data, peer):  # type: ignore
+            return
+        device = self.device
+        if len(device.pending) >= device.write_high_water:
+            # no backpressure on datagrams, drop instead of queueing without bound
+            self.dropped += 1
+            return
+        device.write(data)
+
+    def accept(self, addr: typing.Tuple) -> bool:
+        if len(self.peers) >= self.max_peers:
+            return False
+        ip = IPv4Address(addr[0])
+        return any(ip in network for network in self.allow)
+
+    def error_received(self, exc: Exception) -> None:
+        self.logger.debug(f"Datagram error: {exc}")
+
+    def sendto(self, message: bytes, peer: DatagramPeer) -> None:
+        retain(message)
+        self.outbox.append((message, peer))
+        if self.handle is None:
+            self.handle = asyncio.get_running_loop().call_soon(self.flush)
+
+    def flush(self) -> None:
+        self.handle = None
+        outbox = self.outbox
+        self.outbox = []
+        sendto = self.sock.sendto  # type: ignore
+        for message, peer in outbox:
+            try:
+                sendto(message, peer.address)
+            except OSError:
+                # socket buffer full (or the peer is gone)
+                peer.dropped += 1
+                self.dropped += 1
+            release(message)
+
+    def forget(self, peer: DatagramPeer) -> None:
+        del self.peers[peer.address]
+        self.switch.unregister(peer)  # type: ignore
+
+    def expire(self) -> None:
+        deadline = self.clock() - self.idle_timeout
+        for peer in [peer for peer in self.peers.values() if peer.last_seen < deadline]:
+            self.logger.info(f"{peer} expired")
+            self.forget(peer)
+
+    async def expire_peers(self) -> None:
+        while True:
+            await asyncio.sleep(min(self.idle_timeout, 30))
+            self.expire()
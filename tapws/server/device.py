@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import abc
+import asyncio
+import errno
+import logging
+import typing
+from collections import deque
+
+# refs: linux/if_tun.h
+IFF_TUN = 0x0001
+IFF_TAP = 0x0002
+IFF_MULTI_QUEUE = 0x0100
+IFF_NO_PI = 0x1000
+IFF_VNET_HDR = 0x4000
+
+# Ethernet header plus one 802.1Q tag on top of the MTU
+ETH_HLEN = 14
+VLAN_HLEN = 4
+
+
+def max_frame_size(mtu: int) -> int:
+    return mtu + ETH_HLEN + VLAN_HLEN
+
+
+def would_block(e: Exception) -> bool:
+    if isinstance(e, BlockingIOError):
+        return True
+    return len(e.args) > 0 and e.args[0] in (errno.EAGAIN, errno.EWOULDBLOCK)
+
+
+class BaseDevice(object):
+    """
+    Base class for the device backends the server reads frames from and writes frames to.
+    Backends implement the raw `read`, `write_frame`, `fileno`, `hwaddr`, `open` and `close`,
+    the non-blocking write queue and backpressure are shared.
+    """
+
+    __metaclass__ = abc.ABCMeta
+
+    is_up: bool
+    pending: typing.Deque[bytes]
+    drain_waiter: typing.Optional[asyncio.Future]
+
+    def __init__(
+        self,
+        *,
+        mtu: int = 1500,
+        write_high_water: int = 256,
+        logger: logging.Logger = logging.getLogger("tapws.device"),
+    ) -> None:
+        self.is_up = False
+        self.read_size = max_frame_size(mtu)
+        self.pending = deque()
+        self.write_high_water = write_high_water
+        self.write_low_water = write_high_water // 4
+        self.drain_waiter = None
+        self.loop = None
+        self.logger = logger
+
+    @abc.abstractmethod
+    def fileno(self) -> int:
+        raise NotImplementedError
+
+    @property
+    @abc.abstractmethod
+    def hwaddr(self) -> bytes:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def open(self) -> None:
+        """
+        Bring the device up and switch it to non-blocking mode.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def close(self) -> None:
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def read(self) -> bytes:
+        """
+        Read one frame, raises BlockingIOError (or an OSError with EAGAIN) if none is queued.
+        """
+        raise NotImplementedError
+
+    @abc.abstractmethod
+    def write_frame(self, message: bytes) -> None:
+        """
+        Write one frame, raises BlockingIOError (or an OSError with EAGAIN) if the device is full.
+        """
+        raise NotImplementedError
+
+    def read_into(self, buffer: bytearray) -> int:
+        """
+        Read one frame into `buffer` and return its size.
+        Backends that can read in place override this, the default copies.
+        """
+        frame = self.read()
+        size = len(frame)
+        buffer[:size] = frame
+        return size
+
+    async def start(self) -> None:
+        if not self.is_up:
+            self.open()
+            self.loop = asyncio.get_running_loop()
+            self.is_up = True
+
+    async def stop(self) -> None:
+        if self.is_up:
+            if self.pending:
+                self._cancel_writable()
+                self.pending.clear()
+            self._wakeup_writers()
+            self.close()
+            self.is_up = False
+
+    def read_batch(self, max_frames: int) -> typing.List[bytes]:
+        """
+        Drain up to `max_frames` frames from the device.
+        Reading stops as soon as the device queue is empty (EAGAIN).
+        """
+        frames = []
+        read = self.read
+        try:
+            for _ in range(max_frames):
+                frames.append(read())
+        except OSError as e:
+            if not would_block(e):
+                raise e
+        return frames
+
+    async def awrite(self, message: bytes) -> None:
+        """
+        Write the frame without leaving the event loop.
+        Waits (backpressure) only when the device queue is full and too many frames are pending.
+        """
+        self.write(message)
+        if len(self.pending) >= self.write_high_water:
+            await self.drain()
+
+    async def drain(self) -> None:
+        if not self.pending:
+            return
+        if self.drain_waiter is None:
+            self.drain_waiter = asyncio.get_running_loop().create_future()
+        await asyncio.shield(self.drain_waiter)
+
+    def write(self, message: bytes) -> None:
+        if self.pending:
+            # keep the frames ordered behind the ones waiting for the device
+            self.pending.append(message)
+            return
+        try:
+            self.write_frame(message)
+        except OSError as e:
+            if not would_block(e):
+                self.logger.error(f"Error writing to device: {e}")
+                return
+            self.pending.append(message)
+            self._wait_writable()
+
+    def _wait_writable(self) -> None:
+        """
+        Call `_flush` once the device can take frames again.
+        """
+        self.loop.add_writer(self.fileno(), self._flush)  # type: ignore
+
+    def _cancel_writable(self) -> None:
+        self.loop.remove_writer(self.fileno())  # type: ignore
+
+    def _flush(self) -> None:
+        pending = self.pending
+        write = self.write_frame
+        while pending:
+            try:
+                write(pending[0])
+            except OSError as e:
+                if would_block(e):
+                    break
+                self.logger.error(f"Error writing to device: {e}")
+            pending.popleft()
+
+        if not pending:
+            self._cancel_writable()
+        if len(pending) <= self.write_low_water:
+            self._wakeup_writers()
+
+    def _wakeup_writers(self) -> None:
+        if self.drain_waiter is not None:
+            if not self.drain_waiter.done():
+                self.drain_waiter.set_result(None)
+            self.drain_waiter = None
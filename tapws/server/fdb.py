@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import logging
+import time
+import typing
+
+from .connection import Connection
+from ..utils import format_mac
+
+
+class FDBEntry:  # pragma: no cover
+    __slots__ = ("mac", "connection", "updated_at")
+
+    def __init__(self, mac: bytes, connection: Connection, updated_at: float) -> None:
+        self.mac = mac
+        self.connection = connection
+        self.updated_at = updated_at
+
+    def __repr__(self) -> str:
+        return f"FDBEntry({format_mac(self.mac)}, {self.connection})"
+
+
+class ForwardingDatabase(object):
+    """
+    Learning bridge forwarding database.
+    Maps the source MAC addresses seen on each connection to that connection.
+    Entries which are not refreshed within `aging_time` seconds are removed by `expire`.
+    """
+
+    __slots__ = (
+        "entries",
+        "aging_time",
+        "max_macs",
+        "sweep_interval",
+        "clock",
+        "on_learn",
+        "on_forget",
+        "logger",
+        "is_debug",
+    )
+    entries: typing.Dict[bytes, FDBEntry]
+    on_learn: typing.Optional[typing.Callable[[bytes], None]]
+    on_forget: typing.Optional[typing.Callable[[bytes], None]]
+
+    def __init__(
+        self,
+        *,
+        aging_time: float = 300,
+        max_macs: int = 16,
+        sweep_interval: float = 1.0,
+        clock: typing.Callable[[], float] = time.monotonic,
+        logger: logging.Logger = logging.getLogger("tapws.fdb"),
+    ) -> None:
+        self.entries = {}
+        self.aging_time = aging_time
+        self.max_macs = max_macs
+        self.sweep_interval = sweep_interval
+        self.clock = clock
+        self.on_learn = None
+        self.on_forget = None
+        self.logger = logger
+        self.is_debug = self.logger.isEnabledFor(logging.DEBUG)
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def lookup(self, mac: bytes) -> typing.Optional[Connection]:
+        entry = self.entries.get(mac)
+        if entry is None:
+            return None
+        return entry.connection
+
+    def learn(self, mac: bytes, connection: Connection) -> bool:
+        """
+        Learn (or refresh) the source MAC address of a frame received from the connection.
+        Returns False if the MAC can not be learned (group address or the connection is full).
+        """
+        entry = self.entries.get(mac)
+        if entry is not None and entry.connection is connection:
+            entry.updated_at = self.clock()
+            return True
+
+        if mac[0] & 1:
+            # never learn group (broadcast / multicast) source addresses
+            return False
+
+        if len(connection.macs) >= self.max_macs:
+            if self.is_debug:
+                self.logger.debug(
+                    f"{connection} reached {self.max_macs} MACs, not learning {format_mac(mac)}"
+                )
+            return False
+
+        if entry is not None:
+            self.logger.info(
+                f"MAC {format_mac(mac)} moved from {entry.connection} to {connection}"
+            )
+            entry.connection.macs.discard(mac)
+            entry.connection = connection
+            entry.updated_at = self.clock()
+        else:
+            if self.is_debug:
+                self.logger.debug(f"Learned {format_mac(mac)} on {connection}")
+            self.entries[mac] = FDBEntry(mac, connection, self.clock())
+            if self.on_learn is not None:
+                self.on_learn(mac)
+        connection.macs.add(mac)
+        return True
+
+    def forget(self, connection: Connection) -> None:
+        for mac in connection.macs:
+            entry = self.entries.get(mac)
+            if entry is not None and entry.connection is connection:
+                del self.entries[mac]
+                if self.on_forget is not None:
+                    self.on_forget(mac)
+        connection.macs.clear()
+
+    def expire(self) -> int:
+        deadline = self.clock() - self.aging_time
+        expired = [
+            entry for entry in self.entries.values() if entry.updated_at < deadline
+        ]
+        for entry in expired:
+            if self.is_debug:
+                self.logger.debug(f"Aging out {entry}")
+            del self.entries[entry.mac]
+            entry.connection.macs.discard(entry.mac)
+            if self.on_forget is not None:
+                self.on_forget(entry.mac)
+        return len(expired)
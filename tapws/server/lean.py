@@ -0,0 +1,436 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Lean websocket engine.
+
+Implements only the subset of RFC 6455 tapws needs: the opening handshake, binary messages
+(fragmented or not), ping / pong and the closing handshake. There are no extensions and no
+keepalive pings from the server. Frames are parsed in `data_received` and written to the tap
+device right away, without a task or a future per message.
+"""
+
+import asyncio
+import base64
+import hashlib
+import logging
+import ssl
+import struct
+import typing
+
+from websockets.frames import apply_mask
+
+from .batching import unpack
+from .connection import Connection
+
+if typing.TYPE_CHECKING:
+    from .device import BaseDevice
+    from .websocket import WebSocket
+
+OP_CONTINUATION = 0x0
+OP_TEXT = 0x1
+OP_BINARY = 0x2
+OP_CLOSE = 0x8
+OP_PING = 0x9
+OP_PONG = 0xA
+
+CLOSE_GOING_AWAY = 1001
+CLOSE_PROTOCOL_ERROR = 1002
+CLOSE_MESSAGE_TOO_BIG = 1009
+
+GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC85B11"
+MAX_REQUEST_SIZE = 8192
+
+_short = struct.Struct("!BBH")
+_long = struct.Struct("!BBQ")
+
+
+def frame_header(length: int, opcode: int = OP_BINARY) -> bytes:
+    """
+    Header of an unmasked final frame (server to client).
+    """
+    if length < 126:
+        return bytes((0x80 | opcode, length))
+    if length < 0x10000:
+        return _short.pack(0x80 | opcode, 126, length)
+    return _long.pack(0x80 | opcode, 127, length)
+
+
+def accept_key(key: bytes) -> bytes:
+    return base64.b64encode(hashlib.sha1(key + GUID).digest())
+
+
+def parse_request(request: bytes) -> typing.Dict[bytes, bytes]:
+    """
+    Return the lower-cased headers of a websocket upgrade request.
+    :exception: ValueError if it is not one
+    """
+    lines = request.split(b"\r\n")
+    method, _, _ = lines[0].partition(b" ")
+    if method != b"GET":
+        raise ValueError("Not a GET request")
+    headers = {}
+    for line in lines[1:]:
+        name, _, value = line.partition(b":")
+        headers[name.strip().lower()] = value.strip()
+    if b"websocket" not in headers.get(b"upgrade", b"").lower():
+        raise ValueError("Missing Upgrade: websocket")
+    if b"upgrade" not in headers.get(b"connection", b"").lower():
+        raise ValueError("Missing Connection: upgrade")
+    if headers.get(b"sec-websocket-version") != b"13":
+        raise ValueError("Unsupported websocket version")
+    if not headers.get(b"sec-websocket-key"):
+        raise ValueError("Missing Sec-WebSocket-Key")
+    return headers
+
+
+class LeanConnection(Connection):
+    """
+    `Connection` of a lean engine client, the prepared frames go straight to the transport.
+    """
+
+    __slots__ = ()
+
+    def send_prepared(self, message: bytes, frame: bytes) -> bool:
+        protocol = self.websocket
+        transport = protocol.transport
+        if (
+            self.queue
+            or self.batcher is not None
+            or protocol.closing
+            or transport.get_write_buffer_size() >= protocol.write_limit
+        ):
+            return self.send(message)
+        transport.write(frame)
+        return True
+
+
+class LeanProtocol(asyncio.Protocol):
+    """
+    One client of the lean engine.
+    """
+
+    transport: typing.Optional[asyncio.Transport]
+    connection: typing.Optional[LeanConnection]
+    drain_waiter: typing.Optional[asyncio.Future]
+
+    def __init__(self, server: "LeanServer") -> None:
+        self.server = server
+        self.switch = server.switch
+        self.device = server.device
+        self.max_size = server.max_size
+        self.write_limit = 1 << 16
+        self.transport = None
+        self.connection = None
+        self.subprotocol = None
+        self.buffer = bytearray()
+        self.fragments = []
+        self.fragments_size = 0
+        self.closing = False
+        self.paused_reading = False
+        self.drain_waiter = None
+
+    def __repr__(self) -> str:
+        if self.transport is None:
+            return "LeanProtocol()"
+        return f"LeanProtocol({self.transport.get_extra_info('peername')})"
+
+    def connection_made(self, transport: asyncio.BaseTransport) -> None:
+        self.transport = transport  # type: ignore
+        self.server.protocols.add(self)
+
+    def connection_lost(self, exc: typing.Optional[Exception]) -> None:
+        self.server.protocols.discard(self)
+        self.closing = True
+        if self.connection is not None:
+            self.switch.unregister(self.connection)
+            self.connection = None
+        self._wakeup_writer(ConnectionResetError("Connection lost"))
+
+    def pause_writing(self) -> None:
+        if self.drain_waiter is None:
+            self.drain_waiter = asyncio.get_running_loop().create_future()
+
+    def resume_writing(self) -> None:
+        self._wakeup_writer()
+
+    def _wakeup_writer(self, exc: typing.Optional[Exception] = None) -> None:
+        waiter = self.drain_waiter
+        self.drain_waiter = None
+        if waiter is not None and not waiter.done():
+            if exc is None:
+                waiter.set_result(None)
+            else:
+                waiter.set_exception(exc)
+
+    async def send(self, message: bytes) -> None:
+        """
+        Send a binary message, used by the `Connection` writer.
+        """
+        if self.closing:
+            raise ConnectionResetError("Connection closed")
+        # one copy, the transport must not keep a reference to a pooled frame
+        self.transport.write(frame_header(len(message)) + message)  # type: ignore
+        if self.drain_waiter is not None:
+            await asyncio.shield(self.drain_waiter)
+
+    def data_received(self, data: bytes) -> None:
+        buffer = self.buffer
+        if buffer:
+            buffer += data
+            data = buffer
+        if self.connection is None:
+            rest = self.handshake(data)
+            if rest is data:
+                # incomplete request
+                self.keep(data, 0)
+                return
+            buffer.clear()
+            if self.connection is None:
+                return
+            data = rest
+        self.keep(data, self.parse(data))
+
+    def keep(self, data: bytes, offset: int) -> None:
+        """
+        Keep the unparsed bytes of `data` from `offset` on for the next read.
+        """
+        buffer = self.buffer
+        if data is buffer:
+            del buffer[:offset]
+        else:
+            buffer += memoryview(data)[offset:]
+
+    def handshake(self, data: bytes) -> bytes:
+        """
+        Answer the opening handshake once the request is complete, returns the bytes after it
+        (a copy) or `data` itself while the request is incomplete.
+        """
+        end = data.find(b"\r\n\r\n")
+        if end < 0:
+            if len(data) > MAX_REQUEST_SIZE:
+                self.reject()
+                return b""
+            return data
+        try:
+            headers = parse_request(bytes(data[:end]))
+        except ValueError as e:
+            self.server.logger.info(f"Rejected handshake: {e}")
+            self.reject()
+            return b""
+
+        response = [
+            b"HTTP/1.1 101 Switching Protocols",
+            b"Upgrade: websocket",
+            b"Connection: Upgrade",
+            b"Sec-WebSocket-Accept: " + accept_key(headers[b"sec-websocket-key"]),
+        ]
+        offered = [
+            protocol.strip().decode("ascii", "replace")
+            for protocol in headers.get(b"sec-websocket-protocol", b"").split(b",")
+        ]
+        for subprotocol in self.server.subprotocols:
+            if subprotocol in offered:
+                self.subprotocol = subprotocol
+                response.append(b"Sec-WebSocket-Protocol: " + subprotocol.encode())
+                break
+        self.transport.write(b"\r\n".join(response) + b"\r\n\r\n")  # type: ignore
+
+        switch = self.switch
+        self.connection = LeanConnection(
+            self,  # type: ignore
+            queue_size=switch.queue_size,
+            drop_policy=switch.drop_policy,
+        )
+        if self.subprotocol is not None:
+            self.connection.enable_batching(
+                switch.batch_flush_size, switch.batch_flush_interval
+            )
+        switch.register(self.connection)
+        return bytes(data[end + 4 :])
+
+    def reject(self) -> None:
+        self.transport.write(  # type: ignore
+            b"HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\nConnection: close\r\n\r\n"
+        )
+        self.closing = True
+        self.transport.close()  # type: ignore
+
+    def parse(self, data: bytes) -> int:
+        """
+        Handle every complete frame in `data`, returns the offset of the incomplete tail.
+        """
+        with memoryview(data) as view:
+            return self._parse(data, view)
+
+    def _parse(self, data: bytes, view: memoryview) -> int:
+        offset = 0
+        end = len(data)
+        while not self.closing and end - offset >= 2:
+            first, second = data[offset], data[offset + 1]
+            length = second & 0x7F
+            position = offset + 2
+            if length == 126:
+                if end - position < 2:
+                    break
+                length = (data[position] << 8) | data[position + 1]
+                position += 2
+            elif length == 127:
+                if end - position < 8:
+                    break
+                length = int.from_bytes(data[position : position + 8], "big")
+                position += 8
+            if not second & 0x80:
+                # client frames must be masked
+                self.close(CLOSE_PROTOCOL_ERROR)
+                break
+            opcode = first & 0x0F
+            if opcode & 0x08 and (length > 125 or not first & 0x80):
+                # control frames are short and never fragmented
+                self.close(CLOSE_PROTOCOL_ERROR)
+                break
+            if length + self.fragments_size > self.max_size:
+                self.close(CLOSE_MESSAGE_TOO_BIG)
+                break
+            if end - position < 4 + length:
+                break
+            mask = data[position : position + 4]
+            position += 4
+            # unmasking is the only copy of the payload
+            payload = apply_mask(view[position : position + length], mask)
+            offset = position + length
+            self.frame(first & 0x80, opcode, payload)
+        return offset
+
+    def frame(self, fin: int, opcode: int, payload: bytes) -> None:
+        if opcode == OP_BINARY or opcode == OP_TEXT:
+            if self.fragments:
+                # a new message before the end of the fragmented one
+                self.close(CLOSE_PROTOCOL_ERROR)
+            elif fin:
+                self.message(opcode, payload)
+            else:
+                self.fragments = [opcode, payload]
+                self.fragments_size = len(payload)
+        elif opcode == OP_CONTINUATION:
+            if not self.fragments:
+                self.close(CLOSE_PROTOCOL_ERROR)
+                return
+            self.fragments.append(payload)
+            self.fragments_size += len(payload)
+            if fin:
+                opcode, *chunks = self.fragments
+                self.fragments = []
+                self.fragments_size = 0
+                self.message(opcode, b"".join(chunks))
+        elif opcode == OP_PING:
+            self.transport.write(frame_header(len(payload), OP_PONG) + payload)  # type: ignore
+        elif opcode == OP_CLOSE:
+            # echo the status code and close
+            self.close(payload[:2])
+        elif opcode != OP_PONG:
+            self.close(CLOSE_PROTOCOL_ERROR)
+
+    def message(self, opcode: int, message: bytes) -> None:
+        connection = self.connection
+        if opcode == OP_TEXT:
+            # tapws only carries frames
+            connection.invalid += 1  # type: ignore
+            return
+        if self.subprotocol is None:
+            frames = [message]
+        else:
+            try:
+                frames = unpack(message)
+            except ValueError:
+                self.close(CLOSE_PROTOCOL_ERROR)
+                return
+        route = self.switch.route
+        device = self.device
+        for frame in frames:
+            if route(frame, connection):  # type: ignore
+                device.write(frame)
+        if len(device.pending) >= device.write_high_water and not self.paused_reading:
+            # the tap device is full, stop reading from the client until it drains
+            self.paused_reading = True
+            self.transport.pause_reading()  # type: ignore
+            waiter = asyncio.ensure_future(device.drain())
+            waiter.add_done_callback(self._resume_reading)
+
+    def _resume_reading(self, _: asyncio.Future) -> None:
+        self.paused_reading = False
+        if not self.closing:
+            self.transport.resume_reading()  # type: ignore
+
+    def close(self, code: typing.Union[int, bytes] = CLOSE_GOING_AWAY) -> None:
+        if self.closing:
+            return
+        self.closing = True
+        if isinstance(code, int):
+            code = code.to_bytes(2, "big")
+        self.transport.write(frame_header(len(code), OP_CLOSE) + code)  # type: ignore
+        self.transport.close()  # type: ignore
+
+
+class LeanServer(object):
+    """
+    Listens for lean engine clients, awaiting it starts the server like `websockets.serve`.
+    """
+
+    server: typing.Optional[asyncio.AbstractServer]
+    protocols: typing.Set[LeanProtocol]
+
+    def __init__(
+        self,
+        switch: "WebSocket",
+        device: "BaseDevice",
+        host: str,
+        port: int,
+        *,
+        ssl: typing.Optional[ssl.SSLContext] = None,
+        subprotocols: typing.Optional[typing.List[str]] = None,
+        reuse_port: bool = False,
+        max_size: int = 1 << 20,
+        logger: logging.Logger = logging.getLogger("tapws.lean"),
+    ) -> None:
+        self.switch = switch
+        self.device = device
+        self.host = host
+        self.port = port
+        self.ssl = ssl
+        self.subprotocols = subprotocols or []
+        self.reuse_port = reuse_port
+        self.max_size = max_size
+        self.logger = logger
+        self.server = None
+        self.protocols = set()
+
+    def __await__(self):
+        return self.start().__await__()
+
+    async def start(self) -> "LeanServer":
+        loop = asyncio.get_running_loop()
+        self.server = await loop.create_server(
+            lambda: LeanProtocol(self),
+            self.host,
+            self.port,
+            ssl=self.ssl,
+            reuse_port=self.reuse_port,
+        )
+        return self
+
+    @property
+    def sockets(self) -> typing.Tuple:
+        if self.server is None:
+            return ()
+        return self.server.sockets
+
+    def close(self) -> None:
+        if self.server is not None:
+            self.server.close()
+        for protocol in list(self.protocols):
+            protocol.close(CLOSE_GOING_AWAY)
+
+    async def wait_closed(self) -> None:
+        if self.server is not None:
+            await self.server.wait_closed()
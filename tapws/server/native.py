@@ -0,0 +1,148 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import fcntl
+import logging
+import os
+import socket
+import struct
+from .device import BaseDevice, IFF_TAP, IFF_NO_PI, IFF_VNET_HDR
+from .offload import (
+    TUN_F_CSUM,
+    TUN_F_TSO4,
+    TUN_F_TSO6,
+    VNET_HDR_SIZE,
+    from_device,
+)
+
+# refs: linux/if_tun.h, linux/sockios.h
+TUNSETIFF = 0x400454CA
+TUNSETOFFLOAD = 0x400454D0
+TUNSETVNETHDRSZ = 0x400454D8
+SIOCGIFFLAGS = 0x8913
+SIOCSIFFLAGS = 0x8914
+SIOCSIFADDR = 0x8916
+SIOCSIFNETMASK = 0x891C
+SIOCSIFMTU = 0x8922
+SIOCGIFHWADDR = 0x8927
+IFF_UP = 0x1
+
+IFREQ_SIZE = 40
+# largest GSO super-packet the kernel hands over
+MAX_GSO_SIZE = 0xFFFF
+
+
+def ifreq(name: bytes, fmt: str = "", *args) -> bytes:
+    data = struct.pack("16s" + fmt, name, *args)
+    return data + bytes(IFREQ_SIZE - len(data))
+
+
+class NativeTapDevice(BaseDevice):
+    """
+    TAP device opened straight from /dev/net/tun with ioctls, without pytun.
+    Supports the multi-queue (IFF_MULTI_QUEUE) and virtio-net header (IFF_VNET_HDR) flags.
+    With `offload` the kernel skips checksums and TCP segmentation (TUNSETOFFLOAD),
+    large frames are read into a preallocated buffer and segmented only when delivered to clients.
+    """
+
+    def __init__(
+        self,
+        interface: str,
+        address: str,
+        netmask: str,
+        mtu: int,
+        *,
+        flags: int = (IFF_TAP | IFF_NO_PI),
+        write_high_water: int = 256,
+        offload: bool = False,
+        path: str = "/dev/net/tun",
+        logger: logging.Logger = logging.getLogger("tapws.nativetap"),
+    ) -> None:
+        super().__init__(mtu=mtu, write_high_water=write_high_water, logger=logger)
+        if offload:
+            flags |= IFF_VNET_HDR
+        try:
+            self.fd = os.open(path, os.O_RDWR | os.O_CLOEXEC)
+        except OSError as e:
+            self.logger.error(f"Error opening device: {e.errno} {e.strerror}")
+            if isinstance(e, (PermissionError, FileNotFoundError)):
+                self.logger.error(
+                    "You need to run as root or with sudo to open the TAP interface"
+                )
+                self.logger.error(f"If you are using docker, add --privileged flag")
+            raise e
+
+        try:
+            result = fcntl.ioctl(
+                self.fd, TUNSETIFF, ifreq(interface.encode(), "H", flags)
+            )
+            self.name = result[:16].rstrip(b"\x00")
+            self.vnet_hdr_size = 0
+            if flags & IFF_VNET_HDR:
+                self.vnet_hdr_size = VNET_HDR_SIZE
+                fcntl.ioctl(
+                    self.fd, TUNSETVNETHDRSZ, struct.pack("i", self.vnet_hdr_size)
+                )
+            self.vnet_hdr = bytes(self.vnet_hdr_size)
+            if offload:
+                fcntl.ioctl(
+                    self.fd, TUNSETOFFLOAD, TUN_F_CSUM | TUN_F_TSO4 | TUN_F_TSO6
+                )
+                self.read_size = MAX_GSO_SIZE
+            self.buffer = bytearray(self.vnet_hdr_size + self.read_size)
+            self.view = memoryview(self.buffer)
+            self.configure(address, netmask, mtu)
+        except OSError as e:
+            os.close(self.fd)
+            self.logger.error(f"Error configuring device: {e}")
+            raise e
+
+    def ioctl(self, request: int, data: bytes) -> bytes:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            return fcntl.ioctl(sock.fileno(), request, data)  # type: ignore
+
+    def configure(self, address: str, netmask: str, mtu: int) -> None:
+        if address:
+            self.ioctl(SIOCSIFADDR, self.sockaddr(address))
+        if netmask:
+            self.ioctl(SIOCSIFNETMASK, self.sockaddr(netmask))
+        if mtu:
+            self.ioctl(SIOCSIFMTU, ifreq(self.name, "i", mtu))
+
+    def sockaddr(self, address: str) -> bytes:
+        return ifreq(self.name, "H2s4s", socket.AF_INET, b"", socket.inet_aton(address))
+
+    def fileno(self) -> int:
+        return self.fd
+
+    @property
+    def hwaddr(self) -> bytes:
+        return self.ioctl(SIOCGIFHWADDR, ifreq(self.name))[18:24]
+
+    def open(self) -> None:
+        flags = struct.unpack_from("H", self.ioctl(SIOCGIFFLAGS, ifreq(self.name)), 16)
+        self.ioctl(SIOCSIFFLAGS, ifreq(self.name, "H", flags[0] | IFF_UP))
+        os.set_blocking(self.fd, False)
+
+    def close(self) -> None:
+        self.view.release()
+        os.close(self.fd)
+
+    def read(self) -> bytes:
+        if not self.vnet_hdr_size:
+            return os.read(self.fd, self.read_size)
+        size = os.readv(self.fd, (self.buffer,))
+        return from_device(self.view[:size])
+
+    def read_into(self, buffer: bytearray) -> int:
+        if self.vnet_hdr_size:
+            # the header has to be parsed, see read()
+            return super().read_into(buffer)
+        return os.readv(self.fd, (buffer,))
+
+    def write_frame(self, message: bytes) -> None:
+        if not self.vnet_hdr_size:
+            os.write(self.fd, message)
+            return
+        # no offload requested, an all zero header
+        os.writev(self.fd, (self.vnet_hdr, message))
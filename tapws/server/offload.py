@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import struct
+import typing
+
+# refs: linux/virtio_net.h, linux/if_tun.h
+VIRTIO_NET_HDR_F_NEEDS_CSUM = 1
+VIRTIO_NET_HDR_GSO_NONE = 0
+VIRTIO_NET_HDR_GSO_TCPV4 = 1
+VIRTIO_NET_HDR_GSO_TCPV6 = 4
+VIRTIO_NET_HDR_GSO_ECN = 0x80
+
+TUN_F_CSUM = 0x01
+TUN_F_TSO4 = 0x02
+TUN_F_TSO6 = 0x04
+
+# struct virtio_net_hdr (flags, gso_type, hdr_len, gso_size, csum_start, csum_offset)
+# in host byte order, tapws only runs on little-endian hosts
+vnet_header = struct.Struct("<BBHHHH")
+VNET_HDR_SIZE = vnet_header.size
+
+TCP_FIN = 0x01
+TCP_PSH = 0x08
+TCP_CWR = 0x80
+
+
+def ones_sum(data: bytes) -> int:
+    """
+    16 bit one's complement sum, 65536 is 1 modulo 65535 so the sum of the words is
+    the whole buffer read as one big number modulo 65535.
+    """
+    if len(data) & 1:
+        data = data + b"\x00"
+    total = int.from_bytes(data, "big") % 0xFFFF
+    if total or not data.strip(b"\x00"):
+        return total
+    return 0xFFFF
+
+
+def checksum(data: bytes, initial: int = 0) -> int:
+    total = ones_sum(data) + initial
+    total = (total & 0xFFFF) + (total >> 16)
+    total = (total & 0xFFFF) + (total >> 16)
+    return ~total & 0xFFFF
+
+
+class GSOFrame(bytes):
+    """
+    Frame read with a virtio-net header that still needs work before a client can use it:
+    a TCP super-packet larger than the MTU (GSO) and/or a partial checksum.
+    Stays in one piece while it is switched and is only segmented when delivered to clients.
+    """
+
+    header: bytes
+
+    @classmethod
+    def from_header(cls, header: bytes, frame: bytes) -> "GSOFrame":
+        instance = cls(frame)
+        instance.header = header
+        return instance
+
+    def segments(self) -> typing.List[bytes]:
+        flags, gso_type, _, gso_size, csum_start, csum_offset = vnet_header.unpack(
+            self.header
+        )
+        gso_type &= ~VIRTIO_NET_HDR_GSO_ECN
+        if gso_type in (VIRTIO_NET_HDR_GSO_TCPV4, VIRTIO_NET_HDR_GSO_TCPV6):
+            return segment_tcp(bytes(self), gso_type, gso_size, csum_start)
+        if flags & VIRTIO_NET_HDR_F_NEEDS_CSUM:
+            return [complete_checksum(bytes(self), csum_start, csum_offset)]
+        return [bytes(self)]
+
+
+def from_device(data: typing.Union[bytes, memoryview]) -> bytes:
+    """
+    Split what the device returned into the virtio-net header and the frame.
+    Frames that need no more work are returned as plain bytes.
+    """
+    header = bytes(data[:VNET_HDR_SIZE])
+    frame = bytes(data[VNET_HDR_SIZE:])
+    flags, gso_type = header[0], header[1]
+    if gso_type == VIRTIO_NET_HDR_GSO_NONE and not (
+        flags & VIRTIO_NET_HDR_F_NEEDS_CSUM
+    ):
+        return frame
+    return GSOFrame.from_header(header, frame)
+
+
+def complete_checksum(frame: bytes, csum_start: int, csum_offset: int) -> bytes:
+    """
+    The checksum field holds the pseudo header sum, add the rest of the packet to it.
+    """
+    packet = bytearray(frame)
+    position = csum_start + csum_offset
+    struct.pack_into(">H", packet, position, checksum(packet[csum_start:]))
+    return bytes(packet)
+
+
+def segment_tcp(
+    frame: bytes, gso_type: int, gso_size: int, tcp_offset: int
+) -> typing.List[bytes]:
+    """
+    Cut a TCP super-packet into `gso_size` payload segments with their own IP and TCP headers.
+    """
+    tcp_header_size = (frame[tcp_offset + 12] >> 4) * 4
+    header_size = tcp_offset + tcp_header_size
+    payload = memoryview(frame)[header_size:]
+    size = gso_size or len(payload) or 1
+
+    ipv4 = gso_type == VIRTIO_NET_HDR_GSO_TCPV4
+    ip_offset = _ip_offset(frame)
+    ip_header_size = tcp_offset - ip_offset
+    if ipv4:
+        src_dst = frame[ip_offset + 12 : ip_offset + 20]
+    else:
+        src_dst = frame[ip_offset + 8 : ip_offset + 40]
+    # the checksums are computed from scratch, the partial one only covers the super-packet
+    pseudo = ones_sum(src_dst) + 6
+    seq = int.from_bytes(frame[tcp_offset + 4 : tcp_offset + 8], "big")
+    ip_id = int.from_bytes(frame[ip_offset + 4 : ip_offset + 6], "big")
+    tcp_flags = frame[tcp_offset + 13]
+
+    segments = []
+    last = max(len(payload) - 1, 0) // size
+    for index in range(last + 1):
+        chunk = payload[index * size : (index + 1) * size]
+        segment = bytearray(frame[:header_size])
+        segment += chunk
+        tcp_length = tcp_header_size + len(chunk)
+
+        if ipv4:
+            struct.pack_into(">H", segment, ip_offset + 2, ip_header_size + tcp_length)
+            struct.pack_into(">H", segment, ip_offset + 4, (ip_id + index) & 0xFFFF)
+            struct.pack_into(">H", segment, ip_offset + 10, 0)
+            struct.pack_into(
+                ">H",
+                segment,
+                ip_offset + 10,
+                checksum(segment[ip_offset:tcp_offset]),
+            )
+        else:
+            struct.pack_into(">H", segment, ip_offset + 4, tcp_length)
+
+        struct.pack_into(
+            ">I", segment, tcp_offset + 4, (seq + index * size) & 0xFFFFFFFF
+        )
+        flags = tcp_flags
+        if index != last:
+            flags &= ~(TCP_FIN | TCP_PSH)
+        if index != 0:
+            flags &= ~TCP_CWR
+        segment[tcp_offset + 13] = flags
+        struct.pack_into(">H", segment, tcp_offset + 16, 0)
+        struct.pack_into(
+            ">H",
+            segment,
+            tcp_offset + 16,
+            checksum(segment[tcp_offset:], pseudo + tcp_length),
+        )
+        segments.append(bytes(segment))
+    return segments
+
+
+def _ip_offset(frame: bytes) -> int:
+    offset = 14
+    # skip 802.1Q / 802.1ad tags
+    while frame[offset - 2 : offset] in (b"\x81\x00", b"\x88\xa8"):
+        offset += 4
+    return offset
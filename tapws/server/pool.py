@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import typing
+from collections import deque
+
+
+class PooledBuffer(bytearray):
+    """
+    Receive buffer owned by a `BufferPool`.
+    Frames read into it are handed around as memoryview slices, every holder that keeps
+    a frame after the call returns takes a reference and releases it once done.
+    """
+
+    __slots__ = ("pool", "refs", "view")
+
+    def __init__(self, pool: "BufferPool", size: int) -> None:
+        super().__init__(size)
+        self.pool = pool
+        self.refs = 0
+        self.view = memoryview(self)
+
+    def release(self) -> None:
+        self.refs -= 1
+        if self.refs == 0:
+            self.pool.recycle(self)
+
+
+class BufferPool(object):
+    """
+    Recycled receive buffers, `acquire` only allocates when every buffer is in use.
+    """
+
+    free: typing.Deque[PooledBuffer]
+
+    def __init__(self, count: int = 256, size: int = 4096) -> None:
+        self.count = count
+        self.size = size
+        self.free = deque(PooledBuffer(self, size) for _ in range(count))
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.free)
+
+    def acquire(self) -> PooledBuffer:
+        """
+        Return a buffer holding one reference for the caller.
+        """
+        try:
+            buffer = self.free.pop()
+        except IndexError:
+            self.misses += 1
+            buffer = PooledBuffer(self, self.size)
+        buffer.refs = 1
+        return buffer
+
+    def recycle(self, buffer: PooledBuffer) -> None:
+        if len(self.free) < self.count:
+            self.free.append(buffer)
+
+
+def retain(message: bytes) -> None:
+    """
+    Keep a pooled frame alive past the current call, plain bytes are left alone.
+    """
+    if message.__class__ is memoryview and message.obj.__class__ is PooledBuffer:
+        message.obj.refs += 1  # type: ignore
+
+
+def release(message: bytes) -> None:
+    if message.__class__ is memoryview and message.obj.__class__ is PooledBuffer:
+        message.obj.release()  # type: ignore
@@ -0,0 +1,395 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import asyncio
+import logging
+import os
+import struct
+import typing
+from collections import deque
+from multiprocessing import shared_memory
+from .device import BaseDevice, IFF_TAP, IFF_NO_PI
+
+# producer and consumer positions live on their own cache lines
+TAIL_OFFSET = 0
+HEAD_OFFSET = 64
+DATA_OFFSET = 128
+
+WRAP_MARKER = 0xFFFFFFFF
+
+_position = struct.Struct("<Q")
+_length = struct.Struct("<I")
+
+
+class FrameRing(object):
+    """
+    Single-producer / single-consumer frame queue in shared memory.
+    Every frame is stored as a 32 bit length followed by its bytes. Positions only grow,
+    the producer owns the tail and the consumer owns the head so no lock is needed.
+    The consumer is woken up through an eventfd (a pipe where eventfd is not available).
+
+    Create the ring before forking, both processes use the inherited object.
+    Objects sharing a ring in a process `acquire` it and `release` it when they are done,
+    the last one unmaps it and only the creating process unlinks the memory block.
+    """
+
+    __slots__ = (
+        "capacity",
+        "shm",
+        "buf",
+        "owner",
+        "users",
+        "tail",
+        "head",
+        "cached_head",
+        "dropped",
+        "rfd",
+        "wfd",
+        "wakeup",
+    )
+
+    def __init__(self, capacity: int = 1 << 20) -> None:
+        self.capacity = capacity
+        self.shm = shared_memory.SharedMemory(create=True, size=DATA_OFFSET + capacity)
+        self.buf = self.shm.buf
+        self.buf[:DATA_OFFSET] = bytes(DATA_OFFSET)
+        self.owner = os.getpid()
+        self.users = 0
+        # local copies of the positions, the producer only reads the shared head when full
+        self.tail = 0
+        self.head = 0
+        self.cached_head = 0
+        self.dropped = 0
+        if hasattr(os, "eventfd"):
+            self.rfd = self.wfd = os.eventfd(0, os.EFD_NONBLOCK)
+            self.wakeup = (1).to_bytes(8, "little")
+        else:  # pragma: no cover
+            self.rfd, self.wfd = os.pipe()
+            os.set_blocking(self.rfd, False)
+            os.set_blocking(self.wfd, False)
+            self.wakeup = b"\x01"
+
+    def fileno(self) -> int:
+        return self.rfd
+
+    def __len__(self) -> int:
+        return _position.unpack_from(self.buf, TAIL_OFFSET)[0] - (
+            _position.unpack_from(self.buf, HEAD_OFFSET)[0]
+        )
+
+    def _reserve(self, size: int) -> int:
+        """
+        Return the position where a record of `size` bytes starts, -1 if the ring is full.
+        """
+        capacity = self.capacity
+        tail = self.tail
+        offset = tail % capacity
+        contiguous = capacity - offset
+        needed = size if size <= contiguous else contiguous + size
+        if capacity - (tail - self.cached_head) < needed:
+            self.cached_head = _position.unpack_from(self.buf, HEAD_OFFSET)[0]
+            if capacity - (tail - self.cached_head) < needed:
+                return -1
+        if size > contiguous:
+            # not enough room before the end, skip to the start of the buffer
+            if contiguous >= 4:
+                _length.pack_into(self.buf, DATA_OFFSET + offset, WRAP_MARKER)
+            tail += contiguous
+        return tail
+
+    def _push(self, frame: bytes) -> bool:
+        size = len(frame) + 4
+        capacity = self.capacity
+        position = self.tail
+        offset = position % capacity
+        if size > capacity - offset or capacity - (position - self.cached_head) < size:
+            # wrapping around or running out of space, take the slow path
+            if size > capacity:
+                raise ValueError("Frame is larger than the ring")
+            position = self._reserve(size)
+            if position < 0:
+                self.dropped += 1
+                return False
+            offset = position % capacity
+        offset += DATA_OFFSET
+        _length.pack_into(self.buf, offset, len(frame))
+        self.buf[offset + 4 : offset + size] = frame
+        self.tail = position + size
+        return True
+
+    def _publish(self) -> None:
+        # the frames are in place, make them visible then wake the consumer up
+        _position.pack_into(self.buf, TAIL_OFFSET, self.tail)
+        try:
+            os.write(self.wfd, self.wakeup)
+        except BlockingIOError:  # pragma: no cover
+            # a wakeup is already pending
+            pass
+
+    def put(self, frame: bytes) -> bool:
+        if not self._push(frame):
+            return False
+        self._publish()
+        return True
+
+    def put_many(self, frames: typing.Iterable[bytes]) -> int:
+        """
+        Queue several frames with a single wakeup. Returns the number of frames queued.
+        """
+        count = 0
+        push = self._push
+        for frame in frames:
+            if not push(frame):
+                break
+            count += 1
+        if count:
+            self._publish()
+        return count
+
+    def get_many(self, max_frames: int) -> typing.List[bytes]:
+        # clear the wakeup before looking at the tail so no published frame is missed
+        self._clear_wakeup()
+        buf = self.buf
+        capacity = self.capacity
+        head = self.head
+        tail = _position.unpack_from(buf, TAIL_OFFSET)[0]
+
+        frames = []
+        while head < tail and len(frames) < max_frames:
+            offset = head % capacity
+            contiguous = capacity - offset
+            if contiguous < 4:
+                head += contiguous
+                continue
+            offset += DATA_OFFSET
+            size = _length.unpack_from(buf, offset)[0]
+            if size == WRAP_MARKER:
+                head += contiguous
+                continue
+            frames.append(bytes(buf[offset + 4 : offset + 4 + size]))
+            head += size + 4
+
+        self.head = head
+        _position.pack_into(buf, HEAD_OFFSET, head)
+        if head < tail:
+            # frames are left behind, make sure the consumer comes back for them
+            os.write(self.wfd, self.wakeup)
+        return frames
+
+    def get(self) -> bytes:
+        frames = self.get_many(1)
+        if not frames:
+            raise BlockingIOError("Ring is empty")
+        return frames[0]
+
+    def get_into(self, buffer: bytearray) -> int:
+        """
+        Copy the next frame straight from shared memory into `buffer`, returns its size.
+        """
+        self._clear_wakeup()
+        buf = self.buf
+        capacity = self.capacity
+        head = self.head
+        tail = _position.unpack_from(buf, TAIL_OFFSET)[0]
+
+        size = -1
+        while head < tail:
+            offset = head % capacity
+            contiguous = capacity - offset
+            if contiguous < 4:
+                head += contiguous
+                continue
+            offset += DATA_OFFSET
+            size = _length.unpack_from(buf, offset)[0]
+            if size == WRAP_MARKER:
+                size = -1
+                head += contiguous
+                continue
+            buffer[:size] = buf[offset + 4 : offset + 4 + size]
+            head += size + 4
+            break
+
+        self.head = head
+        _position.pack_into(buf, HEAD_OFFSET, head)
+        if head < tail:
+            os.write(self.wfd, self.wakeup)
+        if size < 0:
+            raise BlockingIOError("Ring is empty")
+        return size
+
+    def _clear_wakeup(self) -> None:
+        try:
+            os.read(self.rfd, 4096)
+        except BlockingIOError:
+            pass
+
+    def acquire(self) -> "FrameRing":
+        self.users += 1
+        return self
+
+    def release(self) -> None:
+        self.users -= 1
+        if self.users == 0:
+            self.close()
+
+    def unmap(self) -> None:
+        """
+        Release this process' view of the ring, the other process keeps using it.
+        """
+        if self.buf is None:
+            return
+        self.buf = None  # type: ignore
+        self.shm.close()
+        if self.rfd != self.wfd:  # pragma: no cover
+            os.close(self.wfd)
+        os.close(self.rfd)
+
+    def unlink(self) -> None:
+        """
+        Remove the memory block once every process has unmapped it, only its creator does.
+        """
+        if self.owner == os.getpid():
+            self.owner = -1
+            self.shm.unlink()
+
+    def close(self) -> None:
+        self.unmap()
+        self.unlink()
+
+
+class RingWrapper(BaseDevice):
+    """
+    Device backed by two shared memory rings, frames come from another process
+    (a sidecar or a sibling worker) instead of the kernel.
+    Without `rx` and `tx` the wrapper creates its own rings and `peer` is the far end,
+    the other process reads what the server writes and writes what the server reads there.
+
+    A full ring has no file descriptor to wait on, pending frames are retried
+    every `retry_interval` seconds until the other end catches up.
+    """
+
+    def __init__(
+        self,
+        interface: str,
+        address: str,
+        netmask: str,
+        mtu: int,
+        *,
+        rx: typing.Optional[FrameRing] = None,
+        tx: typing.Optional[FrameRing] = None,
+        capacity: int = 1 << 20,
+        hwaddr: typing.Optional[bytes] = None,
+        flags: int = (IFF_TAP | IFF_NO_PI),
+        write_high_water: int = 256,
+        retry_interval: float = 0.001,
+        logger: logging.Logger = logging.getLogger("tapws.ringwrapper"),
+    ) -> None:
+        super().__init__(mtu=mtu, write_high_water=write_high_water, logger=logger)
+        self.peer: typing.Optional[RingLink] = None
+        if rx is None or tx is None:
+            rx, tx = FrameRing(capacity), FrameRing(capacity)
+            self.peer = RingLink(tx, rx)
+        self.rx = rx.acquire()
+        self.tx = tx.acquire()
+        # locally administered unicast address
+        self._hwaddr = hwaddr or bytes((0x02,)) + os.urandom(5)
+        self.retry_interval = retry_interval
+        self.retry: typing.Optional[asyncio.TimerHandle] = None
+
+    def fileno(self) -> int:
+        return self.rx.fileno()
+
+    @property
+    def hwaddr(self) -> bytes:
+        return self._hwaddr
+
+    def open(self) -> None:
+        pass
+
+    def close(self) -> None:
+        if self.tx.dropped:
+            self.logger.info(f"The ring was full {self.tx.dropped} times")
+        self.rx.release()
+        self.tx.release()
+        if self.peer is not None:
+            self.peer.close()
+
+    def read(self) -> bytes:
+        return self.rx.get()
+
+    def read_into(self, buffer: bytearray) -> int:
+        return self.rx.get_into(buffer)
+
+    def read_batch(self, max_frames: int) -> typing.List[bytes]:
+        return self.rx.get_many(max_frames)
+
+    def write_frame(self, message: bytes) -> None:
+        if not self.tx.put(message):
+            raise BlockingIOError("Ring is full")
+
+    def write_many(self, messages: typing.Iterable[bytes]) -> None:
+        """
+        Queue several frames with a single wakeup, the ones that do not fit wait their turn.
+        """
+        messages = list(messages)
+        count = 0 if self.pending else self.tx.put_many(messages)
+        for message in messages[count:]:
+            self.write(message)
+
+    def _wait_writable(self) -> None:
+        self.retry = self.loop.call_later(self.retry_interval, self._retry)  # type: ignore
+
+    def _cancel_writable(self) -> None:
+        if self.retry is not None:
+            self.retry.cancel()
+            self.retry = None
+
+    def _retry(self) -> None:
+        self.retry = None
+        self._flush()
+        if self.pending and self.retry is None:
+            self._wait_writable()
+
+
+class RingLink(object):
+    """
+    One end of a bidirectional ring pair, with the socket methods `WorkerMesh` uses on its links.
+    """
+
+    __slots__ = ("rx", "tx", "received")
+
+    def __init__(self, rx: FrameRing, tx: FrameRing) -> None:
+        self.rx = rx.acquire()
+        self.tx = tx.acquire()
+        self.received = deque()
+
+    @classmethod
+    def pair(cls, capacity: int = 1 << 20) -> typing.Tuple["RingLink", "RingLink"]:
+        first, second = FrameRing(capacity), FrameRing(capacity)
+        return cls(first, second), cls(second, first)
+
+    def fileno(self) -> int:
+        return self.rx.fileno()
+
+    def setblocking(self, flag: bool) -> None:
+        # rings never block, a full ring raises BlockingIOError like a full socket buffer
+        pass
+
+    def send(self, message: bytes) -> int:
+        if not self.tx.put(message):
+            raise BlockingIOError("Ring is full")
+        return len(message)
+
+    def recv(self, size: int) -> bytes:
+        # drain the ring in batches, one wakeup clear for many frames
+        received = self.received
+        if not received:
+            received.extend(self.rx.get_many(256))
+            if not received:
+                raise BlockingIOError("Ring is empty")
+        return received.popleft()
+
+    def close(self) -> None:
+        # both ends map both rings, a ring goes away with the last end using it
+        self.rx.release()
+        self.tx.release()
@@ -8,8 +8,35 @@ from functools import partial
 from ..utils import on_done
 from .config import ServerConfig
 from ..services.base import BaseService
+from .device import (
+    BaseDevice,
+    IFF_TAP,
+    IFF_NO_PI,
+    IFF_MULTI_QUEUE,
+    max_frame_size,
+    would_block,
+)
+from .native import NativeTapDevice
 from .tuntap import TuntapWrapper
+from .pool import BufferPool
+from .wire import WireDevice
+from .ring import RingWrapper
 from .websocket import WebSocket
+from .stream import StreamListener
+from .datagram import DatagramEndpoint
+from .fdb import ForwardingDatabase
+from .snooping import MulticastSnooper
+
+if typing.TYPE_CHECKING:
+    from ..services.arp import ARPResponder
+    from .workers import WorkerMesh
+
+DEVICE_BACKENDS: typing.Dict[str, typing.Type[BaseDevice]] = {
+    "pytun": TuntapWrapper,
+    "native": NativeTapDevice,
+    "wire": WireDevice,
+    "ring": RingWrapper,
+}
 
 
 class Server(object):
@@ -21,21 +48,100 @@ class Server(object):
         *,
         services: typing.List[BaseService] = [],
         websocket_wrapper: typing.Type[WebSocket] = WebSocket,
-        tuntap_wrapper: typing.Type[TuntapWrapper] = TuntapWrapper,
+        tuntap_wrapper: typing.Optional[typing.Type[BaseDevice]] = None,
+        arp_responder: typing.Optional["ARPResponder"] = None,
+        mesh: typing.Optional["WorkerMesh"] = None,
         loop: typing.Optional[asyncio.AbstractEventLoop] = None,
         logger: logging.Logger = logging.getLogger("tapws.server")
     ) -> None:
         self.config = config
+        self.mesh = mesh
+        if tuntap_wrapper is None:
+            tuntap_wrapper = DEVICE_BACKENDS[self.config.device_backend]
+        device_kwargs = {}
+        if self.mesh is not None:
+            # every worker attaches its own queue of the same tap device
+            device_kwargs["flags"] = IFF_TAP | IFF_NO_PI | IFF_MULTI_QUEUE
+        if self.config.device_offload:
+            device_kwargs["offload"] = True
         self.device = tuntap_wrapper(
             self.config.private_interface,
             str(self.config.intra_ip),
             str(self.config.intra_network.netmask),
-            1500,
+            self.config.mtu,
+            **device_kwargs,
         )
 
+        self.pool = None
+        if self.config.buffer_pool_size and not self.config.device_offload:
+            self.pool = BufferPool(self.config.buffer_pool_size, self.device.read_size)
+
+        self.arp_responder = arp_responder
+        if self.arp_responder is not None:
+            self.arp_responder.router_mac = self.device.hwaddr
+
+        self.fdb = ForwardingDatabase(
+            aging_time=self.config.fdb_aging_time,
+            max_macs=self.config.fdb_max_macs,
+        )
+        if self.arp_responder is not None:
+            self.arp_responder.is_connected = self.is_connected
+
+        self.snooper = None
+        if self.config.multicast_snooping:
+            self.snooper = MulticastSnooper(
+                membership_timeout=self.config.multicast_membership_timeout
+            )
+
         self.ws = websocket_wrapper(
-            self.device.awrite, self.config.host, self.config.port, ssl=self.config.ssl
+            self.device.awrite,
+            self.config.host,
+            self.config.port,
+            ssl=self.config.ssl,
+            fdb=self.fdb,
+            queue_size=self.config.send_queue_size,
+            drop_policy=self.config.send_queue_policy,
+            local_switching=self.config.local_switching,
+            arp_responder=self.arp_responder,
+            snooper=self.snooper,
+            batching=self.config.frame_batching,
+            batch_flush_size=self.config.batch_flush_size,
+            batch_flush_interval=self.config.batch_flush_interval,
+            max_frame_size=max_frame_size(self.config.mtu),
+            mesh=self.mesh,
+            engine=self.config.websocket_engine,
+            device=self.device,
+            compression=self.config.compression,
         )
+        if self.mesh is not None:
+            self.mesh.attach(self.ws)
+
+        self.listeners = []
+        if self.config.stream_port:
+            self.listeners.append(
+                StreamListener(
+                    self.ws,
+                    host=self.config.host,
+                    port=self.config.stream_port,
+                    reuse_port=self.mesh is not None,
+                )
+            )
+        if self.config.stream_path:
+            self.listeners.append(StreamListener(self.ws, path=self.config.stream_path))
+        if self.config.datagram_port:
+            self.listeners.append(
+                DatagramEndpoint(
+                    self.ws,
+                    self.device,
+                    host=self.config.host,
+                    port=self.config.datagram_port,
+                    idle_timeout=self.config.datagram_idle_timeout,
+                    allow=self.config.datagram_allow,
+                    max_peers=self.config.datagram_max_peers,
+                    read_batch_size=self.config.read_batch_size,
+                    reuse_port=self.mesh is not None,
+                )
+            )
 
         self.services = services
         self.logger = logger
@@ -44,8 +150,70 @@ class Server(object):
         self.loop = loop
 
     def broadcast(self):
-        message = self.device.read()
-        self.ws.broadcast(message)
+        if self.pool is not None:
+            self.broadcast_pooled()
+            return
+
+        if self.config.read_batch_size == 1:
+            frame = self.device.read()
+            if self.arp_responder is not None and self.answer_arp(frame):
+                return
+            if self.mesh is not None and self.mesh.forward(frame):
+                return
+            self.ws.broadcast(frame)
+            return
+
+        self.dispatch(self.device.read_batch(self.config.read_batch_size))
+
+    def broadcast_pooled(self):
+        """
+        Read frames in place into pooled buffers and hand them over as memoryviews.
+        A buffer goes back to the pool once every recipient is done with its frame.
+        """
+        pool = self.pool
+        read_into = self.device.read_into
+        buffers = []
+        frames = []
+        try:
+            for _ in range(self.config.read_batch_size):
+                buffer = pool.acquire()  # type: ignore
+                try:
+                    size = read_into(buffer)
+                except OSError as e:
+                    buffer.release()
+                    if not would_block(e):
+                        raise e
+                    break
+                buffers.append(buffer)
+                frames.append(buffer.view[:size])
+            self.dispatch(frames)
+        finally:
+            for buffer in buffers:
+                buffer.release()
+
+    def dispatch(self, frames: typing.List[bytes]):
+        if self.arp_responder is not None:
+            frames = [frame for frame in frames if not self.answer_arp(frame)]
+        if self.mesh is not None:
+            # the kernel picks the queue by flow, so frames for sibling clients land here too
+            frames = [frame for frame in frames if not self.mesh.forward(frame)]
+        if frames:
+            self.ws.broadcast_many(frames)
+
+    def is_connected(self, mac: bytes) -> bool:
+        """
+        Whether the client using `mac` is attached here or to a sibling worker.
+        """
+        if self.fdb.lookup(mac) is not None:
+            return True
+        return self.mesh is not None and mac in self.mesh.remote
+
+    def answer_arp(self, frame: bytes) -> bool:
+        reply = self.arp_responder.reply_to_host(frame)  # type: ignore
+        if reply is None:
+            return False
+        self.device.write(reply)
+        return True
 
     async def start(self) -> None:
         self.logger.info("Starting service...")
@@ -53,6 +221,10 @@ class Server(object):
         self.loop.add_reader(self.device.fileno(), self.broadcast)
         await self.device.start()
         await self.ws.start()
+        for listener in self.listeners:
+            await listener.start()
+        if self.mesh is not None:
+            self.mesh.start(self.loop)
         for service in self.services:
             await service.start()
 
@@ -66,6 +238,10 @@ class Server(object):
         for service in self.services:
             await service.stop()
 
+        if self.mesh is not None:
+            self.mesh.stop()
+        for listener in self.listeners:
+            await listener.stop()
         await self.ws.stop()
         await self.device.stop()
         self._waiter_.set_result(None)
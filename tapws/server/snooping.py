@@ -0,0 +1,183 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import logging
+import time
+import typing
+
+from .connection import Connection
+from ..utils import format_mac
+
+ETH_TYPE_IPV4 = b"\x08\x00"
+ETH_TYPE_IPV6 = b"\x86\xdd"
+IP_PROTO_IGMP = 2
+IP6_NEXT_HOP_BY_HOP = 0
+IP6_NEXT_ICMP6 = 58
+
+IGMP_V1_REPORT = 0x12
+IGMP_V2_REPORT = 0x16
+IGMP_V2_LEAVE = 0x17
+IGMP_V3_REPORT = 0x22
+MLD_V1_REPORT = 131
+MLD_V1_DONE = 132
+MLD_V2_REPORT = 143
+
+# IGMPv3 / MLDv2 group record types that mean "no longer interested" when the source list is empty
+RECORD_MODE_IS_INCLUDE = 1
+RECORD_CHANGE_TO_INCLUDE = 3
+
+# link-local control groups (224.0.0.0/24 and ff02::/112) are always flooded
+LINK_LOCAL_GROUPS = (b"\x01\x00\x5e\x00\x00", b"\x33\x33\x00\x00\x00")
+
+
+class MulticastSnooper(object):
+    """
+    IGMP / MLD snooping.
+    Tracks which connections joined a multicast group (keyed by the group MAC address)
+    from the membership reports they send. Frames for a registered group are only
+    delivered to its members, link-local control groups and groups nobody reported
+    (unregistered) are flooded.
+    """
+
+    __slots__ = ("groups", "membership_timeout", "clock", "logger", "is_debug")
+    groups: typing.Dict[bytes, typing.Dict[Connection, float]]
+
+    def __init__(
+        self,
+        *,
+        membership_timeout: float = 260,
+        clock: typing.Callable[[], float] = time.monotonic,
+        logger: logging.Logger = logging.getLogger("tapws.snooping"),
+    ) -> None:
+        self.groups = {}
+        self.membership_timeout = membership_timeout
+        self.clock = clock
+        self.logger = logger
+        self.is_debug = self.logger.isEnabledFor(logging.DEBUG)
+
+    def members(self, group_mac: bytes) -> typing.Optional[typing.Iterable[Connection]]:
+        """
+        Connections subscribed to the group, None if the frame has to be flooded.
+        """
+        if group_mac.startswith(LINK_LOCAL_GROUPS):
+            return None
+        members = self.groups.get(group_mac)
+        if not members:
+            return None
+        return members.keys()
+
+    def join(self, group_mac: bytes, connection: Connection) -> None:
+        if group_mac.startswith(LINK_LOCAL_GROUPS):
+            return
+        members = self.groups.setdefault(group_mac, {})
+        if self.is_debug and connection not in members:
+            self.logger.debug(f"{connection} joined {format_mac(group_mac)}")
+        members[connection] = self.clock() + self.membership_timeout
+
+    def leave(self, group_mac: bytes, connection: Connection) -> None:
+        members = self.groups.get(group_mac)
+        if members is None or connection not in members:
+            return
+        if self.is_debug:
+            self.logger.debug(f"{connection} left {format_mac(group_mac)}")
+        del members[connection]
+        if not members:
+            del self.groups[group_mac]
+
+    def forget(self, connection: Connection) -> None:
+        for group_mac in [g for g, m in self.groups.items() if connection in m]:
+            self.leave(group_mac, connection)
+
+    def expire(self) -> int:
+        now = self.clock()
+        expired = [
+            (group_mac, connection)
+            for group_mac, members in self.groups.items()
+            for connection, deadline in members.items()
+            if deadline < now
+        ]
+        for group_mac, connection in expired:
+            self.leave(group_mac, connection)
+        return len(expired)
+
+    def inspect(self, frame: bytes, connection: Connection) -> None:
+        """
+        Update the membership tables from an IGMP / MLD report sent by the connection.
+        """
+        try:
+            ethertype = frame[12:14]
+            if ethertype == ETH_TYPE_IPV4:
+                self.inspect_igmp(frame, connection)
+            elif ethertype == ETH_TYPE_IPV6:
+                self.inspect_mld(frame, connection)
+        except IndexError:
+            if self.is_debug:
+                self.logger.debug(f"Truncated membership report from {connection}")
+
+    def inspect_igmp(self, frame: bytes, connection: Connection) -> None:
+        if frame[23] != IP_PROTO_IGMP:
+            return
+        offset = 14 + (frame[14] & 0x0F) * 4
+        igmp_type = frame[offset]
+
+        if igmp_type in (IGMP_V1_REPORT, IGMP_V2_REPORT):
+            self.join(self.ipv4_group_mac(frame[offset + 4 : offset + 8]), connection)
+        elif igmp_type == IGMP_V2_LEAVE:
+            self.leave(self.ipv4_group_mac(frame[offset + 4 : offset + 8]), connection)
+        elif igmp_type == IGMP_V3_REPORT:
+            records = int.from_bytes(frame[offset + 6 : offset + 8], "big")
+            offset += 8
+            for _ in range(records):
+                record_type, aux_len = frame[offset], frame[offset + 1]
+                sources = int.from_bytes(frame[offset + 2 : offset + 4], "big")
+                group_mac = self.ipv4_group_mac(frame[offset + 4 : offset + 8])
+                self.update(record_type, sources, group_mac, connection)
+                offset += 8 + sources * 4 + aux_len * 4
+
+    def inspect_mld(self, frame: bytes, connection: Connection) -> None:
+        next_header = frame[20]
+        offset = 54
+        if next_header == IP6_NEXT_HOP_BY_HOP:
+            # MLD messages carry the router alert option in a hop-by-hop header
+            next_header = frame[offset]
+            offset += (frame[offset + 1] + 1) * 8
+        if next_header != IP6_NEXT_ICMP6:
+            return
+        mld_type = frame[offset]
+
+        if mld_type == MLD_V1_REPORT:
+            self.join(self.ipv6_group_mac(frame[offset + 8 : offset + 24]), connection)
+        elif mld_type == MLD_V1_DONE:
+            self.leave(self.ipv6_group_mac(frame[offset + 8 : offset + 24]), connection)
+        elif mld_type == MLD_V2_REPORT:
+            records = int.from_bytes(frame[offset + 6 : offset + 8], "big")
+            offset += 8
+            for _ in range(records):
+                record_type, aux_len = frame[offset], frame[offset + 1]
+                sources = int.from_bytes(frame[offset + 2 : offset + 4], "big")
+                group_mac = self.ipv6_group_mac(frame[offset + 4 : offset + 20])
+                self.update(record_type, sources, group_mac, connection)
+                offset += 20 + sources * 16 + aux_len * 4
+
+    def update(
+        self, record_type: int, sources: int, group_mac: bytes, connection: Connection
+    ) -> None:
+        if sources == 0 and record_type in (
+            RECORD_MODE_IS_INCLUDE,
+            RECORD_CHANGE_TO_INCLUDE,
+        ):
+            self.leave(group_mac, connection)
+        else:
+            self.join(group_mac, connection)
+
+    @staticmethod
+    def ipv4_group_mac(group: bytes) -> bytes:
+        if len(group) != 4:
+            raise IndexError("group address")
+        return b"\x01\x00\x5e" + bytes((group[1] & 0x7F,)) + group[2:4]
+
+    @staticmethod
+    def ipv6_group_mac(group: bytes) -> bytes:
+        if len(group) != 16:
+            raise IndexError("group address")
+        return b"\x33\x33" + group[12:16]
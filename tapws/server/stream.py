@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Length-prefixed stream transport.
+
+Clients that don't speak websockets (e.g. QEMU `-netdev stream` / `-netdev socket`) connect
+over TCP or a Unix-domain socket and exchange Ethernet frames, each prefixed with its length
+as a 32 bit big-endian integer:
+
+    | length (4 bytes) | frame | length (4 bytes) | frame | ...
+
+They share the forwarding database, switching and send queues with the websocket clients.
+"""
+
+import asyncio
+import logging
+import os
+import struct
+import typing
+
+from .connection import Connection
+
+if typing.TYPE_CHECKING:
+    from .websocket import WebSocket
+
+READ_SIZE = 1 << 16
+
+_length = struct.Struct(">I")
+
+
+def split(data: bytes, max_frame_size: int) -> typing.Tuple[typing.List[bytes], int]:
+    """
+    Cut every complete frame out of `data`.
+    Returns the frames and the number of bytes consumed, a partial frame is left for the next read.
+    :exception: ValueError if a frame is larger than `max_frame_size`
+    """
+    frames = []
+    offset = 0
+    end = len(data)
+    unpack_from = _length.unpack_from
+    while offset + 4 <= end:
+        size = unpack_from(data, offset)[0]
+        if size > max_frame_size:
+            raise ValueError(f"Frame too large: {size}")
+        if offset + 4 + size > end:
+            break
+        frames.append(data[offset + 4 : offset + 4 + size])
+        offset += 4 + size
+    return frames, offset
+
+
+class StreamClient(object):
+    """
+    Writing half of a stream client, with the `send` coroutine the `Connection` writer uses.
+    """
+
+    __slots__ = ("writer", "transport", "write_limit")
+
+    def __init__(self, writer: asyncio.StreamWriter, write_limit: int = 1 << 16):
+        self.writer = writer
+        self.transport = writer.transport
+        self.write_limit = write_limit
+
+    def __repr__(self) -> str:
+        return f"StreamClient({self.writer.get_extra_info('peername')})"
+
+    async def send(self, message: bytes) -> None:
+        # one copy, the transport must not keep a reference to a pooled frame
+        self.transport.write(_length.pack(len(message)) + message)
+        await self.writer.drain()
+
+
+class StreamConnection(Connection):
+    """
+    `Connection` of a stream client, flooded frames skip the websocket serialization.
+    """
+
+    __slots__ = ()
+
+    def send_prepared(self, message: bytes, frame: bytes) -> bool:
+        transport = self.websocket.transport
+        if (
+            self.queue
+            or transport.is_closing()
+            or transport.get_write_buffer_size() >= self.websocket.write_limit
+        ):
+            return self.send(message)
+        transport.write(_length.pack(len(message)) + message)
+        return True
+
+
+class StreamListener(object):
+    """
+    Accepts length-prefixed stream clients on a TCP port or a Unix-domain socket path.
+    """
+
+    server: typing.Optional[asyncio.AbstractServer]
+
+    def __init__(
+        self,
+        switch: "WebSocket",
+        *,
+        host: typing.Optional[str] = None,
+        port: int = 0,
+        path: typing.Optional[str] = None,
+        reuse_port: bool = False,
+        logger: logging.Logger = logging.getLogger("tapws.stream"),
+    ) -> None:
+        self.switch = switch
+        self.host = host
+        self.port = port
+        self.path = path
+        self.reuse_port = reuse_port
+        self.logger = logger
+        self.server = None
+
+    async def start(self) -> None:
+        if self.path is not None:
+            self.server = await asyncio.start_unix_server(self.handler, self.path)
+        else:
+            self.server = await asyncio.start_server(
+                self.handler, self.host, self.port, reuse_port=self.reuse_port
+            )
+
+    async def stop(self) -> None:
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+            self.server = None
+            if self.path is not None:
+                try:
+                    os.unlink(self.path)
+                except FileNotFoundError:
+                    pass
+
+    async def handler(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        switch = self.switch
+        connection = StreamConnection(
+            StreamClient(writer),  # type: ignore
+            queue_size=switch.queue_size,
+            drop_policy=switch.drop_policy,
+        )
+        switch.register(connection)
+
+        receive = switch.receive
+        max_frame_size = switch.max_frame_size
+        pending = b""
+        try:
+            while True:
+                data = await reader.read(READ_SIZE)
+                if not data:
+                    break
+                if pending:
+                    data = pending + data
+                # many frames per read, only a trailing partial frame is kept
+                frames, consumed = split(data, max_frame_size)
+                pending = data[consumed:]
+                for frame in frames:
+                    await receive(frame, connection)
+        except ValueError as e:
+            self.logger.warning(f"{connection} closed: {e}")
+        except ConnectionError as e:
+            self.logger.info(f"Client disconnected: {e}")
+        except Exception as e:
+            self.logger.error(f"Unknown exception raised: {e}")
+        finally:
+            switch.unregister(connection)
+            writer.close()
@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import asyncio
+import unittest
+from .batching import FrameBatcher, pack, unpack
+
+
+class TestBatching(unittest.IsolatedAsyncioTestCase):
+    def testPackUnpack(self):
+        frames = [b"abc", b"", b"d" * 1500]
+        message = pack(frames)
+        self.assertEqual(message[:5], b"\x00\x03abc")
+        self.assertEqual(unpack(message), frames)
+
+    def testUnpackTruncated(self):
+        with self.assertRaises(ValueError):
+            unpack(b"\x00\x05abc")
+        with self.assertRaises(ValueError):
+            unpack(b"\x00\x03abc\x00")
+
+    async def testFlushAtEndOfIteration(self):
+        flushed = []
+        batcher = FrameBatcher(flushed.append)
+        batcher.add(b"a")
+        batcher.add(b"b")
+        self.assertEqual(flushed, [])
+        await asyncio.sleep(0)
+        self.assertEqual(flushed, [pack([b"a", b"b"])])
+
+    async def testFlushOnSize(self):
+        flushed = []
+        batcher = FrameBatcher(flushed.append, flush_size=8, flush_interval=10)
+        batcher.add(b"abc")
+        batcher.add(b"def")
+        self.assertEqual(flushed, [pack([b"abc", b"def"])])
+        self.assertIsNone(batcher.handle)
+
+    async def testFlushOnInterval(self):
+        flushed = []
+        batcher = FrameBatcher(flushed.append, flush_interval=0.01)
+        batcher.add(b"abc")
+        await asyncio.sleep(0)
+        self.assertEqual(flushed, [])
+        await asyncio.sleep(0.02)
+        self.assertEqual(flushed, [pack([b"abc"])])
+
+    async def testClose(self):
+        flushed = []
+        batcher = FrameBatcher(flushed.append)
+        batcher.add(b"abc")
+        batcher.close()
+        await asyncio.sleep(0)
+        self.assertEqual(flushed, [])
+        with self.assertRaises(ValueError):
+            batcher.add(b"a" * 0x10000)
@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import asyncio
+import os
+import typing
+import unittest
+import unittest.mock
+import websockets
+from websockets import frames
+from websockets.extensions.permessage_deflate import PerMessageDeflate
+from .compression import (
+    COMPRESSION_ADAPTIVE,
+    COMPRESSION_OFF,
+    CompressionStats,
+    MeteredDeflate,
+)
+from .websocket import WebSocket
+
+FIRST_MAC = b"\x02\x00\x00\x00\x00\x01"
+HOST_MAC = b"\x02\x00\x00\x00\x00\xfe"
+
+
+def deflate_pair(stats: CompressionStats, **kwargs):
+    server = MeteredDeflate(
+        PerMessageDeflate(False, False, 12, 12, {"memLevel": 5}), stats, **kwargs
+    )
+    client = PerMessageDeflate(False, False, 12, 12)
+    return server, client
+
+
+class TestMeteredDeflate(unittest.TestCase):
+    def testCountsSavings(self):
+        stats = CompressionStats()
+        server, client = deflate_pair(stats)
+        message = b"\x08\x00" + b"tapws " * 200
+        for _ in range(3):
+            encoded = server.encode(frames.Frame(frames.OP_BINARY, message))
+            self.assertTrue(encoded.rsv1)
+            self.assertEqual(client.decode(encoded).data, message)
+        self.assertEqual(stats.raw_bytes, 3 * len(message))
+        self.assertGreater(stats.saved_bytes, 2 * len(message))
+        self.assertGreater(stats.compress_time, 0)
+        self.assertEqual(server.connection_stats.raw_bytes, stats.raw_bytes)
+
+    def testControlFramesNotCounted(self):
+        stats = CompressionStats()
+        server, _ = deflate_pair(stats)
+        ping = frames.Frame(frames.OP_PING, b"ping")
+        self.assertIs(server.encode(ping), ping)
+        self.assertEqual(stats.raw_bytes, 0)
+
+    def testAdaptiveBacksOffIncompressible(self):
+        stats = CompressionStats()
+        server, client = deflate_pair(stats, adaptive=True, sample_size=4096, backoff=4)
+        text = b"\x08\x00" + b"tapws " * 200
+        noise = [os.urandom(1400) for _ in range(8)]
+
+        # three messages fill the sample, the next four are sent as they are
+        encoded = [server.encode(frames.Frame(frames.OP_BINARY, m)) for m in noise]
+        self.assertEqual(
+            [frame.rsv1 for frame in encoded], [True] * 3 + [False] * 4 + [True]
+        )
+        self.assertEqual(stats.skipped_bytes, 4 * 1400)
+        # skipped messages don't touch the compression context, the client keeps up
+        self.assertEqual([client.decode(frame).data for frame in encoded], noise)
+
+        for _ in range(4):
+            encoded = server.encode(frames.Frame(frames.OP_BINARY, text))
+            self.assertEqual(client.decode(encoded).data, text)
+        self.assertTrue(encoded.rsv1)
+
+    def testAdaptiveKeepsCompressible(self):
+        stats = CompressionStats()
+        server, _ = deflate_pair(stats, adaptive=True, sample_size=4096)
+        text = b"\x08\x00" + b"tapws " * 200
+        for _ in range(20):
+            self.assertTrue(server.encode(frames.Frame(frames.OP_BINARY, text)).rsv1)
+        self.assertEqual(stats.skipped_bytes, 0)
+
+
+class TestCompressionPolicy(unittest.IsolatedAsyncioTestCase):
+    async def serve(self, compression: str) -> str:
+        async def on_message(message: bytes):
+            pass
+
+        self.switch = WebSocket(on_message, "127.0.0.1", 0, compression=compression)
+        await self.switch.start()
+        self.addAsyncCleanup(self.switch.stop)
+        port = self.switch.ws_server.sockets[0].getsockname()[1]  # type: ignore
+        return f"ws://127.0.0.1:{port}"
+
+    async def exchange(
+        self, url: str, payloads: typing.List[bytes]
+    ) -> websockets.WebSocketClientProtocol:  # type: ignore
+        async with websockets.connect(url) as client:  # type: ignore
+            await client.send(HOST_MAC + FIRST_MAC + b"\x08\x00hello")
+            while self.switch.fdb.lookup(FIRST_MAC) is None:
+                await asyncio.sleep(0.01)
+            (self.connection,) = self.switch.connections
+            for payload in payloads:
+                frame = FIRST_MAC + HOST_MAC + b"\x08\x00" + payload
+                self.switch.broadcast(frame)
+                self.assertEqual(await asyncio.wait_for(client.recv(), 1), frame)
+            return client
+
+    async def testCompressionOn(self):
+        client = await self.exchange(await self.serve("on"), [b"tapws " * 100])
+        self.assertEqual(len(client.extensions), 1)
+        self.assertGreater(self.switch.compression_stats.saved_bytes, 0)
+        self.assertEqual(
+            self.connection.compression_stats.raw_bytes,  # type: ignore
+            self.switch.compression_stats.raw_bytes,
+        )
+
+    async def testCompressionOff(self):
+        client = await self.exchange(await self.serve(COMPRESSION_OFF), [b"tapws"])
+        self.assertEqual(client.extensions, [])
+        self.assertEqual(self.switch.compression_stats.raw_bytes, 0)
+        self.assertIsNone(self.connection.compression_stats)
+
+    async def testCompressionAdaptive(self):
+        # more than a sample (64 KiB) of incompressible frames
+        noise = [os.urandom(1400) for _ in range(64)]
+        client = await self.exchange(await self.serve(COMPRESSION_ADAPTIVE), noise)
+        (extension,) = client.extensions
+        self.assertEqual(extension.name, "permessage-deflate")
+        stats = self.connection.compression_stats
+        self.assertGreater(stats.raw_bytes, 0)  # type: ignore
+        self.assertGreater(stats.skipped_bytes, 0)  # type: ignore
+        self.assertEqual(
+            self.switch.compression_stats.skipped_bytes,
+            stats.skipped_bytes,  # type: ignore
+        )
+
+    async def testBackoffSharesPreparedFrame(self):
+        url = await self.serve(COMPRESSION_ADAPTIVE)
+        async with websockets.connect(url) as client:  # type: ignore
+            await client.send(HOST_MAC + FIRST_MAC + b"\x08\x00hello")
+            while self.switch.fdb.lookup(FIRST_MAC) is None:
+                await asyncio.sleep(0.01)
+            (connection,) = self.switch.connections
+            (extension,) = connection.websocket.extensions
+            write_frame_sync = unittest.mock.Mock(
+                wraps=connection.websocket.write_frame_sync
+            )
+            connection.websocket.write_frame_sync = write_frame_sync
+
+            frame = b"\xff" * 6 + HOST_MAC + b"\x08\x06" + os.urandom(28)
+            self.switch.broadcast(frame)
+            self.assertEqual(await asyncio.wait_for(client.recv(), 1), frame)
+            write_frame_sync.assert_called_once()
+
+            # backing off, the frame serialized once for every recipient goes out as it is
+            extension.skipping = 2
+            self.switch.broadcast(frame)
+            self.switch.broadcast(frame)
+            self.switch.broadcast(frame)
+            for _ in range(3):
+                self.assertEqual(await asyncio.wait_for(client.recv(), 1), frame)
+            self.assertEqual(write_frame_sync.call_count, 2)
+            self.assertEqual(extension.skipping, 0)
+            stats = connection.compression_stats
+            self.assertEqual(stats.skipped_bytes, 2 * len(frame))  # type: ignore
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -66,6 +66,32 @@ class TestServerConfig(unittest.TestCase):
             {"INTERFACE_SUBNET": "32"},
             {"INTERFACE_SUBNET": "-1"},
             {"DHCP_LEASE_TIME": "-2"},
+            {"DHCP_ALLOCATION_STRATEGY": "first-fit"},
+            {"DHCP_DATABASE": "sqlite"},
+            {"DHCP_LEASE_JOURNAL": "/nonexistent/tapws/leases"},
+            {"FDB_AGING_TIME": "0"},
+            {"FDB_MAX_MACS": "0"},
+            {"READ_BATCH_SIZE": "0"},
+            {"SEND_QUEUE_SIZE": "0"},
+            {"SEND_QUEUE_POLICY": "random"},
+            {"MULTICAST_MEMBERSHIP_TIMEOUT": "0"},
+            {"BATCH_FLUSH_SIZE": "0"},
+            {"BATCH_FLUSH_INTERVAL": "-1"},
+            {"WORKERS": "0"},
+            {"DEVICE_BACKEND": "loopback"},
+            {"DEVICE_OFFLOAD": "true"},
+            {"BUFFER_POOL_SIZE": "-1"},
+            {"MTU": "67"},
+            {"MTU": "65518"},
+            {"STREAM_PORT": "65536"},
+            {"STREAM_PATH": "/run/tapws.sock", "WORKERS": "2"},
+            {"DATAGRAM_PORT": "-1"},
+            {"DATAGRAM_IDLE_TIMEOUT": "0"},
+            {"DATAGRAM_ALLOW": "10.0.0.0/33"},
+            {"DATAGRAM_ALLOW": " , "},
+            {"DATAGRAM_MAX_PEERS": "0"},
+            {"WEBSOCKET_ENGINE": "tornado"},
+            {"COMPRESSION": "gzip"},
         ]
 
         import ssl
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import asyncio
+import unittest
+import unittest.mock
+from websockets import exceptions as websockets_exceptions
+from websockets.connection import State
+from .connection import Connection, DROP_HEAD, DROP_TAIL
+from .pool import BufferPool
+
+
+class TestConnection(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.websocket = unittest.mock.AsyncMock()
+        return super().setUp()
+
+    async def testWriterSendsInOrder(self):
+        connection = Connection(self.websocket, queue_size=4)
+        connection.start()
+        connection.send(b"1")
+        connection.send(b"2")
+        await asyncio.sleep(0)
+        connection.send(b"3")
+        await asyncio.sleep(0)
+
+        self.assertEqual(
+            [c.args[0] for c in self.websocket.send.call_args_list], [b"1", b"2", b"3"]
+        )
+        connection.close()
+
+    def testTailDrop(self):
+        connection = Connection(self.websocket, queue_size=2, drop_policy=DROP_TAIL)
+        self.assertTrue(connection.send(b"1"))
+        self.assertTrue(connection.send(b"2"))
+        self.assertFalse(connection.send(b"3"))
+        self.assertEqual(list(connection.queue), [b"1", b"2"])
+        self.assertEqual(connection.dropped, 1)
+
+    def testHeadDrop(self):
+        connection = Connection(self.websocket, queue_size=2, drop_policy=DROP_HEAD)
+        connection.send(b"1")
+        connection.send(b"2")
+        self.assertTrue(connection.send(b"3"))
+        self.assertEqual(list(connection.queue), [b"2", b"3"])
+        self.assertEqual(connection.dropped, 1)
+
+    async def testPooledFrameReleasedAfterSend(self):
+        pool = BufferPool(1, 16)
+        buffer = pool.acquire()
+        connection = Connection(self.websocket, queue_size=4)
+        connection.start()
+        connection.send(buffer.view[:4])
+        buffer.release()
+        # still queued, the buffer can't be reused yet
+        self.assertEqual(len(pool), 0)
+        await asyncio.sleep(0)
+        self.assertEqual(len(pool), 1)
+        connection.close()
+
+    def testPooledFrameReleasedOnDrop(self):
+        pool = BufferPool(2, 16)
+        first, second = pool.acquire(), pool.acquire()
+        connection = Connection(self.websocket, queue_size=1, drop_policy=DROP_HEAD)
+        connection.send(first.view[:4])
+        connection.send(second.view[:4])
+        first.release()
+        second.release()
+        self.assertEqual(len(pool), 1)
+        connection.close()
+        self.assertEqual(len(pool), 2)
+
+    def testInvalidPolicy(self):
+        with self.assertRaises(ValueError):
+            Connection(self.websocket, drop_policy="random")
+
+    async def testWriterStopsOnClosedConnection(self):
+        self.websocket.send.side_effect = websockets_exceptions.ConnectionClosed(
+            None, None
+        )
+        connection = Connection(self.websocket)
+        connection.start()
+        connection.send(b"1")
+        await asyncio.sleep(0)
+        self.assertTrue(connection.writer_task.done())  # type: ignore
+        connection.close()
+
+    def testSendPrepared(self):
+        self.websocket.state = State.OPEN
+        self.websocket.extensions = []
+        self.websocket.write_limit = 100
+        self.websocket.transport = unittest.mock.Mock()
+        self.websocket.write_frame_sync = unittest.mock.Mock()
+        self.websocket.transport.get_write_buffer_size.return_value = 0
+        connection = Connection(self.websocket)
+
+        self.assertTrue(connection.send_prepared(b"msg", b"\x82\x03msg"))
+        self.websocket.transport.write.assert_called_once_with(b"\x82\x03msg")
+        self.assertEqual(len(connection.queue), 0)
+
+        # compressed connections encode the frame themselves
+        self.websocket.extensions = [unittest.mock.Mock()]
+        connection.send_prepared(b"msg", b"\x82\x03msg")
+        self.websocket.write_frame_sync.assert_called_once_with(True, 2, b"msg")
+
+    def testSendPreparedSlowClient(self):
+        self.websocket.state = State.OPEN
+        self.websocket.extensions = []
+        self.websocket.write_limit = 100
+        self.websocket.transport = unittest.mock.Mock()
+        self.websocket.write_frame_sync = unittest.mock.Mock()
+        self.websocket.transport.get_write_buffer_size.return_value = 100
+        connection = Connection(self.websocket, queue_size=1)
+
+        connection.send_prepared(b"1", b"\x82\x011")
+        connection.send_prepared(b"2", b"\x82\x012")
+        self.websocket.transport.write.assert_not_called()
+        self.assertEqual(list(connection.queue), [b"1"])
+        self.assertEqual(connection.dropped, 1)
@@ -0,0 +1,112 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import asyncio
+import socket
+import unittest
+import unittest.mock
+from .datagram import DatagramEndpoint
+from .websocket import WebSocket
+from .wire import WireDevice
+
+FIRST_MAC = b"\x02\x00\x00\x00\x00\x01"
+SECOND_MAC = b"\x02\x00\x00\x00\x00\x02"
+HOST_MAC = b"\x02\x00\x00\x00\x00\xfe"
+
+
+class TestDatagramEndpoint(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.now = 0.0
+        self.device = WireDevice("wire0", "", "", 1500)
+        await self.device.start()
+        self.device.peer.settimeout(1)
+        self.switch = WebSocket(
+            self.device.awrite, "0.0.0.0", 0, ws_factory_cls=unittest.mock.Mock()
+        )
+        self.endpoint = DatagramEndpoint(
+            self.switch, self.device, host="127.0.0.1", clock=lambda: self.now
+        )
+        await self.endpoint.start()
+        self.address = self.endpoint.sock.getsockname()  # type: ignore
+        self.first = self.client()
+        self.second = self.client()
+
+    async def asyncTearDown(self) -> None:
+        self.first.close()
+        self.second.close()
+        await self.endpoint.stop()
+        await self.device.stop()
+
+    def client(self) -> socket.socket:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        sock.bind(("127.0.0.1", 0))
+        sock.settimeout(1)
+        return sock
+
+    async def recv(self, sock: socket.socket) -> bytes:
+        return await asyncio.get_running_loop().run_in_executor(None, sock.recv, 2048)
+
+    async def testFramesSwitchedBetweenPeers(self):
+        self.second.sendto(HOST_MAC + SECOND_MAC + b"\x08\x00hello", self.address)
+        self.assertEqual(
+            await self.recv(self.device.peer), HOST_MAC + SECOND_MAC + b"\x08\x00hello"
+        )
+
+        hello = b"\xff" * 6 + FIRST_MAC + b"\x08\x06" + bytes(28)
+        self.first.sendto(hello, self.address)
+        self.assertEqual(await self.recv(self.second), hello)
+        self.assertEqual(await self.recv(self.device.peer), hello)
+
+        reply = FIRST_MAC + SECOND_MAC + b"\x08\x06" + bytes(28)
+        self.second.sendto(reply, self.address)
+        self.assertEqual(await self.recv(self.first), reply)
+        self.assertEqual(len(self.endpoint.peers), 2)
+
+    async def testDeviceFramesReachPeer(self):
+        self.first.sendto(HOST_MAC + FIRST_MAC + b"\x08\x00hello", self.address)
+        await self.recv(self.device.peer)
+
+        frame = FIRST_MAC + HOST_MAC + b"\x08\x00data"
+        self.switch.broadcast(frame)
+        self.assertEqual(await self.recv(self.first), frame)
+
+    async def testIdlePeerExpires(self):
+        self.first.sendto(HOST_MAC + FIRST_MAC + b"\x08\x00hello", self.address)
+        await self.recv(self.device.peer)
+        self.assertIsNotNone(self.switch.fdb.lookup(FIRST_MAC))
+
+        self.now = 299
+        self.endpoint.expire()
+        self.assertEqual(len(self.endpoint.peers), 1)
+        self.now = 301
+        self.endpoint.expire()
+        self.assertEqual(self.endpoint.peers, {})
+        self.assertIsNone(self.switch.fdb.lookup(FIRST_MAC))
+        self.assertEqual(self.switch.connections, set())
+
+    async def testInvalidFrameDoesNotRegister(self):
+        self.first.sendto(b"runt", self.address)
+        self.second.sendto(HOST_MAC + SECOND_MAC + b"\x08\x00hello", self.address)
+        await self.recv(self.device.peer)
+        self.assertEqual(list(self.endpoint.peers), [self.second.getsockname()])
+        self.assertEqual(self.endpoint.rejected, 1)
+
+    async def testPeersLimited(self):
+        frame = HOST_MAC + FIRST_MAC + b"\x08\x00hello"
+        # only loopback addresses are allowed by default
+        self.endpoint.receive(frame, ("192.0.2.1", 5000))
+        self.assertEqual(self.endpoint.peers, {})
+
+        self.endpoint.max_peers = 1
+        self.first.sendto(frame, self.address)
+        await self.recv(self.device.peer)
+        self.second.sendto(HOST_MAC + SECOND_MAC + b"\x08\x00hello", self.address)
+        self.first.sendto(frame, self.address)
+        self.assertEqual(await self.recv(self.device.peer), frame)
+        self.assertEqual(list(self.endpoint.peers), [self.first.getsockname()])
+        self.assertEqual(self.endpoint.rejected, 2)
+        self.assertEqual(self.switch.connections, set(self.endpoint.peers.values()))
+
+
+if __name__ == "__main__":
+    unittest.main()
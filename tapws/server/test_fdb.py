@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+import unittest.mock
+from .fdb import ForwardingDatabase
+
+
+class TestForwardingDatabase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.now = 0.0
+        self.fdb = ForwardingDatabase(aging_time=10, max_macs=2, clock=self.clock)
+        self.conn = unittest.mock.Mock(macs=set())
+        self.other = unittest.mock.Mock(macs=set())
+        return super().setUp()
+
+    def clock(self) -> float:
+        return self.now
+
+    def testLearnMultipleMacs(self):
+        self.assertTrue(self.fdb.learn(b"\x02aaaaa", self.conn))
+        self.assertTrue(self.fdb.learn(b"\x02bbbbb", self.conn))
+        self.assertIs(self.fdb.lookup(b"\x02aaaaa"), self.conn)
+        self.assertIs(self.fdb.lookup(b"\x02bbbbb"), self.conn)
+        self.assertEqual(self.conn.macs, {b"\x02aaaaa", b"\x02bbbbb"})
+
+    def testMaxMacsPerConnection(self):
+        self.fdb.learn(b"\x02aaaaa", self.conn)
+        self.fdb.learn(b"\x02bbbbb", self.conn)
+        self.assertFalse(self.fdb.learn(b"\x02ccccc", self.conn))
+        self.assertIsNone(self.fdb.lookup(b"\x02ccccc"))
+        # refreshing a known MAC is still allowed
+        self.assertTrue(self.fdb.learn(b"\x02aaaaa", self.conn))
+
+    def testGroupAddressNotLearned(self):
+        self.assertFalse(self.fdb.learn(b"\xff\xff\xff\xff\xff\xff", self.conn))
+        self.assertEqual(len(self.fdb), 0)
+
+    def testMacMove(self):
+        self.fdb.learn(b"\x02aaaaa", self.conn)
+        self.fdb.learn(b"\x02aaaaa", self.other)
+        self.assertIs(self.fdb.lookup(b"\x02aaaaa"), self.other)
+        self.assertEqual(self.conn.macs, set())
+        self.assertEqual(self.other.macs, {b"\x02aaaaa"})
+
+    def testAging(self):
+        self.fdb.learn(b"\x02aaaaa", self.conn)
+        self.fdb.learn(b"\x02bbbbb", self.conn)
+        self.now = 8
+        self.fdb.learn(b"\x02bbbbb", self.conn)
+        self.now = 12
+        self.assertEqual(self.fdb.expire(), 1)
+        self.assertIsNone(self.fdb.lookup(b"\x02aaaaa"))
+        self.assertIs(self.fdb.lookup(b"\x02bbbbb"), self.conn)
+        self.assertEqual(self.conn.macs, {b"\x02bbbbb"})
+
+    def testForget(self):
+        self.fdb.learn(b"\x02aaaaa", self.conn)
+        self.fdb.learn(b"\x02bbbbb", self.other)
+        self.fdb.forget(self.conn)
+        self.assertIsNone(self.fdb.lookup(b"\x02aaaaa"))
+        self.assertIs(self.fdb.lookup(b"\x02bbbbb"), self.other)
+        self.assertEqual(len(self.fdb), 1)
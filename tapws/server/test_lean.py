@@ -0,0 +1,188 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import asyncio
+import os
+import unittest
+import unittest.mock
+import websockets
+from websockets.utils import apply_mask
+from .batching import BATCH_SUBPROTOCOL, pack, unpack
+from . import lean
+from .lean import accept_key, frame_header
+from .websocket import WebSocket, ENGINE_LEAN
+from .wire import WireDevice
+
+FIRST_MAC = b"\x02\x00\x00\x00\x00\x01"
+SECOND_MAC = b"\x02\x00\x00\x00\x00\x02"
+HOST_MAC = b"\x02\x00\x00\x00\x00\xfe"
+
+
+def masked(opcode: int, payload: bytes, fin: bool = True) -> bytes:
+    """
+    A client frame, payloads shorter than 126 bytes only.
+    """
+    mask = os.urandom(4)
+    header = bytes((fin << 7 | opcode, 0x80 | len(payload)))
+    return header + mask + apply_mask(payload, mask)
+
+
+class TestFraming(unittest.TestCase):
+    def testFrameHeader(self):
+        self.assertEqual(frame_header(5), b"\x82\x05")
+        self.assertEqual(frame_header(1500), b"\x82\x7e\x05\xdc")
+        self.assertEqual(
+            frame_header(0x10000), b"\x82\x7f" + (0x10000).to_bytes(8, "big")
+        )
+
+    def testAcceptKey(self):
+        # RFC 6455 section 1.3
+        self.assertEqual(
+            accept_key(b"dGhlIHNhbXBsZSBub25jZQ=="), b"s3pPLMBiTxaQ9kYGzzhZRbK+xOo="
+        )
+
+    def testBulkUnmask(self):
+        data, mask = os.urandom(1517), os.urandom(4)
+        self.assertEqual(lean.apply_mask(data, mask), apply_mask(data, mask))
+
+
+class TestLeanEngine(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.device = WireDevice("wire0", "", "", 1500)
+        await self.device.start()
+        self.device.peer.settimeout(1)
+        self.switch = WebSocket(
+            self.device.awrite,
+            "127.0.0.1",
+            0,
+            engine=ENGINE_LEAN,
+            device=self.device,
+        )
+        await self.switch.start()
+        port = self.switch.ws_server.sockets[0].getsockname()[1]  # type: ignore
+        self.url = f"ws://127.0.0.1:{port}"
+
+    async def asyncTearDown(self) -> None:
+        await self.switch.stop()
+        await self.device.stop()
+
+    async def recv(self) -> bytes:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.device.peer.recv, 2048)
+
+    async def testFramesToDevice(self):
+        async with websockets.connect(self.url) as client:  # type: ignore
+            frame = HOST_MAC + FIRST_MAC + b"\x08\x00" + os.urandom(1000)
+            await client.send(frame)
+            self.assertEqual(await self.recv(), frame)
+
+            # fragmented message
+            await client.send([frame[:100], frame[100:]])
+            self.assertEqual(await self.recv(), frame)
+
+            pong = await client.ping()
+            await asyncio.wait_for(pong, 1)
+
+            self.switch.broadcast(FIRST_MAC + HOST_MAC + b"\x08\x00reply")
+            self.assertEqual(
+                await client.recv(), FIRST_MAC + HOST_MAC + b"\x08\x00reply"
+            )
+        self.assertEqual(client.close_code, 1000)
+        await asyncio.sleep(0)
+        self.assertEqual(self.switch.connections, set())
+
+    async def testSwitchBetweenClients(self):
+        async with websockets.connect(self.url) as first, websockets.connect(  # type: ignore
+            self.url, subprotocols=[BATCH_SUBPROTOCOL]  # type: ignore
+        ) as second:
+            self.assertEqual(second.subprotocol, BATCH_SUBPROTOCOL)
+            hello = b"\xff" * 6 + FIRST_MAC + b"\x08\x06" + bytes(28)
+            await first.send(hello)
+            self.assertEqual(unpack(await second.recv()), [hello])
+            self.assertEqual(await self.recv(), hello)
+
+            replies = [FIRST_MAC + SECOND_MAC + b"\x08\x00" + bytes(i) for i in (1, 2)]
+            await second.send(pack(replies))
+            self.assertEqual([await first.recv(), await first.recv()], replies)
+
+    async def testTextMessageIgnored(self):
+        async with websockets.connect(self.url) as client:  # type: ignore
+            await client.send("hello")
+            frame = HOST_MAC + FIRST_MAC + b"\x08\x00data"
+            await client.send(frame)
+            self.assertEqual(await self.recv(), frame)
+            (connection,) = self.switch.connections
+            self.assertEqual(connection.invalid, 1)
+
+    async def testMessageTooBig(self):
+        async with websockets.connect(self.url, max_size=None) as client:  # type: ignore
+            await client.send(bytes(1 << 20))
+            with self.assertRaises(websockets.ConnectionClosedError):  # type: ignore
+                await client.recv()
+        self.assertEqual(client.close_code, 1009)
+
+    async def testFragmentedMessageTooBig(self):
+        async with websockets.connect(self.url) as client:  # type: ignore
+            fragments = [bytes(1500)] * 100
+            with self.assertRaises(websockets.ConnectionClosedError):  # type: ignore
+                await client.send(fragments)
+                await client.recv()
+        self.assertEqual(client.close_code, 1009)
+        self.assertEqual(self.switch.connections, set())
+
+    async def assertProtocolError(self, *frames: bytes):
+        async with websockets.connect(self.url) as client:  # type: ignore
+            client.transport.write(b"".join(frames))
+            with self.assertRaises(websockets.ConnectionClosedError):  # type: ignore
+                await client.recv()
+        self.assertEqual(client.close_code, 1002)
+
+    async def testNewMessageInsideFragmentedMessage(self):
+        await self.assertProtocolError(
+            masked(lean.OP_BINARY, b"first", fin=False),
+            masked(lean.OP_BINARY, b"second"),
+        )
+
+    async def testFragmentedControlFrame(self):
+        await self.assertProtocolError(masked(lean.OP_PING, b"ping", fin=False))
+
+    async def testControlFrameTooLong(self):
+        mask = os.urandom(4)
+        payload = bytes(200)
+        await self.assertProtocolError(
+            bytes((0x80 | lean.OP_PING, 0x80 | 126))
+            + len(payload).to_bytes(2, "big")
+            + mask
+            + apply_mask(payload, mask)
+        )
+
+    async def testFrameSplitAcrossReads(self):
+        async with websockets.connect(self.url) as client:  # type: ignore
+            frame = HOST_MAC + FIRST_MAC + b"\x08\x00" + bytes(80)
+            data = masked(lean.OP_BINARY, frame) * 2
+            for i in range(len(data)):
+                client.transport.write(data[i : i + 1])
+                await asyncio.sleep(0)
+            self.assertEqual(await self.recv(), frame)
+            self.assertEqual(await self.recv(), frame)
+            (connection,) = self.switch.connections
+            self.assertEqual(connection.websocket.buffer, b"")
+
+    async def testRejectPlainHttp(self):
+        host, port = self.switch.ws_server.sockets[0].getsockname()  # type: ignore
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write(b"GET / HTTP/1.1\r\nHost: localhost\r\n\r\n")
+        self.assertTrue((await reader.read()).startswith(b"HTTP/1.1 400"))
+        writer.close()
+
+    async def testUnmaskedFrameClosesConnection(self):
+        async with websockets.connect(self.url) as client:  # type: ignore
+            # bypass the client framing, the server must refuse unmasked frames
+            client.transport.write(frame_header(4) + b"data")
+            with self.assertRaises(websockets.ConnectionClosedError):  # type: ignore
+                await client.recv()
+        self.assertEqual(client.close_code, 1002)
+
+
+if __name__ == "__main__":
+    unittest.main()
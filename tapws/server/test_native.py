@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import struct
+import unittest
+import unittest.mock
+from .device import IFF_TAP, IFF_NO_PI, IFF_MULTI_QUEUE, IFF_VNET_HDR
+from . import native
+from .offload import GSOFrame
+from .native import NativeTapDevice, TUNSETIFF, TUNSETVNETHDRSZ
+
+
+class TestNativeTapDevice(unittest.TestCase):
+    def setUp(self) -> None:
+        self.pipe = os.pipe()
+        self.requests = []
+
+        def fake_ioctl(fd, request, data):
+            self.requests.append((request, data))
+            if request == native.SIOCGIFHWADDR:
+                return data[:18] + b"\x02\x01\x02\x03\x04\x05" + data[24:]
+            return data
+
+        patches = [
+            unittest.mock.patch("os.open", return_value=self.pipe[0]),
+            unittest.mock.patch("fcntl.ioctl", side_effect=fake_ioctl),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        return super().setUp()
+
+    def tearDown(self) -> None:
+        for fd in self.pipe:
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+        return super().tearDown()
+
+    def testOpen(self):
+        flags = IFF_TAP | IFF_NO_PI | IFF_MULTI_QUEUE
+        device = NativeTapDevice("tapx", "10.0.0.1", "255.255.255.0", 1400, flags=flags)
+        request, data = self.requests[0]
+        self.assertEqual(request, TUNSETIFF)
+        self.assertEqual(data[:16].rstrip(b"\x00"), b"tapx")
+        self.assertEqual(struct.unpack_from("H", data, 16)[0], flags)
+        self.assertEqual(len(data), 40)
+        configured = {request: data for request, data in self.requests}
+        self.assertEqual(configured[native.SIOCSIFADDR][20:24], bytes([10, 0, 0, 1]))
+        self.assertEqual(
+            configured[native.SIOCSIFNETMASK][20:24], bytes([255, 255, 255, 0])
+        )
+        self.assertEqual(
+            struct.unpack_from("i", configured[native.SIOCSIFMTU], 16)[0], 1400
+        )
+        self.assertEqual(device.hwaddr, b"\x02\x01\x02\x03\x04\x05")
+        self.assertEqual(device.vnet_hdr_size, 0)
+
+    def testVnetHeader(self):
+        flags = IFF_TAP | IFF_NO_PI | IFF_VNET_HDR
+        device = NativeTapDevice("tapx", "", "", 0, flags=flags)
+        self.assertIn(TUNSETVNETHDRSZ, [request for request, _ in self.requests])
+        self.assertEqual(device.vnet_hdr_size, 10)
+
+        os.write(self.pipe[1], bytes(10) + b"frame")
+        self.assertEqual(device.read(), b"frame")
+
+        with unittest.mock.patch("os.writev") as writev:
+            device.write_frame(b"frame")
+            writev.assert_called_once_with(self.pipe[0], (bytes(10), b"frame"))
+
+    def testOffload(self):
+        device = NativeTapDevice("tapx", "", "", 0, offload=True)
+        requests = dict(self.requests)
+        self.assertIn(native.TUNSETOFFLOAD, requests)
+        flags = struct.unpack_from("H", requests[TUNSETIFF], 16)[0]
+        self.assertTrue(flags & IFF_VNET_HDR)
+        self.assertEqual(len(device.buffer), 10 + 0xFFFF)
+
+        # a super-packet larger than a regular read
+        frame = b"\x02\x00\x00\x00\x00\x01" + bytes(5000)
+        header = bytes((1, 1)) + bytes(8)
+        os.write(self.pipe[1], header + frame)
+        received = device.read()
+        self.assertIsInstance(received, GSOFrame)
+        self.assertEqual(received, frame)
+        self.assertEqual(received.header, header)
+
+    def testOpenError(self):
+        with unittest.mock.patch(
+            "os.open", side_effect=PermissionError(1, "Operation not permitted")
+        ), self.assertRaises(PermissionError):
+            NativeTapDevice("tapx", "", "", 0)
+
+    def testConfigureErrorClosesFd(self):
+        with unittest.mock.patch(
+            "fcntl.ioctl", side_effect=OSError(1, "Operation not permitted")
+        ), unittest.mock.patch("os.close") as close, self.assertRaises(OSError):
+            NativeTapDevice("tapx", "", "", 0)
+        close.assert_called_once_with(self.pipe[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import socket
+import struct
+import unittest
+import dpkt
+from .offload import (
+    GSOFrame,
+    VIRTIO_NET_HDR_F_NEEDS_CSUM,
+    VIRTIO_NET_HDR_GSO_TCPV4,
+    VIRTIO_NET_HDR_GSO_TCPV6,
+    checksum,
+    from_device,
+    ones_sum,
+    vnet_header,
+)
+
+SRC_MAC = b"\x02\x00\x00\x00\x00\xfe"
+DST_MAC = b"\x02\x00\x00\x00\x00\x01"
+
+
+def tcp_frame(payload: bytes, ipv6: bool = False) -> bytes:
+    tcp = dpkt.tcp.TCP(
+        sport=80,
+        dport=40000,
+        seq=1000,
+        flags=dpkt.tcp.TH_ACK | dpkt.tcp.TH_PUSH | dpkt.tcp.TH_FIN,
+        data=payload,
+    )
+    if ipv6:
+        packet = dpkt.ip6.IP6(
+            src=socket.inet_pton(socket.AF_INET6, "fd00::1"),
+            dst=socket.inet_pton(socket.AF_INET6, "fd00::2"),
+            nxt=dpkt.ip.IP_PROTO_TCP,
+            hlim=64,
+            data=tcp,
+            plen=len(tcp),
+        )
+        ethertype = dpkt.ethernet.ETH_TYPE_IP6
+    else:
+        packet = dpkt.ip.IP(
+            src=socket.inet_aton("10.0.0.1"),
+            dst=socket.inet_aton("10.0.0.2"),
+            p=dpkt.ip.IP_PROTO_TCP,
+            id=7,
+            data=tcp,
+        )
+        ethertype = dpkt.ethernet.ETH_TYPE_IP
+    return bytes(
+        dpkt.ethernet.Ethernet(dst=DST_MAC, src=SRC_MAC, type=ethertype, data=packet)
+    )
+
+
+def header(flags: int, gso_type: int, gso_size: int, csum_start: int) -> bytes:
+    return vnet_header.pack(flags, gso_type, 0, gso_size, csum_start, 16)
+
+
+class TestChecksum(unittest.TestCase):
+    def testOnesSum(self):
+        self.assertEqual(ones_sum(b""), 0)
+        self.assertEqual(ones_sum(b"\xff\xff"), 0xFFFF)
+        self.assertEqual(ones_sum(b"\x00\x01\xf2"), 0xF201)
+        # rfc 1071 example
+        self.assertEqual(ones_sum(bytes.fromhex("0001f203f4f5f6f7")), 0xDDF2)
+        self.assertEqual(checksum(bytes.fromhex("0001f203f4f5f6f7")), 0x220D)
+
+
+class TestSegmentation(unittest.TestCase):
+    def assertValidSegments(self, segments, payload: bytes, ipv6: bool = False):
+        received = b""
+        for index, segment in enumerate(segments):
+            ip = dpkt.ethernet.Ethernet(segment).data
+            tcp = ip.data
+            self.assertEqual(tcp.seq, 1000 + len(received))
+            received += tcp.data
+
+            reported = tcp.sum
+            tcp.sum = 0
+            if ipv6:
+                self.assertEqual(ip.plen, len(tcp))
+                # dpkt computes the TCP checksum when the packet is serialized
+                ip.data = tcp
+                self.assertEqual(dpkt.ip6.IP6(bytes(ip)).data.sum, reported)
+            else:
+                self.assertEqual(ip.len, len(segment) - 14)
+                self.assertEqual(ip.id, 7 + index)
+                ip_sum = ip.sum
+                ip.sum = 0
+                self.assertEqual(dpkt.ip.IP(bytes(ip)).sum, ip_sum)
+                self.assertEqual(dpkt.ip.IP(bytes(ip)).data.sum, reported)
+
+            last = index == len(segments) - 1
+            self.assertEqual(bool(tcp.flags & dpkt.tcp.TH_FIN), last)
+            self.assertEqual(bool(tcp.flags & dpkt.tcp.TH_PUSH), last)
+        self.assertEqual(received, payload)
+
+    def testTCPv4(self):
+        payload = bytes(range(256)) * 16
+        frame = tcp_frame(payload)
+        gso = from_device(header(1, VIRTIO_NET_HDR_GSO_TCPV4, 1448, 34) + frame)
+        self.assertIsInstance(gso, GSOFrame)
+        self.assertEqual(bytes(gso), frame)
+        segments = gso.segments()  # type: ignore
+        self.assertEqual(len(segments), 3)
+        self.assertTrue(all(len(s) <= 1514 for s in segments))
+        self.assertValidSegments(segments, payload)
+
+    def testTCPv6(self):
+        payload = bytes(range(255)) * 20
+        frame = tcp_frame(payload, ipv6=True)
+        gso = from_device(header(1, VIRTIO_NET_HDR_GSO_TCPV6, 1428, 54) + frame)
+        segments = gso.segments()  # type: ignore
+        self.assertEqual(len(segments), 4)
+        self.assertValidSegments(segments, payload, ipv6=True)
+
+    def testNeedsChecksum(self):
+        frame = bytearray(tcp_frame(b"hello"))
+        expected = struct.unpack_from(">H", frame, 34 + 16)[0]
+        # the kernel leaves the pseudo header sum in the checksum field
+        pseudo = ones_sum(bytes(frame[26:34])) + 6 + len(frame) - 34
+        pseudo = (pseudo & 0xFFFF) + (pseudo >> 16)
+        struct.pack_into(">H", frame, 34 + 16, pseudo)
+        gso = from_device(header(VIRTIO_NET_HDR_F_NEEDS_CSUM, 0, 0, 34) + frame)
+        (segment,) = gso.segments()  # type: ignore
+        self.assertEqual(struct.unpack_from(">H", segment, 34 + 16)[0], expected)
+
+    def testPlainFrame(self):
+        frame = tcp_frame(b"hello")
+        self.assertIs(type(from_device(bytes(10) + frame)), bytes)
+        self.assertEqual(from_device(memoryview(bytes(10) + frame)), frame)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+import unittest.mock
+from .pool import BufferPool, PooledBuffer, retain, release
+
+
+class TestBufferPool(unittest.TestCase):
+    def setUp(self) -> None:
+        self.pool = BufferPool(2, 16)
+        return super().setUp()
+
+    def testAcquireRelease(self):
+        buffer = self.pool.acquire()
+        self.assertIsInstance(buffer, PooledBuffer)
+        self.assertEqual(len(buffer), 16)
+        self.assertEqual(len(self.pool), 1)
+        buffer.release()
+        self.assertEqual(len(self.pool), 2)
+
+    def testFrameKeepsBufferAlive(self):
+        buffer = self.pool.acquire()
+        buffer[:3] = b"abc"
+        frame = buffer.view[:3]
+        retain(frame)
+        retain(frame)
+        buffer.release()
+        release(frame)
+        self.assertEqual(len(self.pool), 1)
+        release(frame)
+        self.assertEqual(len(self.pool), 2)
+
+    def testPlainBytesIgnored(self):
+        retain(b"frame")
+        release(b"frame")
+        retain(memoryview(b"frame"))
+        release(memoryview(b"frame"))
+
+    def testExhaustedPoolAllocates(self):
+        buffers = [self.pool.acquire() for _ in range(3)]
+        self.assertEqual(self.pool.misses, 1)
+        for buffer in buffers:
+            buffer.release()
+        # the pool does not grow past its size
+        self.assertEqual(len(self.pool), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
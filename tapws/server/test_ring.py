@@ -0,0 +1,202 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import asyncio
+import os
+import select
+import unittest
+import unittest.mock
+from .fdb import ForwardingDatabase
+from .ring import FrameRing, RingLink, RingWrapper
+from .server import Server, ServerConfig
+from .workers import WorkerMesh, create_links
+
+
+class TestFrameRing(unittest.TestCase):
+    def setUp(self) -> None:
+        self.ring = FrameRing(64)
+        return super().setUp()
+
+    def tearDown(self) -> None:
+        self.ring.close()
+        return super().tearDown()
+
+    def readable(self) -> bool:
+        return bool(select.select([self.ring.fileno()], [], [], 0)[0])
+
+    def testPutGet(self):
+        self.assertFalse(self.readable())
+        self.assertTrue(self.ring.put(b"frame"))
+        self.assertTrue(self.readable())
+        self.assertEqual(self.ring.get(), b"frame")
+        self.assertFalse(self.readable())
+        with self.assertRaises(BlockingIOError):
+            self.ring.get()
+
+    def testWrapAround(self):
+        for i in range(20):
+            frames = [bytes([i]) * 10, bytes([i]) * 7]
+            self.assertEqual(self.ring.put_many(frames), 2)
+            self.assertEqual(self.ring.get_many(10), frames)
+        self.assertEqual(len(self.ring), 0)
+
+    def testFullRingDrops(self):
+        self.assertEqual(self.ring.put_many([bytes(20)] * 4), 2)
+        self.assertEqual(self.ring.dropped, 1)
+        self.assertFalse(self.ring.put(bytes(20)))
+        self.ring.get_many(10)
+        self.assertTrue(self.ring.put(bytes(20)))
+
+    def testFrameLargerThanRing(self):
+        with self.assertRaises(ValueError):
+            self.ring.put(bytes(64))
+
+    def testLeftoverFramesKeepWakeup(self):
+        self.ring.put_many([b"a", b"b", b"c"])
+        self.assertEqual(self.ring.get_many(2), [b"a", b"b"])
+        self.assertTrue(self.readable())
+        self.assertEqual(self.ring.get_many(2), [b"c"])
+        self.assertFalse(self.readable())
+
+    def testAcrossProcesses(self):
+        frames = [bytes([i % 256]) * (i % 50 + 1) for i in range(1000)]
+        ring = FrameRing(256)
+        pid = os.fork()
+        if pid == 0:  # pragma: no cover
+            sent = 0
+            while sent < len(frames):
+                sent += ring.put_many(frames[sent : sent + 8])
+            os._exit(0)
+
+        received = []
+        while len(received) < len(frames):
+            select.select([ring.fileno()], [], [], 1)
+            received.extend(ring.get_many(64))
+        os.waitpid(pid, 0)
+        ring.close()
+        self.assertEqual(received, frames)
+
+
+class TestRingWrapper(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.device = RingWrapper(
+            "ring0", "", "", 1500, capacity=4096, write_high_water=4
+        )
+        await self.device.start()
+        self.peer = self.device.peer
+
+    async def asyncTearDown(self) -> None:
+        await self.device.stop()
+
+    async def testReadWrite(self):
+        self.peer.send(b"one")
+        self.peer.send(b"two")
+        self.assertEqual(self.device.fileno(), self.device.rx.fileno())
+        self.assertEqual(self.device.read(), b"one")
+        self.assertEqual(self.device.read_batch(8), [b"two"])
+        with self.assertRaises(BlockingIOError):
+            self.device.read()
+        await self.device.awrite(b"three")
+        self.device.write_many([b"four"])
+        self.assertEqual(self.peer.recv(2048), b"three")
+        self.assertEqual(self.peer.recv(2048), b"four")
+
+    def testReadInto(self):
+        self.peer.send(b"frame")
+        buffer = bytearray(self.device.read_size)
+        self.assertEqual(self.device.read_into(buffer), 5)
+        self.assertEqual(buffer[:5], b"frame")
+        with self.assertRaises(BlockingIOError):
+            self.device.read_into(buffer)
+
+    async def testWriteBackpressure(self):
+        frame = bytes(1000)
+        while not self.device.pending:
+            self.device.write(frame)
+        written = 4 + len(self.device.pending)
+        self.assertEqual(len(self.device.pending), 1)
+        self.device.write_many([frame] * 3)
+        self.assertEqual(len(self.device.pending), 4)
+
+        waiter = asyncio.create_task(self.device.drain())
+        await asyncio.sleep(0.01)
+        self.assertFalse(waiter.done())
+
+        received = 0
+        while received < written + 3:
+            try:
+                self.assertEqual(self.peer.recv(2048), frame)
+                received += 1
+            except BlockingIOError:
+                await asyncio.sleep(0.005)
+        await asyncio.wait_for(waiter, 1)
+        self.assertFalse(self.device.pending)
+        self.assertIsNone(self.device.retry)
+
+
+class TestRingServer(unittest.IsolatedAsyncioTestCase):
+    async def testServerOnRings(self):
+        received = asyncio.Queue()
+        websocket = unittest.mock.AsyncMock()
+        websocket.close = lambda: None
+        websocket.broadcast = received.put_nowait
+        websocket.broadcast_many = lambda frames: [
+            received.put_nowait(bytes(f)) for f in frames
+        ]
+        websocket_wrapper = unittest.mock.Mock(return_value=websocket)
+
+        with unittest.mock.patch.dict("os.environ", {"DEVICE_BACKEND": "ring"}):
+            server = Server(
+                ServerConfig.From_env(),
+                websocket_wrapper=websocket_wrapper,  # type: ignore
+            )
+        self.assertIsInstance(server.device, RingWrapper)
+        peer = server.device.peer
+        await server.start()
+
+        frame = b"\xff" * 6 + b"\x02\x00\x00\x00\x00\x01\x08\x00" + bytes(50)
+        peer.send(frame)
+        self.assertEqual(await asyncio.wait_for(received.get(), 1), frame)
+
+        # frames from the clients go to the device write path
+        awrite = websocket_wrapper.call_args.args[0]
+        await awrite(frame[::-1])
+        self.assertEqual(peer.recv(2048), frame[::-1])
+        await server.stop()
+
+
+class TestRingLink(unittest.TestCase):
+    def testWorkerMeshOverRings(self):
+        links = create_links(2, pair=RingLink.pair)
+        first = WorkerMesh(0, links[0])
+        second = WorkerMesh(1, links[1])
+        for mesh in (first, second):
+            mesh.attach(unittest.mock.Mock(fdb=ForwardingDatabase()))
+
+        mac = b"\x02\x00\x00\x00\x00\x01"
+        first.ws.fdb.learn(mac, unittest.mock.Mock(macs=set()))
+        second.receive(0)
+        self.assertEqual(second.remote, {mac: 0})
+
+        frame = mac + b"\x02\x00\x00\x00\x00\x02\x08\x00"
+        self.assertTrue(second.forward(frame))
+        first.receive(1)
+        first.ws.broadcast.assert_called_once_with(frame)
+        first.stop()
+        second.stop()
+
+    def testClosePeerEndsFirst(self):
+        # a forked worker closes the links of its siblings before using its own
+        links = create_links(2, pair=RingLink.pair)
+        for link in links[1].values():
+            link.close()
+        link = links[0][1]
+        self.assertEqual(link.send(b"frame"), 5)
+        self.assertEqual(link.tx.get(), b"frame")
+        link.close()
+        self.assertIsNone(link.rx.buf)
+        self.assertIsNone(link.tx.buf)
+
+
+if __name__ == "__main__":
+    unittest.main()
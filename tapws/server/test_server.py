@@ -15,15 +15,27 @@ class TestServer(unittest.IsolatedAsyncioTestCase):
         self.tuntap_wrapper = unittest.mock.Mock(side_effect=[self.tuntap])
         self.tuntap.fileno = unittest.mock.mock_open()
         self.tuntap.read = unittest.mock.Mock(return_value=b"mmmmmmmmmm")
+        self.tuntap.read_batch = unittest.mock.Mock(
+            return_value=[b"mmmmmmmmmm", b"nnnnnnnnnn"]
+        )
 
         self.fake_ws_serve = unittest.mock.AsyncMock()
         self.fake_ws_serve.close = lambda: None
         self.fake_ws_serve.broadcast = self.broadcast_helper
+        self.fake_ws_serve.broadcast_many = self.broadcast_many_helper
         self.fake_ws_cls = unittest.mock.Mock(side_effect=[self.fake_ws_serve])
 
+        # the pooled receive path has its own test
+        environ = unittest.mock.patch.dict("os.environ", {"BUFFER_POOL_SIZE": "0"})
+        environ.start()
+        self.addCleanup(environ.stop)
+
     def broadcast_helper(self, message: bytes):
         self.read_message = message
 
+    def broadcast_many_helper(self, messages: typing.List[bytes]):
+        self.read_messages = messages
+
     async def testBroadcast(self):
         def mock_reader(_: typing.Any, fd: int, callback: typing.Callable, *args):
             callback()
@@ -39,8 +51,29 @@ class TestServer(unittest.IsolatedAsyncioTestCase):
                 websocket_wrapper=self.fake_ws_cls,  # type: ignore
             )
 
+            await s.start()
+            self.assertEqual(self.read_messages, [b"mmmmmmmmmm", b"nnnnnnnnnn"])
+            self.tuntap.read_batch.assert_called_once_with(64)
+            await s.stop()
+
+    async def testBroadcastSingleFrame(self):
+        def mock_reader(_: typing.Any, fd: int, callback: typing.Callable, *args):
+            callback()
+
+        with unittest.mock.patch(
+            "asyncio.unix_events._UnixSelectorEventLoop.add_reader",
+            mock_reader,
+        ), unittest.mock.patch.dict("os.environ", {"READ_BATCH_SIZE": "1"}):
+            s = Server(
+                ServerConfig.From_env(),
+                services=[],
+                tuntap_wrapper=self.tuntap_wrapper,  # type: ignore
+                websocket_wrapper=self.fake_ws_cls,  # type: ignore
+            )
+
             await s.start()
             self.assertEqual(self.read_message, b"mmmmmmmmmm")
+            self.tuntap.read_batch.assert_not_called()
             await s.stop()
 
     async def testStartStop(self):
@@ -58,6 +91,16 @@ class TestServer(unittest.IsolatedAsyncioTestCase):
         await s.stop()
         self.assertTrue(s._waiter_.done())
 
+    async def testMtu(self):
+        with unittest.mock.patch.dict("os.environ", {"MTU": "9000"}):
+            Server(
+                ServerConfig.From_env(),
+                tuntap_wrapper=self.tuntap_wrapper,  # type: ignore
+                websocket_wrapper=self.fake_ws_cls,  # type: ignore
+            )
+        self.assertEqual(self.tuntap_wrapper.call_args.args[3], 9000)
+        self.assertEqual(self.fake_ws_cls.call_args.kwargs["max_frame_size"], 9018)
+
     async def testLoadWithAsyncWith(self):
         s = Server(
             ServerConfig.From_env(),
@@ -82,3 +125,92 @@ class TestServer(unittest.IsolatedAsyncioTestCase):
 
         asyncio.create_task(_helper_stop_instance(s))
         await s
+
+    async def testAnswerArpFromHost(self):
+        def mock_reader(_: typing.Any, fd: int, callback: typing.Callable, *args):
+            callback()
+
+        arp_responder = unittest.mock.Mock()
+        arp_responder.reply_to_host.side_effect = [b"reply", None]
+        self.tuntap.write = unittest.mock.Mock()
+
+        with unittest.mock.patch(
+            "asyncio.unix_events._UnixSelectorEventLoop.add_reader",
+            mock_reader,
+        ):
+            s = Server(
+                ServerConfig.From_env(),
+                tuntap_wrapper=self.tuntap_wrapper,  # type: ignore
+                websocket_wrapper=self.fake_ws_cls,  # type: ignore
+                arp_responder=arp_responder,
+            )
+            await s.start()
+            self.tuntap.write.assert_called_once_with(b"reply")
+            self.assertEqual(self.read_messages, [b"nnnnnnnnnn"])
+            await s.stop()
+
+        # the responder only answers for clients attached to the switch
+        mac = b"\x02\x00\x00\x00\x00\x01"
+        self.assertEqual(arp_responder.is_connected, s.is_connected)
+        self.assertFalse(s.is_connected(mac))
+        s.fdb.learn(mac, unittest.mock.Mock(macs=set()))
+        self.assertTrue(s.is_connected(mac))
+
+    async def testForwardToSiblingWorker(self):
+        def mock_reader(_: typing.Any, fd: int, callback: typing.Callable, *args):
+            callback()
+
+        mesh = unittest.mock.Mock()
+        mesh.forward.side_effect = [True, False]
+
+        with unittest.mock.patch(
+            "asyncio.unix_events._UnixSelectorEventLoop.add_reader",
+            mock_reader,
+        ):
+            s = Server(
+                ServerConfig.From_env(),
+                tuntap_wrapper=self.tuntap_wrapper,  # type: ignore
+                websocket_wrapper=self.fake_ws_cls,  # type: ignore
+                mesh=mesh,
+            )
+            self.assertIn("flags", self.tuntap_wrapper.call_args.kwargs)
+            mesh.attach.assert_called_once_with(self.fake_ws_serve)
+            await s.start()
+            mesh.start.assert_called_once()
+            self.assertEqual(self.read_messages, [b"nnnnnnnnnn"])
+            await s.stop()
+            mesh.stop.assert_called_once()
+
+    async def testBroadcastPooled(self):
+        def mock_reader(_: typing.Any, fd: int, callback: typing.Callable, *args):
+            callback()
+
+        frames = [b"mmmmmmmmmm", b"nnnnnnnnnn"]
+
+        def read_into(buffer: bytearray) -> int:
+            if not frames:
+                raise BlockingIOError()
+            frame = frames.pop(0)
+            buffer[: len(frame)] = frame
+            return len(frame)
+
+        self.tuntap.read_size = 4096
+        self.tuntap.read_into = read_into
+
+        with unittest.mock.patch(
+            "asyncio.unix_events._UnixSelectorEventLoop.add_reader",
+            mock_reader,
+        ), unittest.mock.patch.dict("os.environ", {"BUFFER_POOL_SIZE": "4"}):
+            s = Server(
+                ServerConfig.From_env(),
+                tuntap_wrapper=self.tuntap_wrapper,  # type: ignore
+                websocket_wrapper=self.fake_ws_cls,  # type: ignore
+            )
+            await s.start()
+            self.assertEqual(self.read_messages, [b"mmmmmmmmmm", b"nnnnnnnnnn"])
+            self.assertIsInstance(self.read_messages[0], memoryview)
+            self.tuntap.read_batch.assert_not_called()
+            # nobody kept the frames, every buffer is back in the pool
+            self.assertEqual(len(s.pool), 4)  # type: ignore
+            self.assertEqual(s.pool.misses, 0)  # type: ignore
+            await s.stop()
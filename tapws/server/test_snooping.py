@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import unittest
+import unittest.mock
+from ipaddress import IPv4Address, IPv6Address
+from .snooping import MulticastSnooper
+
+SRC_MAC = b"\x02\x00\x00\x00\x00\x01"
+
+
+def igmp(igmp_type: int, group: str, body: bytes = b"") -> bytes:
+    group_mac = MulticastSnooper.ipv4_group_mac(IPv4Address(group).packed)
+    # IPv4 header with a router alert option (ihl = 6)
+    ip = bytes((0x46, 0, 0, 32, 0, 0, 0, 0, 1, 2, 0, 0)) + bytes(8) + bytes(4)
+    message = bytes((igmp_type, 0, 0, 0)) + IPv4Address(group).packed
+    return group_mac + SRC_MAC + b"\x08\x00" + ip + (body or message)
+
+
+def igmp_v3(records: list) -> bytes:
+    body = bytes((0x22, 0, 0, 0, 0, 0)) + len(records).to_bytes(2, "big")
+    for record_type, group, sources in records:
+        body += bytes((record_type, 0)) + len(sources).to_bytes(2, "big")
+        body += IPv4Address(group).packed
+        body += b"".join(IPv4Address(s).packed for s in sources)
+    return igmp(0x22, "224.0.0.22", body)
+
+
+def mld(mld_type: int, group: str, body: bytes = b"") -> bytes:
+    group_mac = MulticastSnooper.ipv6_group_mac(IPv6Address(group).packed)
+    ip = bytes((0x60, 0, 0, 0, 0, 32, 0, 1)) + bytes(32)
+    hop_by_hop = bytes((58, 0, 5, 2, 0, 0, 1, 0))
+    message = bytes((mld_type, 0, 0, 0, 0, 0, 0, 0)) + IPv6Address(group).packed
+    return group_mac + SRC_MAC + b"\x86\xdd" + ip + hop_by_hop + (body or message)
+
+
+def mld_v2(records: list) -> bytes:
+    body = bytes((143, 0, 0, 0, 0, 0)) + len(records).to_bytes(2, "big")
+    for record_type, group, sources in records:
+        body += bytes((record_type, 0)) + len(sources).to_bytes(2, "big")
+        body += IPv6Address(group).packed
+        body += b"".join(IPv6Address(s).packed for s in sources)
+    return mld(143, "ff02::16", body)
+
+
+class TestMulticastSnooper(unittest.TestCase):
+    def setUp(self) -> None:
+        self.now = 0.0
+        self.snooper = MulticastSnooper(membership_timeout=10, clock=lambda: self.now)
+        self.conn = unittest.mock.Mock()
+        self.other = unittest.mock.Mock()
+        return super().setUp()
+
+    def testIgmpV2JoinLeave(self):
+        group_mac = b"\x01\x00\x5e\x01\x02\x03"
+        self.assertIsNone(self.snooper.members(group_mac))
+
+        self.snooper.inspect(igmp(0x16, "239.1.2.3"), self.conn)
+        self.assertEqual(list(self.snooper.members(group_mac)), [self.conn])  # type: ignore
+
+        self.snooper.inspect(igmp(0x17, "239.1.2.3"), self.conn)
+        self.assertIsNone(self.snooper.members(group_mac))
+
+    def testIgmpV3Report(self):
+        self.snooper.inspect(
+            igmp_v3([(4, "239.1.1.1", []), (2, "239.2.2.2", ["10.0.0.1"])]),
+            self.conn,
+        )
+        self.assertEqual(
+            set(self.snooper.groups),
+            {b"\x01\x00\x5e\x01\x01\x01", b"\x01\x00\x5e\x02\x02\x02"},
+        )
+        # TO_INCLUDE with an empty source list is a leave
+        self.snooper.inspect(igmp_v3([(3, "239.1.1.1", [])]), self.conn)
+        self.assertEqual(set(self.snooper.groups), {b"\x01\x00\x5e\x02\x02\x02"})
+
+    def testMldV1JoinDone(self):
+        group_mac = b"\x33\x33\xff\x00\x00\x01"
+        self.snooper.inspect(mld(131, "ff02::1:ff00:1"), self.conn)
+        self.assertEqual(list(self.snooper.members(group_mac)), [self.conn])  # type: ignore
+        self.snooper.inspect(mld(132, "ff02::1:ff00:1"), self.conn)
+        self.assertIsNone(self.snooper.members(group_mac))
+
+    def testMldV2Report(self):
+        self.snooper.inspect(mld_v2([(4, "ff05::1:3", [])]), self.conn)
+        self.snooper.inspect(mld_v2([(2, "ff05::1:3", ["fe80::1"])]), self.other)
+        self.assertEqual(
+            set(self.snooper.members(b"\x33\x33\x00\x01\x00\x03")),  # type: ignore
+            {self.conn, self.other},
+        )
+
+    def testLinkLocalGroupsAreFlooded(self):
+        self.snooper.inspect(igmp(0x16, "224.0.0.251"), self.conn)
+        self.snooper.inspect(mld(131, "ff02::1"), self.conn)
+        self.assertEqual(self.snooper.groups, {})
+        self.assertIsNone(self.snooper.members(b"\x01\x00\x5e\x00\x00\xfb"))
+
+    def testExpireAndForget(self):
+        self.snooper.inspect(igmp(0x16, "239.1.1.1"), self.conn)
+        self.snooper.inspect(igmp(0x16, "239.2.2.2"), self.conn)
+        self.now = 5
+        self.snooper.inspect(igmp(0x16, "239.2.2.2"), self.conn)
+        self.snooper.inspect(igmp(0x16, "239.2.2.2"), self.other)
+        self.now = 11
+        self.assertEqual(self.snooper.expire(), 1)
+        self.assertEqual(set(self.snooper.groups), {b"\x01\x00\x5e\x02\x02\x02"})
+
+        self.snooper.forget(self.conn)
+        self.assertEqual(
+            list(self.snooper.members(b"\x01\x00\x5e\x02\x02\x02")), [self.other]  # type: ignore
+        )
+
+    def testIgnoreOtherFrames(self):
+        udp = bytearray(igmp(0x16, "239.1.1.1"))
+        udp[23] = 17
+        self.snooper.inspect(bytes(udp), self.conn)
+        self.snooper.inspect(igmp(0x16, "239.1.1.1")[:30], self.conn)
+        self.snooper.inspect(b"\xff" * 6 + SRC_MAC + b"\x08\x06" + bytes(28), self.conn)
+        self.assertEqual(self.snooper.groups, {})
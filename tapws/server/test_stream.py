@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import asyncio
+import os
+import tempfile
+import unittest
+import unittest.mock
+from .stream import StreamListener, split
+from .websocket import WebSocket
+
+FIRST_MAC = b"\x02\x00\x00\x00\x00\x01"
+SECOND_MAC = b"\x02\x00\x00\x00\x00\x02"
+
+
+def prefixed(frame: bytes) -> bytes:
+    return len(frame).to_bytes(4, "big") + frame
+
+
+class TestSplit(unittest.TestCase):
+    def testManyFramesPerRead(self):
+        data = prefixed(b"a" * 20) + prefixed(b"b" * 30) + prefixed(b"c" * 40)[:10]
+        frames, consumed = split(data, 1518)
+        self.assertEqual(frames, [b"a" * 20, b"b" * 30])
+        self.assertEqual(consumed, 58)
+
+    def testPartialLength(self):
+        self.assertEqual(split(b"\x00\x00", 1518), ([], 0))
+
+    def testFrameTooLarge(self):
+        with self.assertRaises(ValueError):
+            split(prefixed(bytes(1519)), 1518)
+
+
+class TestStreamListener(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.received = []
+        self.switch = WebSocket(
+            self.on_message, "0.0.0.0", 0, ws_factory_cls=unittest.mock.Mock()
+        )
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "tapws.sock")
+        self.listener = StreamListener(self.switch, path=self.path)
+        await self.listener.start()
+
+    async def asyncTearDown(self) -> None:
+        await self.listener.stop()
+        self.directory.cleanup()
+
+    async def on_message(self, message: bytes):
+        self.received.append(message)
+
+    async def read_frame(self, reader: asyncio.StreamReader) -> bytes:
+        size = int.from_bytes(await reader.readexactly(4), "big")
+        return await reader.readexactly(size)
+
+    async def testFramesSwitchedBetweenClients(self):
+        first_reader, first_writer = await asyncio.open_unix_connection(self.path)
+        second_reader, second_writer = await asyncio.open_unix_connection(self.path)
+
+        # broadcast from the first client, the tap device and the second client see it
+        hello = b"\xff" * 6 + FIRST_MAC + b"\x08\x06" + bytes(28)
+        first_writer.write(prefixed(hello))
+        await first_writer.drain()
+        self.assertEqual(await self.read_frame(second_reader), hello)
+        self.assertEqual(self.received, [hello])
+
+        # the reply is split across writes and only reaches the first client
+        reply = FIRST_MAC + SECOND_MAC + b"\x08\x06" + bytes(28)
+        data = prefixed(reply)
+        second_writer.write(data[:3])
+        await second_writer.drain()
+        second_writer.write(data[3:])
+        await second_writer.drain()
+        self.assertEqual(await self.read_frame(first_reader), reply)
+        self.assertEqual(self.received, [hello])
+
+        first_writer.close()
+        second_writer.close()
+        await first_writer.wait_closed()
+        await second_writer.wait_closed()
+
+    async def testOversizedFrameClosesConnection(self):
+        reader, writer = await asyncio.open_unix_connection(self.path)
+        writer.write(prefixed(bytes(self.switch.max_frame_size + 1)))
+        await writer.drain()
+        self.assertEqual(await reader.read(), b"")
+        self.assertEqual(self.switch.connections, set())
+        writer.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,6 +1,8 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import asyncio
+import os
 import unittest
 import unittest.mock
 import typing
@@ -18,19 +20,42 @@ class MockDevice(unittest.mock.Mock):
 
 class TestTuntapWrapper(unittest.IsolatedAsyncioTestCase):
     def setUp(self) -> None:
+        self.pipe = os.pipe()
         fake_dev = MockDevice()
-        fake_dev.fileno.return_value = 123
+        fake_dev.fileno.return_value = self.pipe[1]
         self.message = b"message"
         fake_dev.read.return_value = self.message
         wrapper = unittest.mock.Mock(return_value=fake_dev)
-        self.instance = TuntapWrapper("i", "", "", 0, device_cls=wrapper)
+        self.instance = TuntapWrapper(
+            "i", "", "", 0, device_cls=wrapper, write_high_water=2
+        )
         return super().setUp()
 
+    def tearDown(self) -> None:
+        os.close(self.pipe[0])
+        os.close(self.pipe[1])
+        return super().tearDown()
+
     def testRead(self):
         self.assertEqual(self.instance.read(), self.message)
 
+    def testReadBatch(self):
+        self.instance.device.read.side_effect = [b"a", b"b", BlockingIOError()]
+        self.assertEqual(self.instance.read_batch(64), [b"a", b"b"])
+
+        self.instance.device.read.side_effect = [b"a", b"b", b"c"]
+        self.assertEqual(self.instance.read_batch(2), [b"a", b"b"])
+
+        self.instance.device.read.side_effect = [b"a", TunError(11, "EAGAIN")]
+        self.assertEqual(self.instance.read_batch(64), [b"a"])
+
+    def testReadBatchError(self):
+        self.instance.device.read.side_effect = [TunError(5, "EIO")]
+        with self.assertRaises(TunError):
+            self.instance.read_batch(64)
+
     def testFileno(self):
-        self.assertEqual(self.instance.fileno(), 123)
+        self.assertEqual(self.instance.fileno(), self.pipe[1])
 
     def testWrite(self):
         message = b"msg"
@@ -40,9 +65,36 @@ class TestTuntapWrapper(unittest.IsolatedAsyncioTestCase):
     async def testStartStop(self):
         await self.instance.start()
         self.assertTrue(self.instance.is_up)
+        self.assertFalse(os.get_blocking(self.pipe[1]))
         await self.instance.stop()
         self.assertFalse(self.instance.is_up)
 
+    async def testAwriteBackpressure(self):
+        written = []
+        busy = [True]
+
+        def fake_write(message: bytes):
+            if busy[0]:
+                raise TunError(11, "Resource temporarily unavailable")
+            written.append(message)
+
+        await self.instance.start()
+        self.instance.device.write = fake_write
+
+        await self.instance.awrite(b"1")
+        self.assertEqual(list(self.instance.pending), [b"1"])
+
+        # the second frame reaches the high water mark and waits for the device
+        waiter = asyncio.create_task(self.instance.awrite(b"2"))
+        await asyncio.sleep(0.01)
+        self.assertFalse(waiter.done())
+
+        busy[0] = False
+        await asyncio.wait_for(waiter, 1)
+        self.assertEqual(written, [b"1", b"2"])
+        self.assertEqual(len(self.instance.pending), 0)
+        await self.instance.stop()
+
     async def testAwrite(self):
         await self.instance.awrite(b"msg")
         self.assertEqual(b"msg", self.instance.device.msg)
@@ -6,6 +6,7 @@ import unittest
 import unittest.mock
 from websockets import exceptions as websockets_exceptions
 from websockets import frames
+from .offload import GSOFrame
 from .websocket import WebSocket
 
 
@@ -25,6 +26,15 @@ class MockWsFactory(object):
         return self.m
 
 
+class MockClient(object):
+    def __init__(self, messages, subprotocol=None):
+        self.messages = messages
+        self.subprotocol = subprotocol
+
+    def __aiter__(self):
+        return self.messages
+
+
 class MockWs(object):
     def __init__(self, handler, msg, *args, **kwargs):
         self.msg = msg
@@ -43,9 +53,12 @@ class MockWs(object):
 
     def __await__(self):
         tasks = []
-        tasks.append(asyncio.create_task(self.handler(self.mock_connection_closed())))
-        tasks.append(asyncio.create_task(self.handler(self.mock_unknown_exception())))
-        tasks.append(asyncio.create_task(self.handler(self.mock_messages())))
+        for messages in (
+            self.mock_connection_closed(),
+            self.mock_unknown_exception(),
+            self.mock_messages(),
+        ):
+            tasks.append(asyncio.create_task(self.handler(MockClient(messages))))
         result = asyncio.gather(*tasks)
         yield from result
 
@@ -70,10 +83,157 @@ class TestWebSocket(unittest.IsolatedAsyncioTestCase):
 
         await ws.start()
         self.assertIsNotNone(ws.ws_server)
-        conn = unittest.mock.AsyncMock()
-        conn.mac = "ff:ff:ff:ff:ff:ff"
+        conn = unittest.mock.Mock(macs=set())
         with unittest.mock.patch.object(ws, "connections", [conn]):
             ws.broadcast(MockWsFactory.msg)
-            conn.websocket.send.assert_called_once_with(message=MockWsFactory.msg)
+            conn.send_prepared.assert_called_once_with(
+                MockWsFactory.msg, b"\x82\x11" + MockWsFactory.msg
+            )
 
         await ws.stop()
+
+    async def testUnicastUsesForwardingTable(self):
+        ws = WebSocket(
+            self.callback_helper,
+            "0.0.0.0",
+            123,
+            ws_factory_cls=MockWsFactory,
+        )
+        owner = unittest.mock.Mock(macs=set())
+        other = unittest.mock.Mock(macs=set())
+        ws.fdb.learn(b"\x02\x00\x00\x00\x00\x01", owner)
+        ws.fdb.learn(b"\x02\x00\x00\x00\x00\x02", other)
+
+        message = b"\x02\x00\x00\x00\x00\x01" + b"\x02\x00\x00\x00\x00\x02" + b"zz"
+        with unittest.mock.patch.object(ws, "connections", [owner, other]):
+            ws.broadcast(message)
+            owner.send.assert_called_once_with(message)
+            other.send.assert_not_called()
+
+        # unknown unicast destinations are not flooded
+        ws.fdb.forget(owner)
+        with unittest.mock.patch.object(ws, "connections", [owner, other]):
+            ws.broadcast(message)
+            owner.send.assert_called_once()
+            other.send.assert_not_called()
+
+    async def testSuperPacketSegmentedForClient(self):
+        ws = WebSocket(
+            self.callback_helper,
+            "0.0.0.0",
+            123,
+            ws_factory_cls=MockWsFactory,
+        )
+        owner = unittest.mock.Mock(macs=set())
+        ws.fdb.learn(b"\x02\x00\x00\x00\x00\x01", owner)
+
+        frame = GSOFrame.from_header(bytes(10), b"\x02\x00\x00\x00\x00\x01zz")
+        with unittest.mock.patch.object(
+            GSOFrame, "segments", return_value=[b"one", b"two"]
+        ) as segments:
+            ws.broadcast(frame)
+            owner.send.assert_has_calls(
+                [unittest.mock.call(b"one"), unittest.mock.call(b"two")]
+            )
+
+            # unknown destinations are dropped before paying for the segmentation
+            segments.reset_mock()
+            ws.broadcast(GSOFrame.from_header(bytes(10), b"\x02\x00\x00\x00\x00\x09zz"))
+            segments.assert_not_called()
+
+    async def testSwitchBetweenClients(self):
+        ws = WebSocket(
+            self.callback_helper,
+            "0.0.0.0",
+            123,
+            ws_factory_cls=MockWsFactory,
+        )
+        source = unittest.mock.Mock(macs=set())
+        target = unittest.mock.Mock(macs=set())
+        ws.fdb.learn(b"\x02\x00\x00\x00\x00\x01", source)
+        ws.fdb.learn(b"\x02\x00\x00\x00\x00\x02", target)
+
+        with unittest.mock.patch.object(ws, "connections", [source, target]):
+            # known destination is delivered locally and not written to the tap device
+            unicast = b"\x02\x00\x00\x00\x00\x02" + b"\x02\x00\x00\x00\x00\x01" + b"zz"
+            self.assertTrue(ws.switch(unicast, source))
+            target.send.assert_called_once_with(unicast)
+
+            # broadcast goes to the other clients and to the tap device
+            broadcast = b"\xff" * 6 + b"\x02\x00\x00\x00\x00\x01" + b"zz"
+            self.assertFalse(ws.switch(broadcast, source))
+            target.send_prepared.assert_called_once()
+            source.send_prepared.assert_not_called()
+
+            # unknown unicast (e.g. the router) goes to the tap device only
+            router = b"\x02\x00\x00\x00\x00\xfe" + b"\x02\x00\x00\x00\x00\x01" + b"zz"
+            self.assertFalse(ws.switch(router, source))
+            self.assertEqual(target.send.call_count, 1)
+
+    async def testMulticastOnlyToMembers(self):
+        from .snooping import MulticastSnooper
+
+        ws = WebSocket(
+            self.callback_helper,
+            "0.0.0.0",
+            123,
+            ws_factory_cls=MockWsFactory,
+            snooper=MulticastSnooper(),
+        )
+        member = unittest.mock.Mock(macs=set())
+        other = unittest.mock.Mock(macs=set())
+        group_mac = b"\x01\x00\x5e\x01\x01\x01"
+        ws.snooper.join(group_mac, member)  # type: ignore
+
+        with unittest.mock.patch.object(ws, "connections", [member, other]):
+            ws.broadcast(group_mac + b"\x02\x00\x00\x00\x00\xfe" + b"zz")
+            member.send_prepared.assert_called_once()
+            other.send_prepared.assert_not_called()
+
+            # unregistered groups are flooded
+            ws.broadcast(b"\x01\x00\x5e\x02\x02\x02" + b"\x02\x00\x00\x00\x00\xfe")
+            self.assertEqual(member.send_prepared.call_count, 2)
+            other.send_prepared.assert_called_once()
+
+    async def testInvalidFramesDropped(self):
+        received = []
+
+        async def on_message(message: bytes):
+            received.append(message)
+
+        ws = WebSocket(
+            on_message,
+            "0.0.0.0",
+            123,
+            ws_factory_cls=MockWsFactory,
+            local_switching=False,
+            max_frame_size=32,
+        )
+        connection = unittest.mock.Mock(invalid=0, macs=set())
+        header = b"\xff" * 6 + b"\x02\x00\x00\x00\x00\x01" + b"\x08\x00"
+        await ws.receive(header[:13], connection)
+        await ws.receive(header + bytes(19), connection)
+        await ws.receive("text", connection)  # type: ignore
+        self.assertEqual(connection.invalid, 3)
+        await ws.receive(header + bytes(18), connection)
+        self.assertEqual(received, [header + bytes(18)])
+
+    async def testBatchedClient(self):
+        from .batching import BATCH_SUBPROTOCOL, pack
+
+        received = []
+
+        async def on_message(message: bytes):
+            received.append(message)
+
+        ws = WebSocket(on_message, "0.0.0.0", 123, ws_factory_cls=MockWsFactory)
+        frames = [
+            b"\xff" * 6 + b"\x02\x00\x00\x00\x00\x01" + b"\x08\x00a",
+            b"\xff" * 12 + b"\x08\x00b",
+        ]
+
+        async def messages():
+            yield pack(frames)
+
+        await ws.handler(MockClient(messages(), BATCH_SUBPROTOCOL))  # type: ignore
+        self.assertEqual(received, frames)
@@ -0,0 +1,72 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import asyncio
+import unittest
+from .wire import WireDevice
+
+
+class TestWireDevice(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self) -> None:
+        self.device = WireDevice("wire0", "", "", 1500, write_high_water=4)
+        await self.device.start()
+        self.device.peer.setblocking(False)
+
+    async def asyncTearDown(self) -> None:
+        await self.device.stop()
+
+    def testHwaddr(self):
+        self.assertEqual(len(self.device.hwaddr), 6)
+        # locally administered unicast
+        self.assertEqual(self.device.hwaddr[0] & 0x03, 0x02)
+
+    def testReadBatch(self):
+        for frame in (b"a", b"b", b"c"):
+            self.device.peer.send(frame)
+        self.assertEqual(self.device.read(), b"a")
+        self.assertEqual(self.device.read_batch(64), [b"b", b"c"])
+        self.assertEqual(self.device.read_batch(64), [])
+        with self.assertRaises(BlockingIOError):
+            self.device.read()
+
+    async def testJumboFrame(self):
+        self.assertEqual(self.device.read_size, 1518)
+        device = WireDevice("wire1", "", "", 9000)
+        await device.start()
+        frame = bytes(range(256)) * 35 + bytes(58)
+        device.peer.send(frame)
+        self.assertEqual(device.read(), frame)
+        await device.stop()
+
+    def testReadInto(self):
+        self.device.peer.send(b"frame")
+        buffer = bytearray(self.device.read_size)
+        self.assertEqual(self.device.read_into(buffer), 5)
+        self.assertEqual(buffer[:5], b"frame")
+        with self.assertRaises(BlockingIOError):
+            self.device.read_into(buffer)
+
+    async def testWriteBackpressure(self):
+        # fill the wire until the socket buffer is full
+        frame = bytes(1500)
+        while not self.device.pending:
+            self.device.write(frame)
+
+        waiter = asyncio.create_task(self.device.drain())
+        await asyncio.sleep(0.01)
+        self.assertFalse(waiter.done())
+
+        received = 0
+        while not waiter.done():
+            try:
+                while True:
+                    self.device.peer.recv(4096)
+                    received += 1
+            except BlockingIOError:
+                pass
+            await asyncio.sleep(0.01)
+        self.assertLessEqual(len(self.device.pending), self.device.write_low_water)
+
+
+if __name__ == "__main__":
+    unittest.main()
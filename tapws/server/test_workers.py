@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import unittest
+import unittest.mock
+from .fdb import ForwardingDatabase
+from .native import MAX_GSO_SIZE
+from .offload import GSOFrame
+from .workers import MSG_FORGET, MSG_LEARN, WorkerMesh, create_links
+
+CLIENT_MAC = b"\x02\x00\x00\x00\x00\x01"
+OTHER_MAC = b"\x02\x00\x00\x00\x00\x02"
+
+
+class TestWorkerMesh(unittest.TestCase):
+    def setUp(self) -> None:
+        links = create_links(3)
+        self.meshes = []
+        for index in range(3):
+            mesh = WorkerMesh(index, links[index])
+            ws = unittest.mock.Mock(fdb=ForwardingDatabase())
+            mesh.attach(ws)
+            self.meshes.append(mesh)
+        return super().setUp()
+
+    def tearDown(self) -> None:
+        for mesh in self.meshes:
+            mesh.stop()
+        return super().tearDown()
+
+    def pump(self) -> None:
+        for mesh in self.meshes:
+            for peer in mesh.links:
+                mesh.receive(peer)
+
+    def testLearnIsAnnounced(self):
+        first, second, third = self.meshes
+        first.ws.fdb.learn(CLIENT_MAC, unittest.mock.Mock(macs=set()))
+        self.pump()
+        self.assertEqual(second.remote, {CLIENT_MAC: 0})
+        self.assertEqual(third.remote, {CLIENT_MAC: 0})
+        self.assertEqual(first.remote, {})
+
+    def testUnicastForwardedToOwner(self):
+        first, second, third = self.meshes
+        connection = unittest.mock.Mock(macs=set())
+        first.ws.fdb.learn(CLIENT_MAC, connection)
+        self.pump()
+
+        frame = CLIENT_MAC + OTHER_MAC + b"\x08\x00payload"
+        self.assertTrue(third.forward(frame))
+        self.pump()
+        first.ws.broadcast.assert_called_once_with(frame)
+        second.ws.broadcast.assert_not_called()
+
+    def testUnknownUnicastNotForwarded(self):
+        frame = CLIENT_MAC + OTHER_MAC + b"\x08\x00payload"
+        self.assertFalse(self.meshes[0].forward(frame))
+        self.pump()
+        for mesh in self.meshes:
+            mesh.ws.broadcast.assert_not_called()
+
+    def testGroupFrameReachesEverySibling(self):
+        first, second, third = self.meshes
+        frame = b"\xff" * 6 + OTHER_MAC + b"\x08\x06payload"
+        self.assertFalse(first.forward(frame))
+        self.pump()
+        first.ws.broadcast.assert_not_called()
+        second.ws.broadcast.assert_called_once_with(frame)
+        third.ws.broadcast.assert_called_once_with(frame)
+
+    def testSuperPacketKeepsHeader(self):
+        first, second, _ = self.meshes
+        second.ws.fdb.learn(CLIENT_MAC, unittest.mock.Mock(macs=set()))
+        self.pump()
+
+        header = bytes(range(10))
+        frame = GSOFrame.from_header(
+            header, CLIENT_MAC + OTHER_MAC + b"\x08\x00payload"
+        )
+        self.assertTrue(first.forward(frame))
+        self.pump()
+        (received,), _ = second.ws.broadcast.call_args
+        self.assertIsInstance(received, GSOFrame)
+        self.assertEqual(received.header, header)
+        self.assertEqual(received, frame)
+
+    def testLargestSuperPacketArrivesWhole(self):
+        first, second, _ = self.meshes
+        second.ws.fdb.learn(CLIENT_MAC, unittest.mock.Mock(macs=set()))
+        self.pump()
+
+        payload = CLIENT_MAC + OTHER_MAC + b"\x08\x00" + os.urandom(MAX_GSO_SIZE - 14)
+        frame = GSOFrame.from_header(bytes(range(10)), payload)
+        self.assertTrue(first.forward(frame))
+        self.pump()
+        (received,), _ = second.ws.broadcast.call_args
+        self.assertEqual(len(received), MAX_GSO_SIZE)
+        self.assertEqual(received, frame)
+
+    def testForgetIsAnnounced(self):
+        first, second, _ = self.meshes
+        connection = unittest.mock.Mock(macs=set())
+        first.ws.fdb.learn(CLIENT_MAC, connection)
+        self.pump()
+        first.ws.fdb.forget(connection)
+        self.pump()
+        self.assertEqual(second.remote, {})
+
+    def testMacMovedToAnotherWorker(self):
+        first, second, third = self.meshes
+        old = unittest.mock.Mock(macs=set())
+        first.ws.fdb.learn(CLIENT_MAC, old)
+        self.pump()
+        second.ws.fdb.learn(CLIENT_MAC, unittest.mock.Mock(macs=set()))
+        self.pump()
+        # the late forget from the old worker must not hide the new owner
+        first.ws.fdb.forget(old)
+        self.pump()
+        self.assertEqual(third.remote, {CLIENT_MAC: 1})
+        self.assertNotIn(CLIENT_MAC, second.remote)
+
+    def testLearnQueuedWhileLinkIsFull(self):
+        first, second, third = self.meshes
+        link = first.links[1]
+        while first.send(link, bytes(1000)):
+            pass
+
+        first.ws.fdb.learn(CLIENT_MAC, unittest.mock.Mock(macs=set()))
+        connection = unittest.mock.Mock(macs=set())
+        first.ws.fdb.learn(OTHER_MAC, connection)
+        first.ws.fdb.forget(connection)
+        # only the latest announcement per MAC is kept
+        self.assertEqual(
+            first.backlog, {1: {CLIENT_MAC: MSG_LEARN, OTHER_MAC: MSG_FORGET}}
+        )
+        self.pump()
+        self.assertEqual(third.remote, {CLIENT_MAC: 0})
+        self.assertEqual(second.remote, {})
+
+        first.retry_backlog()
+        self.assertEqual(first.backlog, {})
+        self.pump()
+        self.assertEqual(second.remote, {CLIENT_MAC: 0})
+
+
+if __name__ == "__main__":
+    unittest.main()
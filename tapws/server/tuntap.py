@@ -2,13 +2,16 @@
 # -*- coding: utf-8 -*-
 
 import logging
+import os
 import typing
-import asyncio
-from pytun import TunTapDevice, IFF_TAP, IFF_NO_PI, Error as TunError
+from pytun import TunTapDevice, Error as TunError
+from .device import BaseDevice, IFF_TAP, IFF_NO_PI
 
 
-class TuntapWrapper(object):
-    is_up: bool
+class TuntapWrapper(BaseDevice):
+    """
+    TAP device opened through pytun.
+    """
 
     def __init__(
         self,
@@ -18,11 +21,11 @@ class TuntapWrapper(object):
         mtu: int,
         *,
         flags: int = (IFF_TAP | IFF_NO_PI),
+        write_high_water: int = 256,
         device_cls: typing.Type[TunTapDevice] = TunTapDevice,
         logger: logging.Logger = logging.getLogger("tapws.tuntapwrapper"),
     ) -> None:
-        self.is_up = False
-        self.logger = logger
+        super().__init__(mtu=mtu, write_high_water=write_high_water, logger=logger)
         try:
             self.device = device_cls(interface, flags=flags)
             self.device.addr = address
@@ -44,24 +47,22 @@ class TuntapWrapper(object):
     def fileno(self) -> int:
         return self.device.fileno()
 
-    async def awrite(self, message: bytes) -> None:
-        await asyncio.get_running_loop().run_in_executor(None, self.write, message)
+    @property
+    def hwaddr(self) -> bytes:
+        return self.device.hwaddr
 
-    async def start(self) -> None:
-        if not self.is_up:
-            self.device.up()
-            self.is_up = True
+    def open(self) -> None:
+        self.device.up()
+        os.set_blocking(self.fileno(), False)
 
-    async def stop(self) -> None:
-        if self.is_up:
-            self.device.close()
-            self.is_up = False
+    def close(self) -> None:
+        self.device.close()
 
     def read(self) -> bytes:
-        return self.device.read(1024 * 4)
+        return self.device.read(self.read_size)
 
-    def write(self, message: bytes) -> None:
-        try:
-            self.device.write(message)
-        except TunError as e:
-            self.logger.error(f"Error writing to device: {e}")
+    def read_into(self, buffer: bytearray) -> int:
+        return os.readv(self.fileno(), (buffer,))
+
+    def write_frame(self, message: bytes) -> None:
+        self.device.write(message)
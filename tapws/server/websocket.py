@@ -6,14 +6,37 @@ import ssl
 import typing
 import logging
 from websockets import exceptions as websockets_exceptions
+from websockets.frames import Frame, Opcode
 from websockets.server import WebSocketServerProtocol, WebSocketServer, serve as Serve
-from .connection import Connection
-from ..utils import format_mac
+from .batching import BATCH_SUBPROTOCOL, MAX_BATCH_FRAMES, unpack
+from .compression import (
+    COMPRESSION_ADAPTIVE,
+    COMPRESSION_OFF,
+    COMPRESSION_ON,
+    CompressionStats,
+    MeteredDeflateFactory,
+)
+from .connection import Connection, DROP_TAIL
+from .device import ETH_HLEN, max_frame_size as frame_size
+from .fdb import ForwardingDatabase
+from .lean import LeanServer
+from .offload import GSOFrame
+from .snooping import MulticastSnooper
+
+if typing.TYPE_CHECKING:
+    from ..services.arp import ARPResponder
+    from .device import BaseDevice
+    from .workers import WorkerMesh
+
+ENGINE_WEBSOCKETS = "websockets"
+ENGINE_LEAN = "lean"
 
 
 class WebSocket(object):
     connections: typing.Set[Connection]
+    fdb: ForwardingDatabase
     ws_server: typing.Optional[WebSocketServer]
+    aging_task: typing.Optional[asyncio.Task]
     on_message: typing.Callable
 
     def __init__(
@@ -25,54 +48,241 @@ class WebSocket(object):
         ssl: typing.Optional[ssl.SSLContext] = None,
         logger: logging.Logger = logging.getLogger("tapws.websocket"),
         ws_factory_cls: typing.Type[Serve] = Serve,
+        fdb: typing.Optional[ForwardingDatabase] = None,
+        queue_size: int = 256,
+        drop_policy: str = DROP_TAIL,
+        local_switching: bool = True,
+        arp_responder: typing.Optional["ARPResponder"] = None,
+        snooper: typing.Optional[MulticastSnooper] = None,
+        batching: bool = True,
+        batch_flush_size: int = 16384,
+        batch_flush_interval: float = 0,
+        max_frame_size: int = frame_size(1500),
+        mesh: typing.Optional["WorkerMesh"] = None,
+        engine: str = ENGINE_WEBSOCKETS,
+        device: typing.Optional["BaseDevice"] = None,
+        compression: str = COMPRESSION_ON,
     ) -> None:
         self.connections = set()
+        self.fdb = fdb or ForwardingDatabase()
+        self.aging_task = None
+        self.queue_size = queue_size
+        self.drop_policy = drop_policy
+        self.local_switching = local_switching
+        self.arp_responder = arp_responder
+        self.snooper = snooper
+        self.batch_flush_size = batch_flush_size
+        self.batch_flush_interval = batch_flush_interval
+        self.max_frame_size = max_frame_size
+        self.mesh = mesh
         self.on_message = on_message_callback
         self.logger = logger
-        self.ws_factory = ws_factory_cls(self.handler, host, port, ssl=ssl)
+        options = dict(
+            ssl=ssl,
+            subprotocols=[BATCH_SUBPROTOCOL] if batching else None,
+            # one frame per message, or a batch of frames with their length prefixes
+            max_size=(max_frame_size + 2) * MAX_BATCH_FRAMES
+            if batching
+            else max_frame_size,
+            # workers share the listening port, the kernel spreads the connections
+            reuse_port=mesh is not None,
+        )
+        self.compression_stats = CompressionStats()
+        if engine == ENGINE_LEAN:
+            if device is None:
+                raise ValueError("The lean engine writes to the device directly")
+            self.ws_factory = LeanServer(self, device, host, port, **options)
+        else:
+            extensions = None
+            if compression != COMPRESSION_OFF:
+                extensions = [
+                    MeteredDeflateFactory(
+                        self.compression_stats,
+                        adaptive=compression == COMPRESSION_ADAPTIVE,
+                    )
+                ]
+            self.ws_factory = ws_factory_cls(
+                self.handler,
+                host,
+                port,
+                compression=None,
+                extensions=extensions,
+                **options,
+            )
         self.ws_server = None
 
         # refs: https://www.iana.org/assignments/ethernet-numbers/ethernet-numbers.xhtml
-        self.broadcast_addr = "ff:ff:ff:ff:ff:ff"
+        self.broadcast_addr = b"\xff\xff\xff\xff\xff\xff"
         self.whitelist_macs = (
-            "33:33:",
-            "01:00:5e:",
-            "00:52:02:",
+            b"\x33\x33",
+            b"\x01\x00\x5e",
+            b"\x00\x52\x02",
         )
 
+    def broadcast_many(self, messages: typing.Iterable[bytes]):
+        broadcast = self.broadcast
+        for message in messages:
+            broadcast(message)
+
     def broadcast(self, message: bytes):
-        dst_mac = format_mac(message[:6])
+        # pooled frames are memoryviews, the lookups need a hashable address
+        dst_mac = bytes(message[:6])
+
+        # unicast frames go straight to the connection that owns the MAC
+        connection = self.fdb.lookup(dst_mac)
+        if connection is not None:
+            if message.__class__ is GSOFrame:
+                for segment in message.segments():  # type: ignore
+                    connection.send(segment)
+                return
+            connection.send(message)
+            return
+
+        if dst_mac != self.broadcast_addr and not dst_mac.startswith(
+            self.whitelist_macs
+        ):
+            return
+
+        recipients = self.recipients(dst_mac)
+        if message.__class__ is GSOFrame:
+            for segment in message.segments():  # type: ignore
+                self.flood(segment, recipients=recipients)
+            return
+        self.flood(message, recipients=recipients)
+
+    def recipients(self, dst_mac: bytes) -> typing.Iterable[Connection]:
+        if self.snooper is None or dst_mac == self.broadcast_addr:
+            return self.connections
+        members = self.snooper.members(dst_mac)
+        if members is None:
+            return self.connections
+        return members
+
+    def flood(
+        self,
+        message: bytes,
+        source: typing.Optional[Connection] = None,
+        recipients: typing.Optional[typing.Iterable[Connection]] = None,
+    ):
+        if recipients is None:
+            recipients = self.connections
+        if not recipients:
+            return
+
+        # serialize the websocket frame once and share it with every recipient
+        frame = Frame(Opcode.BINARY, message).serialize(mask=False)
+        for connection in recipients:
+            if connection is not source:
+                connection.send_prepared(message, frame)
 
-        for connection in self.connections:
-            if dst_mac in (
-                self.broadcast_addr,
-                connection.mac,
-            ) or dst_mac.startswith(self.whitelist_macs):
-                asyncio.create_task(
-                    connection.websocket.send(message=message), name="broadcast"
-                )
+    def switch(self, message: bytes, source: Connection) -> bool:
+        """
+        Deliver a frame received from a client to the other local clients without going through the tap device.
+        Returns True if the frame was consumed and must not be written to the tap device.
+        """
+        dst_mac = message[:6]
+        connection = self.fdb.lookup(dst_mac)
+        if connection is not None:
+            if connection is not source:
+                connection.send(message)
+            return True
+
+        if dst_mac == self.broadcast_addr or dst_mac.startswith(self.whitelist_macs):
+            # the host (tap device) still needs to see broadcast and multicast frames
+            self.flood(message, source, self.recipients(dst_mac))
+        return False
+
+    async def age_fdb(self) -> None:
+        while True:
+            await asyncio.sleep(self.fdb.sweep_interval)
+            self.fdb.expire()
+            if self.snooper is not None:
+                self.snooper.expire()
 
     async def start(self):
         self.ws_server = await self.ws_factory
+        self.aging_task = asyncio.create_task(self.age_fdb(), name="fdb-aging")
 
     async def stop(self):
+        if self.aging_task:
+            self.aging_task.cancel()
+            self.aging_task = None
         if self.ws_server:
             self.ws_server.close()
             await self.ws_server.wait_closed()
         self.ws_server = None
+        if self.compression_stats.raw_bytes:
+            self.logger.info(f"{self.compression_stats}")
 
     async def handler(self, websocket: WebSocketServerProtocol):
-        connection = Connection(websocket, None)
-        self.connections.add(connection)
+        connection = Connection(
+            websocket, queue_size=self.queue_size, drop_policy=self.drop_policy
+        )
+        batched = websocket.subprotocol == BATCH_SUBPROTOCOL
+        if batched:
+            connection.enable_batching(self.batch_flush_size, self.batch_flush_interval)
+        self.register(connection)
 
         try:
             async for message in websocket:
-                mac = format_mac(message[6:12])  # type: ignore
-                connection.mac = mac
-                await self.on_message(message)
+                if not batched:
+                    await self.receive(message, connection)  # type: ignore
+                    continue
+                for frame in unpack(message):  # type: ignore
+                    await self.receive(frame, connection)
         except websockets_exceptions.ConnectionClosed as e:
             self.logger.info(f"Client disconnected: {e}")
         except Exception as e:
             self.logger.error(f"Unknown exception raised: {e}")
         finally:
-            self.connections.remove(connection)
+            self.unregister(connection)
+
+    def register(self, connection: Connection) -> None:
+        """
+        Add a client to the switch, also used by the other transports (`StreamListener`).
+        """
+        self.connections.add(connection)
+        connection.start()
+
+    def unregister(self, connection: Connection) -> None:
+        connection.close()
+        self.fdb.forget(connection)
+        if self.snooper is not None:
+            self.snooper.forget(connection)
+        self.connections.remove(connection)
+
+    async def receive(self, message: bytes, connection: Connection):
+        """
+        Forward a frame received from a client.
+        """
+        if self.route(message, connection):
+            await self.on_message(message)
+
+    def is_valid(self, message: bytes) -> bool:
+        return (
+            message.__class__ is not str
+            and ETH_HLEN <= len(message) <= self.max_frame_size
+        )
+
+    def route(self, message: bytes, connection: Connection) -> bool:
+        """
+        Learn from a frame received from a client and deliver it to the other clients.
+        Returns True if the frame must also be written to the tap device.
+        Text messages, runt frames and frames larger than the MTU allows are dropped.
+        """
+        if not self.is_valid(message):
+            connection.invalid += 1
+            return False
+        self.fdb.learn(message[6:12], connection)
+        if self.snooper is not None and message[0] & 1:
+            self.snooper.inspect(message, connection)
+        if self.arp_responder is not None:
+            reply = self.arp_responder.reply_to_client(message)
+            if reply is not None:
+                connection.send(reply)
+                return False
+        if self.local_switching and self.switch(message, connection):
+            return False
+        if self.mesh is not None and self.mesh.forward(message):
+            return False
+        return True
@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import logging
+import os
+import socket
+from .device import BaseDevice, IFF_TAP, IFF_NO_PI
+
+
+class WireDevice(BaseDevice):
+    """
+    Virtual wire backed by a SOCK_SEQPACKET socketpair (one frame per packet), no root needed.
+    The server uses one end like a tap device, `peer` is the far end of the wire
+    where a test or a benchmark injects and collects frames.
+    """
+
+    def __init__(
+        self,
+        interface: str,
+        address: str,
+        netmask: str,
+        mtu: int,
+        *,
+        flags: int = (IFF_TAP | IFF_NO_PI),
+        write_high_water: int = 256,
+        logger: logging.Logger = logging.getLogger("tapws.wire"),
+    ) -> None:
+        super().__init__(mtu=mtu, write_high_water=write_high_water, logger=logger)
+        self.sock, self.peer = socket.socketpair(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        # locally administered unicast address
+        self._hwaddr = bytes((0x02,)) + os.urandom(5)
+
+    def fileno(self) -> int:
+        return self.sock.fileno()
+
+    @property
+    def hwaddr(self) -> bytes:
+        return self._hwaddr
+
+    def open(self) -> None:
+        self.sock.setblocking(False)
+
+    def close(self) -> None:
+        self.sock.close()
+        self.peer.close()
+
+    def read(self) -> bytes:
+        return self.sock.recv(self.read_size)
+
+    def read_into(self, buffer: bytearray) -> int:
+        return self.sock.recv_into(buffer)
+
+    def write_frame(self, message: bytes) -> None:
+        self.sock.send(message)
@@ -0,0 +1,334 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import asyncio
+import logging
+import os
+import signal
+import socket
+import typing
+from functools import partial
+from ..utils import on_done
+from .config import ServerConfig
+from .native import MAX_GSO_SIZE
+from .offload import GSOFrame, VNET_HDR_SIZE
+from .server import Server
+
+if typing.TYPE_CHECKING:
+    from ..services.base import BaseService
+    from .websocket import WebSocket
+
+MSG_FRAME = 0
+MSG_LEARN = 1
+MSG_FORGET = 2
+MSG_GSO = 3
+
+# message kind, virtio header and the largest super-packet
+MAX_MESSAGE_SIZE = 1 + VNET_HDR_SIZE + MAX_GSO_SIZE
+
+
+class WorkerMesh(object):
+    """
+    Links a worker with its siblings so frames can reach clients connected to another process.
+    Every worker announces the MACs it learns, siblings remember which link leads to them.
+    Frames are dropped when a link is full, announcements are kept per MAC (the latest one
+    wins) and retried every `retry_interval` seconds until the sibling catches up.
+    """
+
+    links: typing.Dict[int, socket.socket]
+    remote: typing.Dict[bytes, int]
+    backlog: typing.Dict[int, typing.Dict[bytes, int]]
+    ws: typing.Optional["WebSocket"]
+
+    def __init__(
+        self,
+        index: int,
+        links: typing.Dict[int, socket.socket],
+        *,
+        retry_interval: float = 0.01,
+        logger: logging.Logger = logging.getLogger("tapws.workers"),
+    ) -> None:
+        self.index = index
+        self.links = links
+        self.remote = {}
+        self.backlog = {}
+        self.retry_interval = retry_interval
+        self.retry: typing.Optional[asyncio.TimerHandle] = None
+        self.ws = None
+        self.loop = None
+        self.dropped = 0
+        self.logger = logger
+        for link in self.links.values():
+            link.setblocking(False)
+
+    def attach(self, ws: "WebSocket") -> None:
+        self.ws = ws
+        ws.fdb.on_learn = self.announce_learn
+        ws.fdb.on_forget = self.announce_forget
+
+    def forward(self, frame: bytes) -> bool:
+        """
+        Send a frame to the sibling workers that need it.
+        Returns True if the frame was consumed by a sibling and must not be delivered locally.
+        """
+        if not self.links:
+            return False
+        dst_mac = bytes(frame[:6])
+        if dst_mac[0] & 1:
+            # group frames reach every worker, each one delivers them to its own clients
+            message = self.encode(frame)
+            for link in self.links.values():
+                if not self.send(link, message):
+                    # the sibling is falling behind, drop like a congested switch port
+                    self.dropped += 1
+            return False
+
+        peer = self.remote.get(dst_mac)
+        if peer is None:
+            return False
+        if not self.send(self.links[peer], self.encode(frame)):
+            self.dropped += 1
+        return True
+
+    def encode(self, frame: bytes) -> bytes:
+        if frame.__class__ is GSOFrame:
+            # super-packets travel whole, the receiving worker segments them
+            return bytes((MSG_GSO,)) + frame.header + frame  # type: ignore
+        return bytes((MSG_FRAME,)) + frame
+
+    def announce_learn(self, mac: bytes) -> None:
+        # the most recent announcement wins, a local client takes over the MAC
+        self.remote.pop(mac, None)
+        self.announce(MSG_LEARN, mac)
+
+    def announce_forget(self, mac: bytes) -> None:
+        self.announce(MSG_FORGET, mac)
+
+    def announce(self, kind: int, mac: bytes) -> None:
+        for peer, link in self.links.items():
+            backlog = self.backlog.get(peer)
+            if backlog is None:
+                if self.send(link, bytes((kind,)) + mac):
+                    continue
+                backlog = self.backlog[peer] = {}
+            # queued behind the earlier announcements, replacing the one for the same MAC
+            backlog.pop(mac, None)
+            backlog[mac] = kind
+            self.flush_backlog(peer)
+        if self.backlog:
+            self.schedule_retry()
+
+    def flush_backlog(self, peer: int) -> None:
+        backlog = self.backlog[peer]
+        link = self.links[peer]
+        for mac, kind in list(backlog.items()):
+            if not self.send(link, bytes((kind,)) + mac):
+                return
+            del backlog[mac]
+        del self.backlog[peer]
+
+    def schedule_retry(self) -> None:
+        if self.retry is None and self.loop is not None:
+            self.retry = self.loop.call_later(self.retry_interval, self.retry_backlog)
+
+    def retry_backlog(self) -> None:
+        self.retry = None
+        for peer in list(self.backlog):
+            self.flush_backlog(peer)
+        if self.backlog:
+            self.schedule_retry()
+
+    def send(self, link: socket.socket, message: bytes) -> bool:
+        """
+        Returns False if the link is full.
+        """
+        try:
+            link.send(message)
+        except (BlockingIOError, InterruptedError):
+            return False
+        except OSError as e:
+            self.logger.error(f"Unable to reach sibling worker: {e}")
+        return True
+
+    def receive(self, peer: int) -> None:
+        link = self.links[peer]
+        while True:
+            try:
+                message = link.recv(MAX_MESSAGE_SIZE)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as e:
+                self.logger.error(f"Unable to read from sibling worker: {e}")
+                return
+            if not message:
+                return
+            self.dispatch(message, peer)
+
+    def dispatch(self, message: bytes, peer: int) -> None:
+        kind = message[0]
+        if kind == MSG_FRAME:
+            # deliver to local clients only, never back into the mesh
+            self.ws.broadcast(message[1:])  # type: ignore
+        elif kind == MSG_GSO:
+            header = message[1 : 1 + VNET_HDR_SIZE]
+            frame = GSOFrame.from_header(header, message[1 + VNET_HDR_SIZE :])
+            self.ws.broadcast(frame)  # type: ignore
+        elif kind == MSG_LEARN:
+            self.remote[message[1:7]] = peer
+        elif kind == MSG_FORGET:
+            mac = message[1:7]
+            if self.remote.get(mac) == peer:
+                del self.remote[mac]
+
+    def start(self, loop: asyncio.AbstractEventLoop) -> None:
+        self.loop = loop
+        for peer, link in self.links.items():
+            loop.add_reader(link.fileno(), self.receive, peer)
+
+    def stop(self) -> None:
+        if self.retry is not None:
+            self.retry.cancel()
+            self.retry = None
+        if self.loop is not None:
+            for link in self.links.values():
+                self.loop.remove_reader(link.fileno())
+        for link in self.links.values():
+            link.close()
+        if self.dropped:
+            self.logger.info(f"Dropped {self.dropped} frames between workers")
+
+
+def create_links(
+    workers: int,
+    *,
+    pair: typing.Callable[[], typing.Tuple[typing.Any, typing.Any]] = partial(
+        socket.socketpair, socket.AF_UNIX, socket.SOCK_DGRAM
+    ),
+) -> typing.List[typing.Dict[int, socket.socket]]:
+    """
+    Create a link between every pair of workers, a datagram socketpair by default.
+    `RingLink.pair` connects them through shared memory instead.
+    """
+    links: typing.List[typing.Dict[int, socket.socket]] = [{} for _ in range(workers)]
+    for i in range(workers):
+        for j in range(i + 1, workers):
+            links[i][j], links[j][i] = pair()
+    return links
+
+
+class Supervisor(object):
+    """
+    Fork the worker processes and run the shared services (DHCP, netfilter) in the parent.
+    Each worker accepts websocket connections on the shared port (SO_REUSEPORT)
+    and attaches its own queue of the multi-queue tap device.
+    """
+
+    pids: typing.List[int]
+
+    def __init__(
+        self,
+        config: ServerConfig,
+        *,
+        services_factory: typing.Callable[[], typing.List["BaseService"]] = lambda: [],
+        logger: logging.Logger = logging.getLogger("tapws.supervisor"),
+    ) -> None:
+        self.config = config
+        self.services_factory = services_factory
+        self.pids = []
+        self.logger = logger
+
+    def run(self) -> int:  # pragma: no cover
+        """
+        Fork the workers, must be called before any event loop is running.
+        """
+        links = create_links(self.config.workers)
+        ready_r, ready_w = os.pipe()
+        for index in range(self.config.workers):
+            pid = os.fork()
+            if pid == 0:
+                os.close(ready_r)
+                for peer, peer_links in enumerate(links):
+                    if peer != index:
+                        for link in peer_links.values():
+                            link.close()
+                code = 0
+                try:
+                    asyncio.run(self.worker(index, links[index], ready_w))
+                except Exception as e:
+                    self.logger.error(f"Worker {index} failed: {e}")
+                    code = 1
+                finally:
+                    os._exit(code)
+            self.pids.append(pid)
+
+        os.close(ready_w)
+        for peer_links in links:
+            for link in peer_links.values():
+                link.close()
+        return asyncio.run(self.supervise(ready_r))
+
+    async def worker(
+        self, index: int, links: typing.Dict[int, socket.socket], ready: int
+    ) -> None:  # pragma: no cover
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        waiter.add_done_callback(partial(on_done, self.logger))
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, waiter.set_result, None)
+
+        mesh = WorkerMesh(index, links)
+        async with Server(self.config, mesh=mesh):
+            os.write(ready, b"\x01")
+            os.close(ready)
+            await waiter
+
+    async def supervise(self, ready: int) -> int:  # pragma: no cover
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, waiter.set_result, None)
+
+        # the tap device only exists once the workers attached their queues
+        started = 0
+        while started < len(self.pids):
+            data = await loop.run_in_executor(None, os.read, ready, len(self.pids))
+            if not data:
+                break
+            started += len(data)
+        os.close(ready)
+
+        services = []
+        code = 0
+        if started < len(self.pids):
+            self.logger.error("A worker exited before it was ready")
+            code = 1
+        else:
+            services = self.services_factory()
+            for service in services:
+                await service.start()
+            self.logger.info(f"Started {started} workers")
+
+            exited = loop.run_in_executor(None, os.wait)
+            done, _ = await asyncio.wait(
+                (waiter, exited), return_when=asyncio.FIRST_COMPLETED
+            )
+            if exited in done:
+                pid, status = exited.result()
+                self.pids.remove(pid)
+                self.logger.error(f"Worker {pid} exited with status {status}")
+                code = 1
+
+        for service in services:
+            await service.stop()
+        for pid in self.pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+        for pid in self.pids:
+            try:
+                await loop.run_in_executor(None, os.waitpid, pid, 0)
+            except ChildProcessError:
+                # already reaped by the pending os.wait()
+                pass
+        return code
@@ -2,7 +2,8 @@
 # -*- coding: utf-8 -*-
 #
 
-__all__ = ["DHCPServer", "DHCPConfig", "Netfilter"]
+__all__ = ["DHCPServer", "DHCPConfig", "Netfilter", "ARPResponder"]
+from .arp import ARPResponder
 from .dhcp import DHCPServer
 from .netfilter import Netfilter
 from .dhcp.config import DHCPConfig
@@ -0,0 +1,5 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+__all__ = ["ARPResponder"]
+from .responder import ARPResponder
@@ -0,0 +1,129 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import logging
+import struct
+from ipaddress import IPv4Address
+from typing import Callable, Optional
+
+from ..dhcp.database import Database
+from ...utils import format_mac
+
+ETH_TYPE_ARP = b"\x08\x06"
+ARP_REQUEST = 1
+ARP_REPLY = 2
+
+# htype, ptype, hlen, plen, oper, sha, spa, tha, tpa
+ARP_FORMAT = struct.Struct("!HHBBH6s4s6s4s")
+ARP_HEADER = b"\x00\x01\x08\x00\x06\x04"
+ETH_MIN_SIZE = 60
+
+
+class ARPResponder(object):
+    """
+    Answers ARP requests from the DHCP lease table so they are not flooded to every client.
+    Requests from clients for the router or another leased IP are answered directly,
+    requests from the host (tap device) for a leased IP are answered on behalf of the client.
+    Anything else (cache miss) is forwarded as usual.
+    A lease outlives the connection of its client, with `is_connected` set (the server sets
+    it to look the MAC up in the switch) only clients that are still attached are answered for.
+    """
+
+    __slots__ = (
+        "database",
+        "router_ip",
+        "router_mac",
+        "is_connected",
+        "logger",
+        "is_debug",
+    )
+
+    def __init__(
+        self,
+        database: Database,
+        router_ip: IPv4Address,
+        *,
+        router_mac: Optional[bytes] = None,
+        is_connected: Optional[Callable[[bytes], bool]] = None,
+        logger: logging.Logger = logging.getLogger("tapws.arp"),
+    ) -> None:
+        self.database = database
+        self.router_ip = router_ip.packed
+        self.router_mac = router_mac
+        self.is_connected = is_connected
+        self.logger = logger
+        self.is_debug = self.logger.isEnabledFor(logging.DEBUG)
+
+    @staticmethod
+    def parse_request(frame: bytes) -> Optional[tuple]:
+        if frame[12:14] != ETH_TYPE_ARP or len(frame) < 42:
+            return None
+        _, _, _, _, oper, sha, spa, _, tpa = ARP_FORMAT.unpack_from(frame, 14)
+        if oper != ARP_REQUEST or spa == tpa:
+            # ignore replies and gratuitous ARP announcements
+            return None
+        return sha, spa, tpa
+
+    @staticmethod
+    def build_reply(
+        mac: bytes, ip: bytes, target_mac: bytes, target_ip: bytes
+    ) -> bytes:
+        frame = b"".join(
+            (
+                target_mac,
+                mac,
+                ETH_TYPE_ARP,
+                ARP_HEADER,
+                ARP_REPLY.to_bytes(2, "big"),
+                mac,
+                ip,
+                target_mac,
+                target_ip,
+            )
+        )
+        return frame.ljust(ETH_MIN_SIZE, b"\x00")
+
+    def lookup(self, ip: bytes) -> Optional[bytes]:
+        lease = self.database.get_lease_by_ip(int.from_bytes(ip, "big"))
+        if lease is None or lease.expired:
+            return None
+        if self.is_connected is not None and not self.is_connected(lease.mac):
+            return None
+        return lease.mac
+
+    def reply_to_client(self, frame: bytes) -> Optional[bytes]:
+        """
+        Build the reply for an ARP request sent by a client, or None if it has to be forwarded.
+        """
+        request = self.parse_request(frame)
+        if request is None:
+            return None
+        sha, spa, tpa = request
+
+        if tpa == self.router_ip:
+            mac = self.router_mac
+        else:
+            mac = self.lookup(tpa)
+        if mac is None or mac == sha:
+            return None
+
+        if self.is_debug:
+            self.logger.debug(f"{IPv4Address(tpa)} is at {format_mac(mac)}")
+        return self.build_reply(mac, tpa, sha, spa)
+
+    def reply_to_host(self, frame: bytes) -> Optional[bytes]:
+        """
+        Build the reply for an ARP request sent by the host, or None if it has to be forwarded.
+        """
+        request = self.parse_request(frame)
+        if request is None:
+            return None
+        sha, spa, tpa = request
+
+        mac = self.lookup(tpa)
+        if mac is None:
+            return None
+
+        if self.is_debug:
+            self.logger.debug(f"{IPv4Address(tpa)} is at {format_mac(mac)} (host)")
+        return self.build_reply(mac, tpa, sha, spa)
@@ -0,0 +1,110 @@
+import unittest
+import unittest.mock
+from ipaddress import IPv4Address
+
+from ..dhcp.database import Database
+from ..dhcp.lease import Lease
+from .responder import ARPResponder
+
+ROUTER_MAC = b"\x02\xaa\xaa\xaa\xaa\xaa"
+CLIENT_MAC = b"\x02\x00\x00\x00\x00\x01"
+LEASED_MAC = b"\x02\x00\x00\x00\x00\x02"
+ROUTER_IP = IPv4Address("10.0.0.254")
+CLIENT_IP = IPv4Address("10.0.0.1")
+LEASED_IP = IPv4Address("10.0.0.2")
+
+
+def arp_request(sha: bytes, spa: IPv4Address, tpa: IPv4Address) -> bytes:
+    return (
+        b"\xff" * 6
+        + sha
+        + b"\x08\x06"
+        + b"\x00\x01\x08\x00\x06\x04\x00\x01"
+        + sha
+        + spa.packed
+        + b"\x00" * 6
+        + tpa.packed
+    )
+
+
+class TestARPResponder(unittest.TestCase):
+    def setUp(self) -> None:
+        self.database = Database(3600, leases=[])
+        self.database.add_lease(Lease(LEASED_MAC, int(LEASED_IP), 3600))
+        self.responder = ARPResponder(self.database, ROUTER_IP, router_mac=ROUTER_MAC)
+        return super().setUp()
+
+    def testReplyRouterToClient(self):
+        reply = self.responder.reply_to_client(
+            arp_request(CLIENT_MAC, CLIENT_IP, ROUTER_IP)
+        )
+        expected = (
+            CLIENT_MAC
+            + ROUTER_MAC
+            + b"\x08\x06"
+            + b"\x00\x01\x08\x00\x06\x04\x00\x02"
+            + ROUTER_MAC
+            + ROUTER_IP.packed
+            + CLIENT_MAC
+            + CLIENT_IP.packed
+        )
+        self.assertEqual(reply, expected.ljust(60, b"\x00"))
+
+    def testReplyLeaseToClient(self):
+        reply = self.responder.reply_to_client(
+            arp_request(CLIENT_MAC, CLIENT_IP, LEASED_IP)
+        )
+        self.assertIsNotNone(reply)
+        self.assertEqual(reply[:12], CLIENT_MAC + LEASED_MAC)  # type: ignore
+        self.assertEqual(reply[28:32], LEASED_IP.packed)  # type: ignore
+
+    def testReplyLeaseToHost(self):
+        reply = self.responder.reply_to_host(
+            arp_request(ROUTER_MAC, ROUTER_IP, LEASED_IP)
+        )
+        self.assertIsNotNone(reply)
+        self.assertEqual(reply[:12], ROUTER_MAC + LEASED_MAC)  # type: ignore
+
+    def testOnlyConnectedClientsAnswered(self):
+        connected = set()
+        self.responder.is_connected = connected.__contains__
+        request = arp_request(ROUTER_MAC, ROUTER_IP, LEASED_IP)
+        # the lease is still valid but its client went away
+        self.assertIsNone(self.responder.reply_to_host(request))
+        self.assertIsNone(
+            self.responder.reply_to_client(
+                arp_request(CLIENT_MAC, CLIENT_IP, LEASED_IP)
+            )
+        )
+        connected.add(LEASED_MAC)
+        self.assertIsNotNone(self.responder.reply_to_host(request))
+
+    def testCacheMissIsForwarded(self):
+        unknown = IPv4Address("10.0.0.3")
+        self.assertIsNone(
+            self.responder.reply_to_client(arp_request(CLIENT_MAC, CLIENT_IP, unknown))
+        )
+        self.assertIsNone(
+            self.responder.reply_to_host(arp_request(ROUTER_MAC, ROUTER_IP, unknown))
+        )
+        # the host answers for its own address
+        self.assertIsNone(
+            self.responder.reply_to_host(arp_request(LEASED_MAC, LEASED_IP, ROUTER_IP))
+        )
+
+    def testIgnoreOtherFrames(self):
+        # gratuitous ARP
+        self.assertIsNone(
+            self.responder.reply_to_client(
+                arp_request(LEASED_MAC, LEASED_IP, LEASED_IP)
+            )
+        )
+        # the owner asking for its own address (duplicate address detection)
+        self.assertIsNone(
+            self.responder.reply_to_client(
+                arp_request(LEASED_MAC, CLIENT_IP, LEASED_IP)
+            )
+        )
+        ipv4 = b"\xff" * 6 + CLIENT_MAC + b"\x08\x00" + b"\x00" * 28
+        self.assertIsNone(self.responder.reply_to_client(ipv4))
+        self.assertIsNone(self.responder.reply_to_client(b"\x00" * 14))
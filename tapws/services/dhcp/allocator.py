@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import random
+import zlib
+from ipaddress import IPv4Network
+from typing import Iterable, Optional
+
+from .packets import IPv4UnavailableError
+
+STRATEGY_NEXT_FIT = "next-fit"
+STRATEGY_RANDOM = "random"
+STRATEGY_HASH = "hash"
+STRATEGIES = (STRATEGY_NEXT_FIT, STRATEGY_RANDOM, STRATEGY_HASH)
+
+FREE = 0
+LEASED = 1
+RESERVED = 2
+
+
+class AddressPool:
+    """
+    Free addresses of the DHCP network, one byte per address offset.
+    Where the search for a free address starts depends on `strategy`:
+    `next-fit` continues after the last address handed out, `random` picks a random offset
+    and `hash` derives it from the MAC address, so a client gets the same address back
+    as long as it is free. The search itself is `bytearray.find`.
+    """
+
+    __slots__ = ("network", "base", "slots", "free", "cursor", "strategy", "random")
+
+    def __init__(
+        self,
+        network: IPv4Network,
+        *,
+        reserved: Iterable[int] = (),
+        strategy: str = STRATEGY_NEXT_FIT,
+        rng: random.Random = random.Random(),
+    ) -> None:
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown allocation strategy: {strategy}")
+        self.network = network
+        self.base = int(network.network_address)
+        self.slots = bytearray(network.num_addresses)
+        self.free = network.num_addresses
+        self.cursor = 0
+        self.strategy = strategy
+        self.random = rng
+        self._reserve(self.base)
+        self._reserve(int(network.broadcast_address))
+        for ip in reserved:
+            self._reserve(ip)
+
+    def __len__(self) -> int:
+        return self.free
+
+    def _offset(self, ip: int) -> int:
+        offset = ip - self.base
+        if offset < 0 or offset >= len(self.slots):
+            return -1
+        return offset
+
+    def _reserve(self, ip: int) -> None:
+        offset = self._offset(ip)
+        if offset >= 0 and self.slots[offset] == FREE:
+            self.free -= 1
+        if offset >= 0:
+            self.slots[offset] = RESERVED
+
+    def is_free(self, ip: int) -> bool:
+        offset = self._offset(ip)
+        return offset >= 0 and self.slots[offset] == FREE
+
+    def find(self, mac: Optional[bytes] = None) -> int:
+        """
+        Return a free address without taking it (an offer), the next search starts after it.
+        :exception: IPv4UnavailableError when the pool is full
+        """
+        if not self.free:
+            raise IPv4UnavailableError("DHCP server is full")
+        slots = self.slots
+        if self.strategy == STRATEGY_NEXT_FIT:
+            start = self.cursor
+        elif self.strategy == STRATEGY_HASH and mac is not None:
+            start = zlib.crc32(mac) % len(slots)
+        else:
+            start = self.random.randrange(len(slots))
+        offset = slots.find(FREE, start)
+        if offset < 0:
+            offset = slots.find(FREE, 0, start)
+        self.cursor = offset + 1
+        return self.base + offset
+
+    def take(self, ip: int) -> bool:
+        """
+        Mark a leased address, returns False if it isn't free.
+        """
+        offset = self._offset(ip)
+        if offset < 0 or self.slots[offset] != FREE:
+            return False
+        self.slots[offset] = LEASED
+        self.free -= 1
+        return True
+
+    def release(self, ip: int) -> None:
+        offset = self._offset(ip)
+        if offset >= 0 and self.slots[offset] == LEASED:
+            self.slots[offset] = FREE
+            self.free += 1
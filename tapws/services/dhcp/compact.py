@@ -0,0 +1,168 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import heapq
+import logging
+import math
+import time
+from array import array
+from ipaddress import IPv4Network
+from typing import AsyncGenerator, Dict, Iterator, List, Optional
+
+from .database import Database
+from .lease import Lease
+
+
+class CompactDatabase(Database):
+    """
+    Lease store for large networks, the leases are kept in parallel arrays indexed by the
+    offset of their IP address in the network and `Lease` objects are only built on lookup.
+    Only the MAC address index is a dict.
+    Deadlines are bucketed by second (a timing wheel), a renewed lease is appended to its
+    new bucket and its old entry is skipped when that bucket comes up.
+    """
+
+    __slots__ = (
+        "network",
+        "base",
+        "used",
+        "macs",
+        "leased_at",
+        "lease_times",
+        "offsets",
+        "buckets",
+        "bucket_keys",
+    )
+
+    def __init__(
+        self,
+        lease_time: int,
+        network: IPv4Network,
+        *,
+        logger: logging.Logger = logging.getLogger("tapws.dhcp.database"),
+    ) -> None:
+        super().__init__(lease_time, logger=logger)
+        size = network.num_addresses
+        self.network = network
+        self.base = int(network.network_address)
+        self.used = bytearray(size)
+        self.macs = bytearray(6 * size)
+        self.leased_at = array("d", bytes(8 * size))
+        self.lease_times = array("q", bytes(8 * size))
+        self.offsets: Dict[bytes, int] = {}
+        self.buckets: Dict[int, array] = {}
+        self.bucket_keys: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self.offsets)
+
+    def __iter__(self) -> Iterator[Lease]:
+        return iter([self._lease(offset) for offset in self.offsets.values()])
+
+    def _lease(self, offset: int) -> Lease:
+        return Lease(
+            bytes(self.macs[6 * offset : 6 * offset + 6]),
+            self.base + offset,
+            self.lease_times[offset],
+            self.leased_at[offset],
+        )
+
+    def _offset(self, ip: int) -> int:
+        offset = ip - self.base
+        if offset < 0 or offset >= len(self.used):
+            return -1
+        return offset
+
+    def _deadline(self, offset: int) -> float:
+        lease_time = self.lease_times[offset]
+        if lease_time == -1:
+            return math.inf
+        return self.leased_at[offset] + lease_time
+
+    def get_lease(self, mac: bytes) -> Optional[Lease]:
+        offset = self.offsets.get(mac)
+        if offset is None:
+            return None
+        return self._lease(offset)
+
+    def get_lease_by_ip(self, ip: int) -> Optional[Lease]:
+        offset = self._offset(ip)
+        if offset < 0 or not self.used[offset]:
+            return None
+        return self._lease(offset)
+
+    def is_ip_available(self, ip: int) -> bool:
+        offset = self._offset(ip)
+        return offset < 0 or not self.used[offset]
+
+    async def expired_leases(
+        self, now: Optional[float] = None
+    ) -> AsyncGenerator[Lease, None]:
+        """
+        Leases past their deadline, up to a second late, the caller removes them.
+        """
+        if now is None:
+            now = time.monotonic()
+        keys = self.bucket_keys
+        expired = set()
+        while keys and keys[0] <= now:
+            key = heapq.heappop(keys)
+            for offset in self.buckets.pop(key):
+                if self.used[offset] and math.ceil(self._deadline(offset)) == key:
+                    expired.add(offset)
+        for offset in sorted(expired):
+            yield self._lease(offset)
+
+    def next_expiry(self) -> Optional[float]:
+        if not self.bucket_keys:
+            return None
+        return self.bucket_keys[0]
+
+    def _schedule(self, offset: int) -> None:
+        deadline = self._deadline(offset)
+        if deadline == math.inf:
+            return
+        key = math.ceil(deadline)
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = array("I")
+            heapq.heappush(self.bucket_keys, key)
+        bucket.append(offset)
+
+    def add_lease(self, lease: Lease) -> None:
+        offset = self._offset(lease.ip)
+        if offset < 0:
+            raise ValueError(f"{lease} is outside of {self.network}")
+        previous = self.offsets.get(lease.mac)
+        if previous is not None:
+            # a client holds a single lease
+            self.used[previous] = 0
+        if self.used[offset]:
+            # the address was leased to another client
+            del self.offsets[bytes(self.macs[6 * offset : 6 * offset + 6])]
+        self.offsets[lease.mac] = offset
+        self.used[offset] = 1
+        self.macs[6 * offset : 6 * offset + 6] = lease.mac
+        self.leased_at[offset] = lease.leased_at
+        self.lease_times[offset] = lease.lease_time
+        self._schedule(offset)
+
+    def remove_lease(self, lease: Lease) -> None:
+        offset = self.offsets.get(lease.mac)
+        if offset is None or self.base + offset != lease.ip:
+            self.logger.warning(f"Lease {lease} not found in database")
+            return
+        if self.is_debug:
+            self.logger.debug(f"Removing lease {lease} from database")
+        del self.offsets[lease.mac]
+        self.used[offset] = 0
+
+    def renew_lease(self, lease: Lease) -> None:
+        offset = self.offsets.get(lease.mac)
+        if offset is None:
+            self.logger.warning(f"Lease {lease} not found in database")
+            return
+        lease.renew(self.lease_time)
+        self.leased_at[offset] = lease.leased_at
+        self.lease_times[offset] = lease.lease_time
+        self._schedule(offset)
@@ -4,6 +4,8 @@
 from ipaddress import IPv4Address, IPv4Network
 from typing import List
 
+from .allocator import STRATEGY_NEXT_FIT
+
 
 class DHCPConfig:  # pragma: no cover
     __slots__ = (
@@ -13,6 +15,8 @@ class DHCPConfig:  # pragma: no cover
         "bind_interface",
         "lease_time",
         "dns_ips",
+        "mtu",
+        "allocation_strategy",
     )
 
     def __init__(
@@ -23,6 +27,8 @@ class DHCPConfig:  # pragma: no cover
         bind_interface: str,
         lease_time: int = 3600,
         dns_ips: List[IPv4Address] = [IPv4Address("1.1.1.1")],
+        mtu: int = 1500,
+        allocation_strategy: str = STRATEGY_NEXT_FIT,
     ) -> None:
         self.server_ip = server_ip
         self.server_network = server_network
@@ -30,6 +36,8 @@ class DHCPConfig:  # pragma: no cover
         self.dns_ips = dns_ips
         self.bind_interface = bind_interface
         self.lease_time = lease_time
+        self.mtu = mtu
+        self.allocation_strategy = allocation_strategy
 
     @property
     def netmask_ip(self) -> IPv4Address:
@@ -42,4 +50,5 @@ class DHCPConfig:  # pragma: no cover
             "netmask_ip": self.netmask_ip,
             "dns_ips": self.dns_ips,
             "lease_time": self.lease_time,
+            "mtu": self.mtu,
         }
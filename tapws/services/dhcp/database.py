@@ -1,51 +1,124 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
+import heapq
+import itertools
 import logging
-from typing import AsyncGenerator, List, Optional
+import math
+import time
+from typing import AsyncGenerator, Dict, Iterable, Iterator, List, Optional, Tuple
 
 from .lease import Lease
 
 
 class Database:
-    __slots__ = ("leases", "lease_time", "logger", "is_debug")
+    """
+    In-memory lease store, indexed by MAC address (`leases`) and by IP address (`ips`).
+    Expiring leases are also kept in a heap ordered by deadline (`time.monotonic()`).
+    Removed and renewed leases stay in the heap and are skipped when they come up.
+    """
+
+    __slots__ = (
+        "leases",
+        "ips",
+        "deadlines",
+        "sequence",
+        "lease_time",
+        "logger",
+        "is_debug",
+    )
 
     def __init__(
         self,
         lease_time: int,
         *,
-        leases: List[Lease] = [],
+        leases: Iterable[Lease] = (),
         logger: logging.Logger = logging.getLogger("tapws.dhcp.database"),
     ) -> None:
         self.logger = logger
         self.is_debug = self.logger.isEnabledFor(logging.DEBUG)
         self.lease_time = lease_time
-        self.leases: List[Lease] = leases
+        self.leases: Dict[bytes, Lease] = {}
+        self.ips: Dict[int, Lease] = {}
+        self.deadlines: List[Tuple[float, int, Lease]] = []
+        self.sequence = itertools.count()
+        for lease in leases:
+            self.add_lease(lease)
+
+    def __len__(self) -> int:
+        return len(self.leases)
+
+    def __iter__(self) -> Iterator[Lease]:
+        return iter(list(self.leases.values()))
 
     def get_lease(self, mac: bytes) -> Optional[Lease]:
-        for lease in self.leases:
-            if lease.mac == mac:
-                return lease
-        return None
+        return self.leases.get(mac)
+
+    def get_lease_by_ip(self, ip: int) -> Optional[Lease]:
+        return self.ips.get(ip)
 
-    async def expired_leases(self) -> AsyncGenerator[Lease, None]:
-        for lease in self.leases:
-            if lease.expired:
-                yield lease
+    async def expired_leases(
+        self, now: Optional[float] = None
+    ) -> AsyncGenerator[Lease, None]:
+        """
+        Leases past their deadline, the caller removes them.
+        """
+        if now is None:
+            now = time.monotonic()
+        deadlines = self.deadlines
+        expired = []
+        while deadlines and deadlines[0][0] < now:
+            deadline, _, lease = heapq.heappop(deadlines)
+            if self.leases.get(lease.mac) is lease and lease.deadline == deadline:
+                expired.append(lease)
+        for lease in expired:
+            yield lease
+
+    def next_expiry(self) -> Optional[float]:
+        """
+        The earliest deadline in the heap, it may belong to a lease renewed since.
+        """
+        if not self.deadlines:
+            return None
+        return self.deadlines[0][0]
+
+    def _schedule(self, lease: Lease) -> None:
+        deadline = lease.deadline
+        if deadline == math.inf:
+            return
+        deadlines = self.deadlines
+        heapq.heappush(deadlines, (deadline, next(self.sequence), lease))
+        if len(deadlines) > 2 * len(self.leases) + 64:
+            # mostly renewed or removed leases, drop the stale entries
+            self.deadlines = [
+                entry
+                for entry in deadlines
+                if self.leases.get(entry[2].mac) is entry[2]
+                and entry[2].deadline == entry[0]
+            ]
+            heapq.heapify(self.deadlines)
 
     def is_ip_available(self, ip: int) -> bool:
-        return ip not in [lease.ip for lease in self.leases]
+        return ip not in self.ips
 
     def add_lease(self, lease: Lease) -> None:
-        self.leases.append(lease)
+        previous = self.leases.get(lease.mac)
+        if previous is not None:
+            # a client holds a single lease
+            self.remove_lease(previous)
+        self.leases[lease.mac] = lease
+        self.ips[lease.ip] = lease
+        self._schedule(lease)
 
     def remove_lease(self, lease: Lease) -> None:
-        if lease not in self.leases:
+        if self.leases.get(lease.mac) is not lease:
             self.logger.warning(f"Lease {lease} not found in database")
             return
         if self.is_debug:
             self.logger.debug(f"Removing lease {lease} from database")
-        self.leases.remove(lease)
+        del self.leases[lease.mac]
+        if self.ips.get(lease.ip) is lease:
+            del self.ips[lease.ip]
 
     def renew_lease(self, lease: Lease) -> None:
         existing_lease = self.get_lease(lease.mac)
@@ -53,3 +126,4 @@ class Database:
             self.logger.warning(f"Lease {lease} not found in database")
             return
         existing_lease.renew(self.lease_time)
+        self._schedule(existing_lease)
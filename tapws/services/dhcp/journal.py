@@ -0,0 +1,180 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+Append-only lease journal.
+
+Every lease added, renewed or removed is appended to `path` as a fixed size record,
+the current leases are periodically written to `path.snapshot` and the journal starts
+over. On startup the snapshot and then the journal are replayed into the database.
+Records are batched in memory and written (and fsynced) by a single worker thread, so
+the event loop never waits for the disk. A crash loses at most `flush_interval` seconds.
+"""
+
+import asyncio
+import concurrent.futures
+import logging
+import os
+import struct
+import time
+from typing import Dict, Optional, Tuple
+
+from .database import Database
+from .lease import Lease
+
+OP_ADD = 1
+OP_RENEW = 2
+OP_REMOVE = 3
+
+# op, mac, ip, lease time, leased at (wall clock)
+_record = struct.Struct("!B6sIid")
+RECORD_SIZE = _record.size
+
+
+class LeaseJournal:
+    __slots__ = (
+        "path",
+        "snapshot_path",
+        "flush_interval",
+        "compact_threshold",
+        "pending",
+        "records",
+        "handle",
+        "executor",
+        "file",
+        "logger",
+    )
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        flush_interval: float = 1.0,
+        compact_threshold: int = 10000,
+        logger: logging.Logger = logging.getLogger("tapws.dhcp.journal"),
+    ) -> None:
+        self.path = path
+        self.snapshot_path = path + ".snapshot"
+        self.flush_interval = flush_interval
+        # the journal is compacted once it holds this many records more than the leases
+        self.compact_threshold = compact_threshold
+        self.pending = bytearray()
+        self.records = 0
+        self.handle: Optional[asyncio.TimerHandle] = None
+        self.executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+        self.file = None
+        self.logger = logger
+
+    def load(self, database: Database) -> int:
+        """
+        Replay the snapshot and the journal into `database`, returns the number of leases.
+        Expired leases are skipped, a torn record at the end of the journal is ignored.
+        """
+        leases: Dict[bytes, Tuple[int, int, float]] = {}
+        records = 0
+        for path in (self.snapshot_path, self.path):
+            try:
+                with open(path, "rb") as file:
+                    data = file.read()
+            except FileNotFoundError:
+                continue
+            end = len(data) - len(data) % RECORD_SIZE
+            if end != len(data):
+                self.logger.warning(f"Ignoring a torn record at the end of {path}")
+            for op, mac, ip, lease_time, leased_at in _record.iter_unpack(
+                memoryview(data)[:end]
+            ):
+                if op == OP_REMOVE:
+                    leases.pop(mac, None)
+                else:
+                    leases[mac] = (ip, lease_time, leased_at)
+            if path == self.path:
+                records = end // RECORD_SIZE
+
+        # wall clock timestamps back to time.monotonic()
+        now = time.time()
+        offset = time.monotonic() - now
+        for mac, (ip, lease_time, leased_at) in leases.items():
+            if lease_time != -1 and leased_at + lease_time < now:
+                continue
+            database.add_lease(Lease(mac, ip, lease_time, leased_at + offset))
+        self.records = records
+        self.logger.info(f"Loaded {len(database)} leases from {self.path}")
+        return len(database)
+
+    def start(self) -> None:
+        self.executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="lease-journal"
+        )
+        self.file = open(self.path, "ab")
+
+    async def stop(self) -> None:
+        if self.handle is not None:
+            self.handle.cancel()
+        self.flush()
+        executor = self.executor
+        if executor is None:
+            return
+        self.executor = None
+        await asyncio.get_running_loop().run_in_executor(executor, self.file.close)  # type: ignore
+        executor.shutdown()
+        self.file = None
+
+    def record(self, op: int, lease: Lease) -> None:
+        leased_at = time.time() - (time.monotonic() - lease.leased_at)
+        self.pending += _record.pack(
+            op, lease.mac, lease.ip, lease.lease_time, leased_at
+        )
+        self.records += 1
+        if self.handle is None and self.executor is not None:
+            self.handle = asyncio.get_running_loop().call_later(
+                self.flush_interval, self.flush
+            )
+
+    def flush(self) -> None:
+        self.handle = None
+        if not self.pending or self.executor is None:
+            return
+        data = bytes(self.pending)
+        self.pending.clear()
+        self.executor.submit(self._write, data).add_done_callback(self._on_done)
+
+    def compact(self, database: Database) -> None:
+        """
+        Write the current leases to the snapshot and empty the journal.
+        """
+        if self.executor is None:
+            return
+        self.flush()
+        now = time.time() - time.monotonic()
+        snapshot = b"".join(
+            _record.pack(
+                OP_ADD, lease.mac, lease.ip, lease.lease_time, lease.leased_at + now
+            )
+            for lease in database
+        )
+        self.records = 0
+        self.executor.submit(self._snapshot, snapshot).add_done_callback(self._on_done)
+
+    def should_compact(self, database: Database) -> bool:
+        return self.records > len(database) + self.compact_threshold
+
+    def _write(self, data: bytes) -> None:
+        self.file.write(data)  # type: ignore
+        self.file.flush()  # type: ignore
+        os.fsync(self.file.fileno())  # type: ignore
+
+    def _snapshot(self, data: bytes) -> None:
+        temporary = self.snapshot_path + ".tmp"
+        with open(temporary, "wb") as file:
+            file.write(data)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temporary, self.snapshot_path)
+        # the records written so far are in the snapshot, the queued ones come after
+        self.file.truncate(0)  # type: ignore
+        os.fsync(self.file.fileno())  # type: ignore
+
+    def _on_done(self, future: concurrent.futures.Future) -> None:
+        if future.exception():
+            self.logger.error(f"Lease journal write failed: {future.exception()}")
@@ -1,8 +1,10 @@
 #!/usr/bin/env python
 # -*- coding: utf-8 -*-
 
-from datetime import datetime, timedelta
+import math
+import time
 from ipaddress import IPv4Address
+from typing import Optional
 
 from ...utils import format_mac
 
@@ -11,23 +13,32 @@ class Lease:
     __slots__ = ("mac", "ip", "lease_time", "leased_at")
 
     def __init__(
-        self, mac: bytes, ip: int, lease_time: int, leased_at: datetime = datetime.now()
+        self,
+        mac: bytes,
+        ip: int,
+        lease_time: int,
+        leased_at: Optional[float] = None,
     ) -> None:
         self.mac = mac
         self.ip = ip
-        self.leased_at = leased_at
+        # time.monotonic() seconds
+        self.leased_at = time.monotonic() if leased_at is None else leased_at
         self.lease_time = lease_time
 
     @property
-    def expired(self) -> bool:
+    def deadline(self) -> float:
         if self.lease_time == -1:
-            return False
-        return self.leased_at + timedelta(seconds=self.lease_time) < datetime.now()
+            return math.inf
+        return self.leased_at + self.lease_time
+
+    @property
+    def expired(self) -> bool:
+        return self.deadline < time.monotonic()
 
     def renew(self, lease_time: int) -> "Lease":
         if lease_time < 1:
             raise ValueError(f"Lease time must be greater than zero")
-        self.leased_at = datetime.now()
+        self.leased_at = time.monotonic()
         self.lease_time = lease_time
         return self
 
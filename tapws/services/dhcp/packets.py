@@ -53,6 +53,7 @@ class DHCPPacket(dhcp.DHCP):
         xid: int,
         lease_time: int = 3600,
         dns_ips: list = ["1.1.1.1"],
+        mtu: int = 1500,
     ) -> "DHCPPacket":
         packet = cls(
             chaddr=mac,
@@ -70,6 +71,7 @@ class DHCPPacket(dhcp.DHCP):
             dns_ips=dns_ips,
             router_ip=server_router,
             netmask=netmask_ip,
+            mtu=mtu,
         )
         return packet
 
@@ -85,6 +87,7 @@ class DHCPPacket(dhcp.DHCP):
         xid: int,
         lease_time: int = 3600,
         dns_ips: list = ["1.1.1.1"],
+        mtu: int = 1500,
     ) -> "DHCPPacket":
         packet = cls(
             op=dhcp.DHCP_OP_REPLY,
@@ -101,6 +104,7 @@ class DHCPPacket(dhcp.DHCP):
             dns_ips=dns_ips,
             router_ip=server_router,
             netmask=netmask_ip,
+            mtu=mtu,
         )
 
         return packet
@@ -123,6 +127,7 @@ class DHCPPacket(dhcp.DHCP):
         dns_ips: typing.List[IPv4Address],
         router_ip: IPv4Address,
         netmask: IPv4Address,
+        mtu: int = 1500,
     ) -> typing.List:
         if lease_time != -1:
             renew_time = int(lease_time * 0.5)
@@ -140,6 +145,7 @@ class DHCPPacket(dhcp.DHCP):
             (dhcp.DHCP_OPT_SERVER_ID, router_ip.packed),
             (dhcp.DHCP_OPT_ROUTER, router_ip.packed),
             (dhcp.DHCP_OPT_DNS_SVRS, b"".join(dns.packed for dns in dns_ips)),
+            (dhcp.DHCP_OPT_MTUSIZE, mtu.to_bytes(2, byteorder="big")),
         ]
         return options
 
@@ -92,7 +92,7 @@ class DHCPServerProtocol(asyncio.DatagramProtocol):
 
     async def send_offer(self, packet: DHCPPacket) -> None:
         try:
-            selected_ip = await self.server.get_available_ip()
+            selected_ip = await self.server.get_available_ip(packet.chaddr)
 
         except IPv4UnavailableError as e:
             self.logger.warning(f"No more IP addresses available: {e}")
@@ -4,6 +4,7 @@
 import asyncio
 import logging
 import socket
+import time
 from asyncio.futures import Future
 from functools import partial
 from ipaddress import IPv4Address
@@ -13,9 +14,10 @@ from ...utils import on_done
 
 from ..base import BaseService
 from .config import DHCPConfig
+from .allocator import AddressPool
 from .database import Database
+from .journal import OP_ADD, OP_REMOVE, OP_RENEW, LeaseJournal
 from .lease import Lease
-from .packets import IPv4UnavailableError
 from .protocol import DHCPServerProtocol
 
 
@@ -25,11 +27,13 @@ class DHCPServer(BaseService):
         "loop",
         "cleanup_timer",
         "reserved_ips",
+        "pool",
         "is_debug",
         "logger",
         "transport",
         "cleanup_task",
         "database",
+        "journal",
         "_waiter_",
         "protocol_cls",
     )
@@ -42,9 +46,12 @@ class DHCPServer(BaseService):
         *,
         logger: logging.Logger = logging.getLogger("tapws.dhcp"),
         protocol_cls: typing.Type[DHCPServerProtocol] = DHCPServerProtocol,
+        journal: Optional[LeaseJournal] = None,
     ) -> None:
         self.config = config
         self.database = client_database
+        # already loaded into the database
+        self.journal = journal
 
         self.loop = asyncio.get_running_loop()
         self.reserved_ips = (
@@ -55,22 +62,26 @@ class DHCPServer(BaseService):
             *[int(ip) for ip in self.config.dns_ips],
         )
 
+        self.pool = AddressPool(
+            self.config.server_network,
+            reserved=self.reserved_ips,
+            strategy=self.config.allocation_strategy,
+        )
+        for lease in self.database:
+            self.pool.take(lease.ip)
+
         self.cleanup_timer = 60
 
         self.is_debug = logger.isEnabledFor(logging.DEBUG)
         self.logger = logger
         self.protocol_cls = protocol_cls
 
-    async def get_available_ip(self) -> IPv4Address:
-        for ip in self.config.server_network.hosts():
-            ip_int = int(ip)
-
-            if ip_int in self.reserved_ips:
-                continue
-            if self.database.is_ip_available(ip_int):
-                return ip
-
-        raise IPv4UnavailableError("DHCP server is full")
+    async def get_available_ip(self, mac: Optional[bytes] = None) -> IPv4Address:
+        if mac is not None:
+            lease = self.database.get_lease(mac)
+            if lease is not None:
+                return IPv4Address(lease.ip)
+        return IPv4Address(self.pool.find(mac))
 
     async def is_ip_available(
         self, ip: IPv4Address, mac: Optional[bytes] = None
@@ -79,12 +90,17 @@ class DHCPServer(BaseService):
             return False
         if mac is not None:
             lease = self.database.get_lease(mac)
-            if lease is not None and lease.ip == ip:
+            if lease is not None and lease.ip == int(ip):
                 return True
         return self.database.is_ip_available(int(ip))
 
     async def add_lease(self, lease: Lease) -> None:
+        previous = self.database.get_lease(lease.mac)
+        if previous is not None:
+            self.pool.release(previous.ip)
         self.database.add_lease(lease)
+        self.pool.take(lease.ip)
+        self.record(OP_ADD, lease)
         self.logger.info(f"leasing {lease}")
 
     async def get_lease_by_mac(self, mac: bytes) -> Optional[Lease]:
@@ -92,12 +108,30 @@ class DHCPServer(BaseService):
 
     async def renew_lease(self, lease: Lease) -> None:
         self.database.renew_lease(lease)
+        current = self.database.get_lease(lease.mac)
+        if current is not None:
+            self.record(OP_RENEW, current)
         self.logger.info(f"{lease} renewed")
 
     async def remove_lease(self, lease: Lease) -> None:
-        self.database.remove_lease(lease)
+        self.forget_lease(lease)
         self.logger.info(f"{lease} removed")
 
+    def forget_lease(self, lease: Lease) -> None:
+        current = self.database.get_lease(lease.mac)
+        if current is not None and current.ip == lease.ip:
+            self.pool.release(lease.ip)
+            self.record(OP_REMOVE, lease)
+        self.database.remove_lease(lease)
+
+    def record(self, op: int, lease: Lease) -> None:
+        journal = self.journal
+        if journal is None:
+            return
+        journal.record(op, lease)
+        if journal.should_compact(self.database):
+            journal.compact(self.database)
+
     async def restart(self) -> None:
         self.logger.info("restarting DHCP service")
         await self.stop()
@@ -105,6 +139,8 @@ class DHCPServer(BaseService):
         self.logger.info("DHCP service restarted")
 
     async def start(self) -> None:
+        if self.journal is not None:
+            self.journal.start()
         factory = partial(self.protocol_cls, self)
         self.transport, _ = await self.loop.create_datagram_endpoint(
             lambda: factory(), local_addr=("0.0.0.0", 67), allow_broadcast=True
@@ -143,16 +179,24 @@ class DHCPServer(BaseService):
 
     async def cleanup_leases(self) -> None:
         while True:
-            await asyncio.sleep(self.cleanup_timer)
+            # wake up at the next deadline, at least every `cleanup_timer` seconds
+            delay = self.cleanup_timer
+            deadline = self.database.next_expiry()
+            if deadline is not None:
+                delay = min(delay, max(deadline - time.monotonic(), 0) + 0.001)
+            await asyncio.sleep(delay)
             if self.is_debug:
                 self.logger.debug("Cleaning up expired leases")
             async for lease in self.database.expired_leases():
-                self.database.remove_lease(lease)
+                self.forget_lease(lease)
 
     async def stop(self) -> None:
         self.logger.info("Stopping DHCP service")
         self.cleanup_task.cancel()
         self.transport.close()
+        if self.journal is not None:
+            self.journal.compact(self.database)
+            await self.journal.stop()
         self.logger.info("DHCP service stopped")
         self._waiter_.set_result(None)
 
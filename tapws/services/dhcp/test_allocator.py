@@ -0,0 +1,76 @@
+import random
+import unittest
+from ipaddress import IPv4Address, IPv4Network
+from .allocator import (
+    AddressPool,
+    STRATEGY_HASH,
+    STRATEGY_NEXT_FIT,
+    STRATEGY_RANDOM,
+)
+from .packets import IPv4UnavailableError
+
+NETWORK = IPv4Network("10.0.0.0/29")
+SERVER_IP = int(IPv4Address("10.0.0.1"))
+
+
+class TestAddressPool(unittest.TestCase):
+    def testNextFit(self):
+        pool = AddressPool(NETWORK, reserved=[SERVER_IP, int(IPv4Address("1.1.1.1"))])
+        # network, broadcast and server addresses are never handed out
+        self.assertEqual(len(pool), 5)
+        self.assertEqual(IPv4Address(pool.find()), IPv4Address("10.0.0.2"))
+        # an offer isn't a lease, the next client gets the next address
+        self.assertEqual(IPv4Address(pool.find()), IPv4Address("10.0.0.3"))
+
+        taken = []
+        while len(pool):
+            ip = pool.find()
+            self.assertTrue(pool.take(ip))
+            taken.append(ip)
+        self.assertEqual(len(taken), 5)
+        self.assertNotIn(SERVER_IP, taken)
+        with self.assertRaises(IPv4UnavailableError):
+            pool.find()
+
+        pool.release(taken[0])
+        self.assertEqual(pool.find(), taken[0])
+
+    def testTakeAndRelease(self):
+        pool = AddressPool(NETWORK, reserved=[SERVER_IP])
+        self.assertFalse(pool.take(SERVER_IP))
+        self.assertFalse(pool.take(int(IPv4Address("10.0.1.2"))))
+        ip = int(IPv4Address("10.0.0.4"))
+        self.assertTrue(pool.take(ip))
+        self.assertFalse(pool.take(ip))
+        self.assertFalse(pool.is_free(ip))
+
+        pool.release(ip)
+        self.assertTrue(pool.is_free(ip))
+        # releasing a reserved address doesn't free it
+        pool.release(SERVER_IP)
+        self.assertFalse(pool.is_free(SERVER_IP))
+        self.assertEqual(len(pool), 5)
+
+    def testHashIsStablePerMac(self):
+        pool = AddressPool(IPv4Network("10.0.0.0/16"), strategy=STRATEGY_HASH)
+        first = pool.find(b"\x02\x00\x00\x00\x00\x01")
+        self.assertEqual(pool.find(b"\x02\x00\x00\x00\x00\x01"), first)
+        self.assertNotEqual(pool.find(b"\x02\x00\x00\x00\x00\x02"), first)
+
+        # taken by another client, the next free address
+        pool.take(first)
+        self.assertEqual(pool.find(b"\x02\x00\x00\x00\x00\x01"), first + 1)
+
+    def testRandom(self):
+        pool = AddressPool(NETWORK, strategy=STRATEGY_RANDOM, rng=random.Random(1))
+        taken = set()
+        while len(pool):
+            ip = pool.find()
+            pool.take(ip)
+            taken.add(ip)
+        self.assertEqual(len(taken), 6)
+
+    def testUnknownStrategy(self):
+        with self.assertRaises(ValueError):
+            AddressPool(NETWORK, strategy="first-fit")
+        self.assertEqual(AddressPool(NETWORK).strategy, STRATEGY_NEXT_FIT)
@@ -0,0 +1,83 @@
+import asyncio
+import unittest
+from ipaddress import IPv4Address, IPv4Network
+from .compact import CompactDatabase
+from .lease import Lease
+
+NETWORK = IPv4Network("10.0.0.0/24")
+FIRST_IP = int(IPv4Address("10.0.0.10"))
+SECOND_IP = int(IPv4Address("10.0.0.11"))
+
+
+class TestCompactDatabase(unittest.TestCase):
+    def setUp(self) -> None:
+        self.db = CompactDatabase(3600, NETWORK)
+        return super().setUp()
+
+    def expired(self, now: float) -> list:
+        async def collect():
+            return [lease async for lease in self.db.expired_leases(now=now)]
+
+        return asyncio.run(collect())
+
+    def testAddRemoveLease(self):
+        self.db.add_lease(Lease(b"abcdef", FIRST_IP, 3600, leased_at=10.0))
+        lease = self.db.get_lease(b"abcdef")
+        self.assertEqual(
+            (lease.mac, lease.ip, lease.lease_time, lease.leased_at),  # type: ignore
+            (b"abcdef", FIRST_IP, 3600, 10.0),
+        )
+        self.assertEqual(self.db.get_lease_by_ip(FIRST_IP).mac, b"abcdef")  # type: ignore
+        self.assertFalse(self.db.is_ip_available(FIRST_IP))
+        self.assertEqual(len(self.db), 1)
+
+        self.db.remove_lease(lease)  # type: ignore
+        self.assertIsNone(self.db.get_lease(b"abcdef"))
+        self.assertIsNone(self.db.get_lease_by_ip(FIRST_IP))
+        self.assertTrue(self.db.is_ip_available(FIRST_IP))
+
+        # unknown lease
+        self.db.remove_lease(lease)  # type: ignore
+        self.assertEqual(len(self.db), 0)
+
+    def testOutsideNetwork(self):
+        with self.assertRaises(ValueError):
+            self.db.add_lease(Lease(b"abcdef", int(IPv4Address("10.0.1.1")), 3600))
+        self.assertIsNone(self.db.get_lease_by_ip(int(IPv4Address("10.0.1.1"))))
+
+    def testNewLeaseReplacesPrevious(self):
+        self.db.add_lease(Lease(b"abcdef", FIRST_IP, 3600))
+        self.db.add_lease(Lease(b"abcdef", SECOND_IP, 3600))
+        self.assertEqual(self.db.get_lease(b"abcdef").ip, SECOND_IP)  # type: ignore
+        self.assertTrue(self.db.is_ip_available(FIRST_IP))
+
+        # the address goes to another client
+        self.db.add_lease(Lease(b"bcdefg", SECOND_IP, 3600))
+        self.assertIsNone(self.db.get_lease(b"abcdef"))
+        self.assertEqual([lease.mac for lease in self.db], [b"bcdefg"])
+
+    def testExpiry(self):
+        self.db.add_lease(Lease(b"abcdef", FIRST_IP, 10, leased_at=100.0))
+        self.db.add_lease(Lease(b"bcdefg", SECOND_IP, 20, leased_at=100.0))
+        self.db.add_lease(Lease(b"cdefgh", FIRST_IP + 5, -1, leased_at=100.0))
+        self.assertEqual(self.db.next_expiry(), 110)
+
+        self.assertEqual(self.expired(109.5), [])
+        (lease,) = self.expired(110.0)
+        self.assertEqual(lease.mac, b"abcdef")
+        self.db.remove_lease(lease)
+        self.assertEqual([lease.mac for lease in self.expired(1e9)], [b"bcdefg"])
+        self.assertIsNone(self.db.next_expiry())
+
+    def testRenewedLeaseSkipped(self):
+        self.db.add_lease(Lease(b"abcdef", FIRST_IP, 10, leased_at=-100.0))
+        lease = self.db.get_lease(b"abcdef")
+        self.db.renew_lease(lease)  # type: ignore
+        self.assertEqual(lease.lease_time, 3600)  # type: ignore
+        self.assertEqual(self.db.get_lease(b"abcdef").leased_at, lease.leased_at)  # type: ignore
+
+        self.assertEqual(self.expired(0.0), [])
+        self.assertEqual(len(self.expired(lease.deadline + 1)), 1)  # type: ignore
+
+        # renew non-existent lease
+        self.db.renew_lease(Lease(b"zzzzzz", SECOND_IP, 10))
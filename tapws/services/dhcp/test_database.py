@@ -1,6 +1,7 @@
 import unittest
 import unittest.mock
 from .database import Database
+from .lease import Lease
 import asyncio
 
 
@@ -43,19 +44,80 @@ class TestDatabase(unittest.TestCase):
         self.db.renew_lease(lease)
 
     def testExpiredLeasesAsync(self):
-        lease = unittest.mock.Mock(ip="2.3.4.5", mac=b"bcdefg", expired=True)
+        lease = Lease(b"bcdefg", 2, 10, leased_at=100.0)
         self.db.add_lease(lease)
 
         async def test_expired():
             result = []
-            async for l in self.db.expired_leases():
+            async for l in self.db.expired_leases(now=111.0):
                 result.append(l)
             self.assertEqual(result, [lease])
 
         asyncio.run(test_expired())
         self.db.remove_lease(lease)
 
+    def expired(self, now: float) -> list:
+        async def collect():
+            return [lease async for lease in self.db.expired_leases(now=now)]
+
+        return asyncio.run(collect())
+
+    def testExpiryOrder(self):
+        first = Lease(b"aaaaaa", 1, 10, leased_at=100.0)
+        second = Lease(b"bbbbbb", 2, 20, leased_at=100.0)
+        forever = Lease(b"cccccc", 3, -1, leased_at=100.0)
+        for lease in (second, forever, first):
+            self.db.add_lease(lease)
+        self.assertEqual(self.db.next_expiry(), 110.0)
+
+        self.assertEqual(self.expired(105.0), [])
+        self.assertEqual(self.expired(115.0), [first])
+        self.db.remove_lease(first)
+        self.assertEqual(self.expired(1e9), [second])
+        self.assertIsNone(self.db.next_expiry())
+
+    def testRenewedAndRemovedLeasesSkipped(self):
+        renewed = Lease(b"aaaaaa", 1, 10, leased_at=-100.0)
+        removed = Lease(b"bbbbbb", 2, 10, leased_at=-100.0)
+        self.db.add_lease(renewed)
+        self.db.add_lease(removed)
+        self.db.remove_lease(removed)
+        self.db.renew_lease(renewed)
+
+        self.assertEqual(self.expired(0.0), [])
+        self.assertEqual(self.expired(renewed.deadline + 1), [renewed])
+
+    def testStaleDeadlinesCompacted(self):
+        lease = Lease(b"aaaaaa", 1, 10)
+        self.db.add_lease(lease)
+        for _ in range(1000):
+            self.db.renew_lease(lease)
+        self.assertLess(len(self.db.deadlines), 100)
+
     def testIpAvailable(self):
         lease = unittest.mock.Mock(ip=123, mac=b"bcdefg", expired=True)
         self.db.add_lease(lease)
         self.assertFalse(self.db.is_ip_available(123))
+
+    def testGetLeaseByIp(self):
+        lease = unittest.mock.Mock(ip=123, mac=b"bcdefg")
+        self.db.add_lease(lease)
+        self.assertEqual(self.db.get_lease_by_ip(123), lease)
+        self.assertIsNone(self.db.get_lease_by_ip(124))
+        self.db.remove_lease(lease)
+
+    def testNewLeaseReplacesPrevious(self):
+        first = Lease(b"bcdefg", 123, 3600)
+        second = Lease(b"bcdefg", 124, 3600)
+        db = Database(3600, leases=[first])
+        self.assertEqual(db.get_lease_by_ip(123), first)
+
+        db.add_lease(second)
+        self.assertEqual(db.get_lease(b"bcdefg"), second)
+        self.assertTrue(db.is_ip_available(123))
+        self.assertFalse(db.is_ip_available(124))
+        self.assertEqual(len(db), 1)
+
+        # a stale lease object doesn't remove the current one
+        db.remove_lease(first)
+        self.assertEqual(db.get_lease(b"bcdefg"), second)
@@ -0,0 +1,94 @@
+import os
+import tempfile
+import time
+import unittest
+from .compact import CompactDatabase
+from .database import Database
+from .journal import OP_ADD, OP_REMOVE, OP_RENEW, RECORD_SIZE, LeaseJournal
+from .lease import Lease
+
+from ipaddress import IPv4Network
+
+
+class TestLeaseJournal(unittest.IsolatedAsyncioTestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "leases")
+        return super().setUp()
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+        return super().tearDown()
+
+    def reload(self, database: Database = None) -> Database:  # type: ignore
+        database = database or Database(3600)
+        LeaseJournal(self.path).load(database)
+        return database
+
+    async def testReplay(self):
+        journal = LeaseJournal(self.path)
+        journal.start()
+        first = Lease(b"aaaaaa", 1, 3600)
+        second = Lease(b"bbbbbb", 2, 3600)
+        journal.record(OP_ADD, first)
+        journal.record(OP_ADD, second)
+        first.renew(7200)
+        journal.record(OP_RENEW, first)
+        journal.record(OP_REMOVE, second)
+        await journal.stop()
+
+        database = self.reload()
+        self.assertEqual(len(database), 1)
+        lease = database.get_lease(b"aaaaaa")
+        self.assertEqual((lease.ip, lease.lease_time), (1, 7200))  # type: ignore
+        # the monotonic timestamps survive the round trip through the wall clock
+        self.assertAlmostEqual(lease.leased_at, first.leased_at, places=2)  # type: ignore
+
+        compact = self.reload(CompactDatabase(3600, IPv4Network("0.0.0.0/24")))
+        self.assertEqual(compact.get_lease(b"aaaaaa").ip, 1)  # type: ignore
+
+    async def testWritesAreBatched(self):
+        journal = LeaseJournal(self.path, flush_interval=60)
+        journal.start()
+        journal.record(OP_ADD, Lease(b"aaaaaa", 1, 3600))
+        journal.record(OP_ADD, Lease(b"bbbbbb", 2, 3600))
+        self.assertEqual(os.path.getsize(self.path), 0)
+        self.assertIsNotNone(journal.handle)
+        await journal.stop()
+        self.assertEqual(os.path.getsize(self.path), 2 * RECORD_SIZE)
+
+    async def testCompaction(self):
+        database = Database(3600)
+        journal = LeaseJournal(self.path, compact_threshold=10)
+        journal.start()
+        lease = Lease(b"aaaaaa", 1, 3600)
+        database.add_lease(lease)
+        journal.record(OP_ADD, lease)
+        for _ in range(20):
+            database.renew_lease(lease)
+            journal.record(OP_RENEW, lease)
+            if journal.should_compact(database):
+                journal.compact(database)
+        await journal.stop()
+
+        self.assertEqual(os.path.getsize(self.path + ".snapshot"), RECORD_SIZE)
+        self.assertLess(os.path.getsize(self.path), 11 * RECORD_SIZE)
+        self.assertEqual(self.reload().get_lease(b"aaaaaa").ip, 1)  # type: ignore
+
+    async def testExpiredAndTornRecordsSkipped(self):
+        journal = LeaseJournal(self.path)
+        journal.start()
+        journal.record(OP_ADD, Lease(b"aaaaaa", 1, 10, time.monotonic() - 20))
+        journal.record(OP_ADD, Lease(b"bbbbbb", 2, -1, time.monotonic() - 20))
+        journal.record(OP_ADD, Lease(b"cccccc", 3, 3600))
+        await journal.stop()
+        with open(self.path, "ab") as file:
+            file.write(b"\x01abc")
+
+        database = self.reload()
+        self.assertEqual(
+            sorted(lease.mac for lease in database), [b"bbbbbb", b"cccccc"]
+        )
+
+    def testMissingJournal(self):
+        self.assertEqual(len(self.reload()), 0)
@@ -29,3 +29,9 @@ class TestLease(unittest.TestCase):
     def testLeaseNeverExpired(self):
         self.lease.lease_time = -1
         self.assertFalse(self.lease.expired)
+
+    def testDeadline(self):
+        lease = Lease(b"abcdef", 123, 60, leased_at=1000.0)
+        self.assertEqual(lease.deadline, 1060.0)
+        lease.lease_time = -1
+        self.assertEqual(lease.deadline, float("inf"))